@@ -0,0 +1,197 @@
+"""
+Allocation Tracker - tracemalloc snapshot diffs for memory-leak healing
+Finds the allocation sites that keep growing between snapshots.
+
+tracemalloc is only started once sustained growth is detected (see
+periodic(when=...)), so healthy processes pay nothing. From then on the
+leader snapshots on a fixed interval, and the memory strategy diffs the
+oldest retained snapshot against the newest.
+"""
+
+import ast
+import asyncio
+import linecache
+import os
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sampling_profiler import is_app_code
+
+_IGNORED_FILES = (
+    tracemalloc.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+)
+
+
+@dataclass
+class AllocationSite:
+    """One allocation site whose retained size grew between snapshots."""
+    filename: str
+    lineno: int
+    function: str
+    source: str
+    size_diff_kb: float
+    count_diff: int
+    size_kb: float
+    traceback: List[str] = field(default_factory=list)
+
+    def to_dict(self):
+        return {
+            "filename": self.filename,
+            "lineno": self.lineno,
+            "function": self.function,
+            "source": self.source,
+            "size_diff_kb": self.size_diff_kb,
+            "count_diff": self.count_diff,
+            "size_kb": self.size_kb,
+            "traceback": self.traceback
+        }
+
+
+def enclosing_function(filename: str, lineno: int) -> str:
+    """Qualified name of the def enclosing a line ("<module>" if none)."""
+    source = "".join(linecache.getlines(filename))
+    if not source:
+        return "<module>"
+
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return "<module>"
+
+    best = "<module>"
+
+    def visit(node, prefix):
+        nonlocal best
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = f"{prefix}{child.name}"
+                end = getattr(child, "end_lineno", child.lineno)
+                if child.lineno <= lineno <= end:
+                    if not isinstance(child, ast.ClassDef):
+                        best = name
+                    visit(child, f"{name}.")
+
+    visit(tree, "")
+    return best
+
+
+class AllocationTracker:
+    """
+    Periodic tracemalloc snapshots and growth diffs.
+
+    Usage:
+        tracker = AllocationTracker()
+        tracker.start()
+
+        tracker.take_snapshot()
+        ...  # later
+        tracker.take_snapshot()
+        for site in tracker.top_growth(5):
+            print(site.filename, site.lineno, site.size_diff_kb)
+    """
+
+    def __init__(self, frames: int = 8, max_snapshots: int = 6):
+        self.frames = frames
+        self.snapshots: deque = deque(maxlen=max_snapshots)
+        self._started_tracing = False
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        """Start tracemalloc if nobody else has."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+
+    def stop(self):
+        """Stop tracemalloc if we started it."""
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
+        self.snapshots.clear()
+
+    def take_snapshot(self) -> tracemalloc.Snapshot:
+        """Record a filtered snapshot (starts tracing if needed)."""
+        self.start()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, pattern) for pattern in _IGNORED_FILES
+        ])
+        self.snapshots.append((datetime.now(), snapshot))
+        return snapshot
+
+    async def periodic(self, interval_seconds: float = 60.0,
+                       when: Optional[Callable[[], bool]] = None):
+        """
+        Take a snapshot every `interval_seconds` (run as a task).
+
+        With `when`, tracing starts only on the first tick where when()
+        is true; once tracing, every tick snapshots. Snapshots are taken
+        in the default executor so the event loop keeps serving.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if self.tracing or when is None or when():
+                    await loop.run_in_executor(None, self.take_snapshot)
+            except Exception as e:
+                print(f"❌ Allocation snapshot error: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    def top_growth(self, n: int = 10, min_growth_kb: float = 1.0) -> List[AllocationSite]:
+        """Top-growing sites between the oldest and newest retained snapshot."""
+        if len(self.snapshots) < 2:
+            return []
+
+        _, old = self.snapshots[0]
+        _, new = self.snapshots[-1]
+
+        sites = []
+        for stat in new.compare_to(old, "traceback"):
+            if stat.size_diff <= min_growth_kb * 1024:
+                continue
+
+            if not len(stat.traceback):
+                continue
+
+            # Innermost frame in patchable code, else the allocation frame
+            frame = next(
+                (f for f in reversed(stat.traceback) if is_app_code(f.filename)),
+                stat.traceback[-1]
+            )
+
+            sites.append(AllocationSite(
+                filename=frame.filename,
+                lineno=frame.lineno,
+                function=enclosing_function(frame.filename, frame.lineno),
+                source=linecache.getline(frame.filename, frame.lineno).strip(),
+                size_diff_kb=stat.size_diff / 1024,
+                count_diff=stat.count_diff,
+                size_kb=stat.size / 1024,
+                traceback=[f"{os.path.basename(f.filename)}:{f.lineno}" for f in stat.traceback]
+            ))
+
+            if len(sites) >= n:
+                break
+
+        return sites
+
+    def window_seconds(self) -> Optional[float]:
+        """Time span covered by retained snapshots."""
+        if len(self.snapshots) < 2:
+            return None
+        return (self.snapshots[-1][0] - self.snapshots[0][0]).total_seconds()
+
+    def to_dict(self, n: int = 10) -> Dict:
+        return {
+            "snapshots": len(self.snapshots),
+            "window_seconds": self.window_seconds(),
+            "sites": [site.to_dict() for site in self.top_growth(n)]
+        }
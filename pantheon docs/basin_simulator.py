@@ -0,0 +1,242 @@
+"""
+Basin Simulator - Offline evaluation of basin-drift corrections
+Replays recorded basin trajectories with candidate corrections applied.
+
+Basin coordinates live on the unit sphere, so every candidate keeps
+them there: geodesic (slerp toward baseline), tangent (baseline pull
+projected onto the tangent plane, then exp map) and renormalized
+Euclidean. All schemes × gains advance together as one (S, G, D) array
+per recorded step, and Φ impact comes from a Φ ~ drift fit on the same
+history. The healer picks the correction from this evidence instead of
+a hard-coded gain.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+SCHEMES = ("geodesic", "tangent", "renormalized")
+
+DEFAULT_GAINS = np.linspace(0.0, 1.0, 21)
+
+
+def apply_correction(basin_coords, baseline, gain, scheme="geodesic"):
+    """
+    Pull basin coordinates toward `baseline` without leaving the sphere.
+
+    Works on single vectors (D,) or batches (..., D); `gain` broadcasts
+    against the leading dimensions (e.g. shape (G, 1) for a gain sweep).
+    """
+    x = basin_coords / np.maximum(np.linalg.norm(basin_coords, axis=-1, keepdims=True), 1e-12)
+    b = baseline / max(np.linalg.norm(baseline), 1e-12)
+
+    if scheme == "renormalized":
+        moved = x + gain * (b - x)
+        return moved / np.maximum(np.linalg.norm(moved, axis=-1, keepdims=True), 1e-12)
+
+    cos = np.clip(np.sum(x * b, axis=-1, keepdims=True), -1.0, 1.0)
+    tangent = b - cos * x                                  # |tangent| = sin θ
+    sin = np.linalg.norm(tangent, axis=-1, keepdims=True)
+    direction = tangent / np.maximum(sin, 1e-12)
+
+    if scheme == "geodesic":
+        step = gain * np.arccos(cos)                       # fraction of the arc
+    elif scheme == "tangent":
+        step = gain * sin                                  # tangent-plane pull
+    else:
+        raise ValueError(f"Unknown correction scheme: {scheme}")
+
+    return np.cos(step) * x + np.sin(step) * direction
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+
+
+def _angle(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.arccos(np.clip(np.sum(a * b, axis=-1), -1.0, 1.0))
+
+
+@dataclass
+class SimulationResult:
+    """Per (scheme, gain) outcome of a replayed trajectory."""
+    schemes: Sequence[str]
+    gains: np.ndarray
+    mean_drift: np.ndarray        # (S, G) mean Fisher-Rao distance to baseline
+    final_drift: np.ndarray       # (S, G)
+    phi_gain: np.ndarray          # (S, G) predicted mean Φ change
+    displacement: np.ndarray      # (S, G) mean correction per step (radians)
+    override: np.ndarray          # (S, G) displacement / mean recorded step
+    score: np.ndarray             # (S, G)
+    steps: int
+    phi_slope: float
+
+    def best(self) -> Dict:
+        """Highest-scoring correction."""
+        s, g = np.unravel_index(int(np.argmax(self.score)), self.score.shape)
+        return self._row(s, g)
+
+    def table(self) -> List[Dict]:
+        return [
+            self._row(s, g)
+            for s in range(len(self.schemes))
+            for g in range(len(self.gains))
+        ]
+
+    def _row(self, s: int, g: int) -> Dict:
+        return {
+            "scheme": self.schemes[s],
+            "gain": float(self.gains[g]),
+            "mean_drift": float(self.mean_drift[s, g]),
+            "final_drift": float(self.final_drift[s, g]),
+            "phi_gain": float(self.phi_gain[s, g]),
+            "displacement": float(self.displacement[s, g]),
+            "override": float(self.override[s, g]),
+            "score": float(self.score[s, g])
+        }
+
+    def to_dict(self, top: int = 5) -> Dict:
+        ranked = sorted(self.table(), key=lambda row: row["score"], reverse=True)
+        return {
+            "steps": self.steps,
+            "phi_slope": self.phi_slope,
+            "uncorrected_drift": float(self.mean_drift[0, 0]),
+            "best": self.best(),
+            "top": ranked[:top]
+        }
+
+
+class BasinSimulator:
+    """
+    Sweep correction schemes and gains over a recorded trajectory.
+
+    Usage:
+        simulator = BasinSimulator()
+        result = simulator.simulate_monitor(monitor)
+        if result:
+            print(result.best())   # {"scheme": "geodesic", "gain": 0.35, ...}
+
+    Score = relative drift reduction + phi_weight · ΔΦ
+            - displacement_penalty · override
+
+    where override is the mean correction per step relative to the mean
+    recorded step: 1.0 means the correction cancels all natural motion
+    (basin frozen at baseline), which is penalized as heavily as the
+    drift it removes.
+    """
+
+    def __init__(self,
+                 gains: Optional[Sequence[float]] = None,
+                 schemes: Sequence[str] = SCHEMES,
+                 phi_weight: float = 1.0,
+                 displacement_penalty: float = 1.0):
+
+        gains = np.asarray(DEFAULT_GAINS if gains is None else gains, dtype=float)
+        if gains[0] != 0.0:
+            gains = np.concatenate([[0.0], gains])  # gain 0 = uncorrected reference
+
+        self.gains = gains
+        self.schemes = tuple(schemes)
+        self.phi_weight = phi_weight
+        self.displacement_penalty = displacement_penalty
+
+    def simulate(self,
+                 trajectory: np.ndarray,
+                 baseline: np.ndarray,
+                 phis: Optional[np.ndarray] = None) -> SimulationResult:
+        """
+        Replay `trajectory` (T, D) with every (scheme, gain) applied per step.
+
+        Each recorded step is taken as a tangent vector (log map) and
+        re-applied at the corrected position, so the simulated system
+        experiences the same disturbances as the recorded one.
+        """
+        traj = _normalize(np.asarray(trajectory, dtype=float))
+        b = _normalize(np.asarray(baseline, dtype=float))
+        steps = len(traj)
+
+        S, G, D = len(self.schemes), len(self.gains), traj.shape[1]
+
+        # Recorded steps as tangent vectors at their origin: v_t = log_{x_{t-1}}(x_t)
+        prev, nxt = traj[:-1], traj[1:]
+        cos = np.clip(np.sum(prev * nxt, axis=-1, keepdims=True), -1.0, 1.0)
+        tangent = nxt - cos * prev
+        lengths = np.arccos(cos)
+        moves = tangent / np.maximum(np.linalg.norm(tangent, axis=-1, keepdims=True), 1e-12) * lengths
+
+        gains = self.gains[:, None]                        # (G, 1) broadcast over D
+        y = np.broadcast_to(traj[0], (S, G, D)).copy()
+        drifts = np.empty((S, G, steps))
+        drifts[..., 0] = _angle(y, b)
+        displacement = np.zeros((S, G))
+
+        for t in range(1, steps):
+            # Transport the recorded step to each candidate position
+            v = moves[t - 1]
+            proj = v - np.sum(y * v, axis=-1, keepdims=True) * y
+            norm = np.linalg.norm(proj, axis=-1, keepdims=True)
+            proj = proj / np.maximum(norm, 1e-12) * lengths[t - 1]
+            step = np.linalg.norm(proj, axis=-1, keepdims=True)
+            moved = np.cos(step) * y + np.sin(step) * proj / np.maximum(step, 1e-12)
+
+            corrected = np.stack([
+                apply_correction(moved[s], b, gains, scheme)
+                for s, scheme in enumerate(self.schemes)
+            ])
+
+            displacement += _angle(corrected, moved)
+            y = corrected
+            drifts[..., t] = _angle(y, b)
+
+        mean_drift = drifts.mean(axis=-1)
+        final_drift = drifts[..., -1]
+        displacement /= max(steps - 1, 1)
+        override = displacement / max(float(lengths.mean()), 1e-12)
+
+        # Φ ~ a + slope · drift, fitted on the recorded history
+        phi_slope, phi_gain = 0.0, np.zeros((S, G))
+        if phis is not None and len(phis) == steps:
+            recorded = _angle(traj, b)
+            if np.var(recorded) > 1e-12:
+                phi_slope = float(np.polyfit(recorded, np.asarray(phis, dtype=float), 1)[0])
+                phi_gain = phi_slope * (mean_drift - recorded.mean())
+
+        uncorrected = mean_drift[:, :1]
+        reduction = (uncorrected - mean_drift) / np.maximum(uncorrected, 1e-12)
+        score = (
+            reduction
+            + self.phi_weight * phi_gain
+            - self.displacement_penalty * override
+        )
+
+        return SimulationResult(
+            schemes=self.schemes,
+            gains=self.gains,
+            mean_drift=mean_drift,
+            final_drift=final_drift,
+            phi_gain=phi_gain,
+            displacement=displacement,
+            override=override,
+            score=score,
+            steps=steps,
+            phi_slope=phi_slope
+        )
+
+    def simulate_monitor(self, monitor, window: int = 500) -> Optional[SimulationResult]:
+        """Simulate over the monitor's recent control-arm history."""
+        if monitor.baseline_basin is None:
+            return None
+
+        recent = [
+            s for s in monitor.snapshots[-window:]
+            if getattr(s, "variant", "control") == "control"
+        ]
+        if len(recent) < 3:
+            return None
+
+        return self.simulate(
+            np.stack([s.basin_coords for s in recent]),
+            monitor.baseline_basin,
+            np.array([s.phi for s in recent])
+        )
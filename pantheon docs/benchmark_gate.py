@@ -0,0 +1,323 @@
+"""
+Benchmark Gate - Statistical acceptance test for latency patches
+A latency patch must be measurably faster before it is committed.
+
+The designated pytest-benchmark suite runs in two throwaway git
+worktrees: the current HEAD (baseline) and HEAD plus the patch
+(activated by a tiny pytest plugin). Rounds are interleaved A/B, B/A,
+... so drift in machine load hits both arms alike, and per-round
+medians are compared with a one-sided Mann-Whitney U test (no
+normality assumption, robust to outliers).
+"""
+
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+_ACTIVATE_PLUGIN = '''
+import importlib.util
+import inspect
+
+PATCH_PATH = {path!r}
+
+
+def pytest_configure(config):
+    spec = importlib.util.spec_from_file_location("_healing_patch", PATCH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    for name, fn in list(vars(module).items()):
+        if not name.startswith("apply_") or not callable(fn):
+            continue
+        required = [
+            p for p in inspect.signature(fn).parameters.values()
+            if p.default is p.empty and p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)
+        ]
+        if not required:
+            fn()
+'''
+
+
+@lru_cache(maxsize=None)
+def _u_counts(m: int, n: int) -> Tuple[int, ...]:
+    """Number of orderings giving each U = 0..m*n (no ties)."""
+    if m == 0 or n == 0:
+        return (1,)
+    # Largest value belongs to the first sample (adds n to U) or not
+    with_first = _u_counts(m - 1, n)
+    without = _u_counts(m, n - 1)
+    counts = [0] * (m * n + 1)
+    for u, c in enumerate(with_first):
+        counts[u + n] += c
+    for u, c in enumerate(without):
+        counts[u] += c
+    return tuple(counts)
+
+
+def mann_whitney_greater(x: List[float], y: List[float]) -> float:
+    """
+    One-sided p-value for "x tends to be larger than y".
+
+    Exact null distribution for small tie-free samples, otherwise the
+    normal approximation with tie and continuity correction.
+    """
+    m, n = len(x), len(y)
+    if m == 0 or n == 0:
+        return 1.0
+
+    u = sum(1.0 if a > b else 0.5 if a == b else 0.0 for a in x for b in y)
+    ties = len(set(x) | set(y)) < m + n
+
+    if not ties and m * n <= 400:
+        counts = _u_counts(m, n)
+        return sum(counts[math.ceil(u):]) / sum(counts)
+
+    values = sorted(x + y)
+    tie_term = 0
+    i = 0
+    while i < len(values):
+        j = i
+        while j < len(values) and values[j] == values[i]:
+            j += 1
+        t = j - i
+        tie_term += t ** 3 - t
+        i = j
+
+    total = m + n
+    variance = m * n / 12 * ((total + 1) - tie_term / (total * (total - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - m * n / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+@dataclass
+class BenchmarkComparison:
+    """Per-benchmark medians (seconds) across rounds, both arms."""
+    name: str
+    baseline: List[float]
+    patched: List[float]
+    p_improve: float
+    p_regress: float
+
+    @property
+    def change(self) -> float:
+        """Relative change of the median (negative = faster)."""
+        base = _median(self.baseline)
+        return (_median(self.patched) - base) / base if base else 0.0
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "baseline": self.baseline,
+            "patched": self.patched,
+            "p_improve": self.p_improve,
+            "p_regress": self.p_regress,
+            "change": self.change
+        }
+
+
+@dataclass
+class BenchmarkResult:
+    """Gate verdict plus the numbers behind it."""
+    accepted: bool
+    reason: str
+    rounds: int
+    comparisons: List[BenchmarkComparison] = field(default_factory=list)
+
+    def to_dict(self):
+        return {
+            "accepted": self.accepted,
+            "reason": self.reason,
+            "rounds": self.rounds,
+            "comparisons": [c.to_dict() for c in self.comparisons]
+        }
+
+
+class BenchmarkGate:
+    """
+    Reject latency patches without a significant benchmark improvement.
+
+    Usage:
+        gate = BenchmarkGate("tests/", rounds=5)
+        result = gate.evaluate(patch.module_path, patch.patch_code)
+        if not result.accepted:
+            print(result.reason)
+    """
+
+    def __init__(self,
+                 suite: str = "tests/",
+                 rounds: int = 5,
+                 alpha: float = 0.05,
+                 min_improvement: float = 0.02,
+                 timeout_seconds: float = 600.0):
+
+        self.suite = suite
+        self.rounds = rounds
+        self.alpha = alpha
+        self.min_improvement = min_improvement
+        self.timeout_seconds = timeout_seconds
+
+    def compare(self,
+                baseline_runs: List[Dict[str, float]],
+                patched_runs: List[Dict[str, float]]) -> BenchmarkResult:
+        """
+        Decide from per-round {benchmark: median} dicts of both arms.
+
+        Accept if at least one benchmark is significantly faster by
+        `min_improvement` (Bonferroni across benchmarks) and none is
+        significantly slower.
+        """
+        names = sorted(set().union(*baseline_runs, *patched_runs)) if baseline_runs else []
+        comparisons = []
+
+        for name in names:
+            baseline = [run[name] for run in baseline_runs if name in run]
+            patched = [run[name] for run in patched_runs if name in run]
+            comparisons.append(BenchmarkComparison(
+                name=name,
+                baseline=baseline,
+                patched=patched,
+                p_improve=mann_whitney_greater(baseline, patched),
+                p_regress=mann_whitney_greater(patched, baseline)
+            ))
+
+        rounds = min(len(baseline_runs), len(patched_runs))
+
+        if not comparisons:
+            return BenchmarkResult(False, "No benchmarks ran", rounds)
+
+        threshold = self.alpha / len(comparisons)
+
+        regressed = [c.name for c in comparisons if c.p_regress < threshold]
+        if regressed:
+            return BenchmarkResult(
+                False, f"Significantly slower: {', '.join(regressed)}", rounds, comparisons
+            )
+
+        improved = [
+            c for c in comparisons
+            if c.p_improve < threshold and -c.change >= self.min_improvement
+        ]
+        if not improved:
+            return BenchmarkResult(
+                False, "No significant improvement", rounds, comparisons
+            )
+
+        best = min(improved, key=lambda c: c.change)
+        return BenchmarkResult(
+            True,
+            f"{best.name} {best.change:+.1%} (p={best.p_improve:.3g})",
+            rounds,
+            comparisons
+        )
+
+    def evaluate(self, module_path: str, patch_code: str) -> BenchmarkResult:
+        """
+        Run interleaved rounds on baseline/patched worktrees of HEAD.
+
+        Rejects at once, before creating any worktree, when the suite
+        does not exist (relative to the working directory).
+        """
+        if not os.path.exists(self.suite):
+            print(f"❌ Benchmark suite not found: {self.suite!r} "
+                  f"(pass benchmark_suite=None to disable the gate)")
+            return BenchmarkResult(False, f"Benchmark suite not found: {self.suite}", 0)
+
+        prefix = subprocess.run(
+            ["git", "rev-parse", "--show-prefix"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+        workdir = tempfile.mkdtemp(prefix="heal-bench-")
+        trees = {arm: os.path.join(workdir, arm) for arm in ("baseline", "patched")}
+
+        try:
+            for tree in trees.values():
+                subprocess.run(
+                    ["git", "worktree", "add", "--detach", tree, "HEAD"],
+                    capture_output=True, check=True
+                )
+
+            patched_cwd = os.path.join(trees["patched"], prefix)
+            patch_path = os.path.join(patched_cwd, module_path)
+            os.makedirs(os.path.dirname(patch_path), exist_ok=True)
+            with open(patch_path, 'w') as f:
+                f.write(patch_code)
+
+            plugin_dir = os.path.join(workdir, "plugin")
+            os.makedirs(plugin_dir)
+            with open(os.path.join(plugin_dir, "_heal_activate.py"), 'w') as f:
+                f.write(_ACTIVATE_PLUGIN.format(path=patch_path))
+
+            runs: Dict[str, List[Dict[str, float]]] = {"baseline": [], "patched": []}
+
+            for i in range(self.rounds):
+                order = ("baseline", "patched") if i % 2 == 0 else ("patched", "baseline")
+                for arm in order:
+                    medians = self._run_round(
+                        os.path.join(trees[arm], prefix),
+                        os.path.join(workdir, f"{arm}-{i}.json"),
+                        plugin_dir if arm == "patched" else None
+                    )
+                    if medians is None:
+                        return BenchmarkResult(False, f"Benchmark run failed ({arm})", i)
+                    runs[arm].append(medians)
+
+            return self.compare(runs["baseline"], runs["patched"])
+
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+            return BenchmarkResult(False, f"Benchmark gate error: {e}", 0)
+        finally:
+            for tree in trees.values():
+                subprocess.run(
+                    ["git", "worktree", "remove", "--force", tree],
+                    capture_output=True
+                )
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _run_round(self, cwd: str, json_path: str,
+                   plugin_dir: Optional[str]) -> Optional[Dict[str, float]]:
+        """One benchmark-only pytest run. Returns {fullname: median seconds}."""
+        command = [
+            sys.executable, "-m", "pytest", self.suite,
+            "--benchmark-only", f"--benchmark-json={json_path}",
+            "-q", "-p", "no:cacheprovider"
+        ]
+        env = dict(os.environ)
+
+        if plugin_dir:
+            command += ["-p", "_heal_activate"]
+            env["PYTHONPATH"] = os.pathsep.join(
+                p for p in (plugin_dir, env.get("PYTHONPATH")) if p
+            )
+
+        subprocess.run(
+            command, cwd=cwd, env=env, capture_output=True,
+            timeout=self.timeout_seconds
+        )
+
+        # Assertion failures still produce timings; a missing file does not
+        if not os.path.exists(json_path):
+            return None
+
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+
+        return {
+            bench["fullname"]: bench["stats"]["median"]
+            for bench in data.get("benchmarks", [])
+        }
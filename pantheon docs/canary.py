@@ -0,0 +1,318 @@
+"""
+Canary Rollout - Live A/B comparison of healing patches
+Routes a fraction of calls through the patched code path, compares arms
+with a sequential test, and decides promote/abort as soon as it can.
+
+The test is a mixture sequential probability ratio test (mSPRT) on the
+difference of arm means. Its p-values stay valid under continuous
+monitoring, so we can check after every batch of calls without
+inflating false positives, and stop the moment evidence is conclusive.
+
+Arms are compared only on what the routed wrapper measures itself, per
+call: latency and errors. Φ is deliberately not an arm metric. It is read
+from process-wide telemetry that both arms update between snapshots, so
+any per-arm attribution of a snapshot's Φ would mix the arms. Φ
+regressions of a promoted patch are caught afterwards by RegressionGuard,
+which compares code_hash segments of the snapshot stream.
+"""
+
+import functools
+import importlib
+import inspect
+import math
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+ARMS = ("control", "canary")
+
+# Per-call metrics recorded by CanaryRollout.wrap
+# (+1: higher is better, -1: lower is better)
+METRIC_DIRECTIONS = {
+    "latency_ms": -1,
+    "error": -1,
+}
+
+
+class RunningStats:
+    """Welford running mean/variance (O(1) memory per arm and metric)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def to_dict(self):
+        return {"n": self.n, "mean": self.mean, "variance": self.variance}
+
+
+def msprt_lambda(control: RunningStats, canary: RunningStats, tau2: float) -> float:
+    """
+    Mixture likelihood ratio for H0: equal means, normal mixing N(0, τ²).
+
+        Λ = sqrt(V / (V + τ²)) · exp(τ² Δ² / (2 V (V + τ²)))
+
+    with Δ = canary - control and V its plug-in variance. Reject H0
+    when Λ ≥ 1/α.
+    """
+    variance = control.variance / control.n + canary.variance / canary.n
+    if variance <= 0:
+        variance = 1e-12
+    delta = canary.mean - control.mean
+
+    exponent = tau2 * delta ** 2 / (2 * variance * (variance + tau2))
+    return math.sqrt(variance / (variance + tau2)) * math.exp(min(exponent, 700.0))
+
+
+class CanaryRollout:
+    """
+    Per-call canary between an original and a patched code path.
+
+    Usage:
+        rollout = CanaryRollout("a1b2c3", fraction=0.1)
+        module.search = rollout.wrap(original_search, patched_search)
+
+        rollout.evaluate()["decision"]   # "promote" | "abort" | "continue"
+
+    Promotes as soon as `target_metric` is significantly better and no
+    metric is significantly worse. With target_metric=None (patches not
+    aimed at a per-call metric) it promotes on non-inferiority once the
+    canary arm reaches `max_samples`.
+
+    All state lives on the instance, so concurrent canaries of different
+    patches never see each other's calls.
+    """
+
+    def __init__(self,
+                 patch_key: str,
+                 fraction: float = 0.1,
+                 target_metric: Optional[str] = "latency_ms",
+                 alpha: float = 0.05,
+                 min_samples: int = 30,
+                 max_samples: int = 20000,
+                 effect_size: float = 0.1,
+                 check_every: int = 50,
+                 on_decision: Optional[Callable[[Dict], None]] = None,
+                 rng: Optional[random.Random] = None):
+
+        self.patch_key = patch_key
+        self.fraction = fraction
+        self.target_metric = target_metric
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.effect_size = effect_size
+        self.check_every = check_every
+        self.on_decision = on_decision
+        self.rng = rng or random.Random()
+
+        self.stats: Dict[str, Dict[str, RunningStats]] = {
+            arm: {metric: RunningStats() for metric in METRIC_DIRECTIONS}
+            for arm in ARMS
+        }
+        self.started = time.time()
+        self.decision: Optional[Dict] = None
+
+        self._lock = threading.Lock()
+        self._records = 0
+
+    def route(self) -> str:
+        """Pick an arm for one call."""
+        return "canary" if self.rng.random() < self.fraction else "control"
+
+    def record(self, arm: str, metric: str, value: float):
+        """Add one observation; evaluates every `check_every` records."""
+        with self._lock:
+            self.stats[arm][metric].add(float(value))
+            self._records += 1
+            due = self._records % self.check_every == 0
+
+        if due and self.decision is None:
+            result = self.evaluate()
+            if result["decision"] != "continue":
+                self.decision = result
+                if self.on_decision is not None:
+                    self.on_decision(result)
+
+    def wrap(self, original: Callable, patched: Callable) -> Callable:
+        """Route each call to one arm and record its latency and errors."""
+
+        def observe(arm, start, failed):
+            self.record(arm, "latency_ms", (time.perf_counter() - start) * 1000)
+            self.record(arm, "error", 1.0 if failed else 0.0)
+
+        if inspect.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def async_wrapper(*args, **kwargs):
+                arm = self.route()
+                fn = patched if arm == "canary" else original
+                start = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException:
+                    observe(arm, start, True)
+                    raise
+                observe(arm, start, False)
+                return result
+            return async_wrapper
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            arm = self.route()
+            fn = patched if arm == "canary" else original
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                observe(arm, start, True)
+                raise
+            observe(arm, start, False)
+            return result
+        return wrapper
+
+    def evaluate(self) -> Dict:
+        """
+        Sequential comparison of arms.
+
+        Returns:
+            {
+                "decision": "promote" | "abort" | "continue",
+                "reason": str,
+                "metrics": {metric: {"delta", "lambda", "significant", "better"}}
+            }
+        """
+        with self._lock:
+            metrics = {}
+            worse = []
+            target_better = False
+
+            for metric, direction in METRIC_DIRECTIONS.items():
+                control = self.stats["control"][metric]
+                canary = self.stats["canary"][metric]
+
+                if min(control.n, canary.n) < self.min_samples:
+                    continue
+
+                # Mixing scale: effect_size relative to the metric's magnitude
+                scale = max(abs(control.mean),
+                            math.sqrt(max(control.variance, canary.variance)), 1e-9)
+                tau2 = (self.effect_size * scale) ** 2
+                ratio = msprt_lambda(control, canary, tau2)
+                delta = canary.mean - control.mean
+                significant = ratio >= 1 / self.alpha
+                better = delta * direction > 0
+
+                metrics[metric] = {
+                    "control": control.to_dict(),
+                    "canary": canary.to_dict(),
+                    "delta": delta,
+                    "lambda": ratio,
+                    "significant": significant,
+                    "better": better
+                }
+
+                if significant and not better:
+                    worse.append(metric)
+                if significant and better and metric == self.target_metric:
+                    target_better = True
+
+            canary_n = self.stats["canary"][self.target_metric or "latency_ms"].n
+
+        if worse:
+            decision, reason = "abort", f"Canary significantly worse on {', '.join(worse)}"
+        elif target_better:
+            decision, reason = "promote", f"Canary significantly better on {self.target_metric}"
+        elif canary_n >= self.max_samples and self.target_metric is None:
+            decision, reason = "promote", "No regression after max_samples"
+        elif canary_n >= self.max_samples:
+            decision, reason = "abort", "Inconclusive after max_samples"
+        else:
+            decision, reason = "continue", "Collecting evidence"
+
+        return {
+            "patch_key": self.patch_key,
+            "decision": decision,
+            "reason": reason,
+            "elapsed_seconds": time.time() - self.started,
+            "metrics": metrics
+        }
+
+
+def _resolve(target: str) -> Tuple[object, str]:
+    module_name, qualname = target.split(":")
+    owner = importlib.import_module(module_name)
+    parts = qualname.split(".")
+    for part in parts[:-1]:
+        owner = getattr(owner, part)
+    return owner, parts[-1]
+
+
+class CanaryInstallation:
+    """
+    Live canary wrappers for the TARGETS of a generated patch.
+
+    Runs the patch's apply_* function to build the patched callables,
+    then puts the originals back behind CanaryRollout.wrap().
+    """
+
+    def __init__(self, patch_code: str, rollout: CanaryRollout):
+        self.rollout = rollout
+        self.installed: List[Tuple[object, str, Callable, Callable]] = []
+
+        namespace: Dict = {}
+        exec(compile(patch_code, f"<canary {rollout.patch_key}>", "exec"), namespace)
+
+        apply_fns = [
+            fn for name, fn in namespace.items()
+            if name.startswith("apply_") and callable(fn)
+        ]
+        targets = namespace.get("TARGETS", [])
+        if not apply_fns or not targets:
+            raise ValueError("Patch has no TARGETS to canary")
+
+        originals = {}
+        for spec in targets:
+            try:
+                owner, name = _resolve(spec["target"])
+                originals[spec["target"]] = (owner, name, getattr(owner, name))
+            except (ImportError, AttributeError, ValueError):
+                continue
+
+        apply_fns[0]()
+
+        for target, (owner, name, original) in originals.items():
+            patched = getattr(owner, name)
+            if patched is original:
+                continue
+            setattr(owner, name, rollout.wrap(original, patched))
+            self.installed.append((owner, name, original, patched))
+
+        if not self.installed:
+            raise ValueError("Patch installed no canary targets")
+
+        # Memo caches of the patched path, for scoring on measured hit rate
+        self.caches = [
+            patched.cache for _, _, _, patched in self.installed
+            if hasattr(patched, "cache")
+        ]
+
+    def promote(self):
+        """Serve the patched path to all traffic."""
+        for owner, name, _, patched in self.installed:
+            setattr(owner, name, patched)
+
+    def restore(self):
+        """Serve the original path to all traffic."""
+        for owner, name, original, _ in self.installed:
+            setattr(owner, name, original)
@@ -0,0 +1,162 @@
+"""
+Capture Pipeline - Snapshot capture off the event loop
+The loop hands raw state to a bounded queue; a thread does the rest.
+
+monitor.capture() normalizes the basin, reads the git hash, evicts old
+history and runs every capture listener and subscriber (canary arms,
+regression guard, shared-store mirroring, SSE diffing). None of that
+belongs on the event loop that serves requests. Here the coroutine only
+does a non-blocking put of the raw state; a dedicated thread normalizes
+and captures. When capture falls behind, the oldest queued state is
+dropped (health should reflect the newest one) and counted.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+_STOP = object()
+
+
+def normalize_basin(basin_coords, dims: int = 64) -> np.ndarray:
+    """Unit-norm basin; a zero vector becomes the first basis vector."""
+    basin = np.asarray(basin_coords, dtype=float)
+    norm = np.linalg.norm(basin)
+    if norm > 0:
+        return basin / norm
+
+    basin = np.zeros(dims)
+    basin[0] = 1.0
+    return basin
+
+
+class CapturePipeline:
+    """
+    Bounded hand-off from the event loop to a capture thread.
+
+    Usage:
+        pipeline = CapturePipeline(monitor, on_captured=report).start()
+
+        # In the monitoring coroutine (microseconds, never blocks)
+        pipeline.submit(state)
+
+        pipeline.stats()    # depth, drops, wait/capture times
+        pipeline.stop()
+
+    `on_captured(snapshot)` runs on the capture thread, like the
+    monitor's own listeners.
+    """
+
+    def __init__(self,
+                 monitor,
+                 maxsize: int = 8,
+                 dims: int = 64,
+                 on_captured: Optional[Callable] = None,
+                 clock=time.perf_counter):
+
+        self.monitor = monitor
+        self.dims = dims
+        self.on_captured = on_captured
+        self.clock = clock
+
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+
+        # Backpressure metrics
+        self.submitted = 0
+        self.dropped = 0
+        self.captured = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.wait_seconds = 0.0
+        self.capture_seconds = 0.0
+
+    def start(self) -> "CapturePipeline":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="snapshot-capture",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """Capture what is queued, then stop the thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP, timeout=timeout)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, state: Dict) -> bool:
+        """
+        Queue raw state for capture without blocking.
+
+        Returns False when an older queued state had to be dropped.
+        """
+        item = (self.clock(), state)
+        accepted = True
+
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            accepted = False
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+                return False
+
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return accepted
+
+    def join(self):
+        """Block until everything submitted so far has been captured."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+
+                queued_at, state = item
+                started = self.clock()
+                self.wait_seconds += started - queued_at
+
+                state = dict(state, basin_coords=normalize_basin(state["basin_coords"], self.dims))
+                snapshot = self.monitor.capture(state)
+
+                self.capture_seconds += self.clock() - started
+                self.captured += 1
+
+                if self.on_captured:
+                    self.on_captured(snapshot)
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Capture pipeline error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._thread is not None,
+            "depth": self._queue.qsize(),
+            "max_depth": self.max_depth,
+            "capacity": self._queue.maxsize,
+            "submitted": self.submitted,
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "avg_wait_ms": self.wait_seconds / self.captured * 1000 if self.captured else 0.0,
+            "avg_capture_ms": self.capture_seconds / self.captured * 1000 if self.captured else 0.0
+        }
@@ -0,0 +1,299 @@
+"""
+Checkpoint - Periodic incremental checkpoints and warm restart
+The monitor picks up where it left off instead of starting empty.
+
+Without a checkpoint, a restarted monitor reports healthy until ten new
+snapshots arrive and takes a new baseline from whatever it sees first.
+Here snapshots are appended to an NDJSON log (only those captured since
+the previous checkpoint; fsync'd), and a small meta file with the
+baseline, sequence counter and healer trigger backoff is replaced
+atomically. When the log outgrows the history it is rewritten
+(tmp + rename). load() restores history and baseline, so detection is
+live from the first capture after a restart.
+
+The meta file doubles as a footer for tools: it carries the latest
+health and the byte offset of the last TAIL_LINES log lines, so the
+CLI can answer `status` without parsing any history (see healing_cli).
+
+Severity transition state is deliberately not restored: a degradation
+still present after the restart is reported again as a transition, so
+the autonomous loop reacts to it.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from geometric_health_monitor import GeometricSnapshot
+
+CHECKPOINT_VERSION = 1
+
+META_FILE = "meta.json"
+SNAPSHOTS_FILE = "snapshots.ndjson"
+
+# Log lines indexed by meta["tail_offset"] (enough for health and trends)
+TAIL_LINES = 50
+
+
+class Checkpointer:
+    """
+    Incremental monitor/healer checkpoints in a directory.
+
+    Usage:
+        checkpoint = Checkpointer("./self_healing_state/checkpoint", monitor, healer)
+        checkpoint.load()                          # on start
+        task = asyncio.create_task(checkpoint.run())
+        ...
+        checkpoint.save()                          # on stop
+
+    A process taking over a log another process wrote, with a monitor
+    that already holds the history (e.g. a new leader mirroring shared
+    snapshots), calls resume() instead of load().
+    """
+
+    def __init__(self,
+                 directory: str,
+                 monitor,
+                 healer=None,
+                 interval_seconds: float = 60.0,
+                 compact_factor: int = 2,
+                 max_age_seconds: Optional[float] = 24 * 3600):
+
+        self.directory = directory
+        self.monitor = monitor
+        self.healer = healer
+        self.interval_seconds = interval_seconds
+        self.compact_factor = compact_factor
+        self.max_age_seconds = max_age_seconds
+
+        self.checkpointed_seq = 0
+        self.log_lines = 0
+        self.saves = 0
+        self._lock = threading.Lock()
+
+        # Byte offsets of the last TAIL_LINES lines, and the log size
+        self._offsets: deque = deque(maxlen=TAIL_LINES)
+        self._log_size = 0
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.directory, META_FILE)
+
+    @property
+    def snapshots_path(self) -> str:
+        return os.path.join(self.directory, SNAPSHOTS_FILE)
+
+    # ---- save ----
+
+    def save(self) -> int:
+        """Write snapshots captured since the last checkpoint; returns how many."""
+        with self._lock:
+            return self._save()
+
+    def _save(self) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Copy first: capture may run on another thread
+        snapshots = list(self.monitor.snapshots)
+        new = [s for s in snapshots if s.seq > self.checkpointed_seq]
+
+        if self.log_lines + len(new) > self.compact_factor * self.monitor.history_size:
+            self._rewrite(snapshots)
+        elif new:
+            if not self._log_size and os.path.exists(self.snapshots_path):
+                self._log_size = os.path.getsize(self.snapshots_path)
+            with open(self.snapshots_path, "ab") as f:
+                f.write(self._encode(new))
+                f.flush()
+                os.fsync(f.fileno())
+            self.log_lines += len(new)
+
+        if snapshots:
+            self.checkpointed_seq = max(self.checkpointed_seq, snapshots[-1].seq)
+        self._write_meta(snapshots)
+        self.saves += 1
+        return len(new)
+
+    def _encode(self, snapshots: List[GeometricSnapshot]) -> bytes:
+        """NDJSON bytes; indexes each line's offset as it goes."""
+        lines = []
+        for snapshot in snapshots:
+            line = (json.dumps(snapshot.to_dict()) + "\n").encode("utf-8")
+            self._offsets.append(self._log_size)
+            self._log_size += len(line)
+            lines.append(line)
+        return b"".join(lines)
+
+    def _rewrite(self, snapshots: List[GeometricSnapshot]):
+        """Compact the log to the monitor's current history."""
+        self._offsets.clear()
+        self._log_size = 0
+
+        tmp_path = f"{self.snapshots_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._encode(snapshots))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshots_path)
+        self.log_lines = len(snapshots)
+
+    def _write_meta(self, snapshots: List[GeometricSnapshot]):
+        baseline = self.monitor.baseline_basin
+        latest = snapshots[-1] if snapshots else None
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "saved_at": time.time(),
+            "checkpointed_seq": self.checkpointed_seq,
+            "next_seq": self.monitor.next_seq,
+            "log_lines": self.log_lines,
+            "phi_min": self.monitor.phi_min,
+            "basin_drift_max": self.monitor.basin_drift_max,
+            "baseline_basin": baseline.tolist() if baseline is not None else None,
+            "triggers": self.healer.triggers.to_dict() if self.healer is not None else {},
+            # Footer for the CLI
+            "count": len(snapshots),
+            "tail_offset": self._offsets[0] if self._offsets else 0,
+            "latest": {
+                "seq": latest.seq,
+                "timestamp": latest.timestamp.isoformat(),
+                "phi": latest.phi,
+                "regime": latest.regime
+            } if latest else None,
+            "health": self.monitor.check_health()
+        }
+
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, default=float)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.meta_path)
+
+    # ---- load ----
+
+    def _read_meta(self) -> Optional[Dict]:
+        if not os.path.exists(self.meta_path):
+            return None
+
+        with open(self.meta_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("version") != CHECKPOINT_VERSION:
+            print(f"⚠️  Ignoring checkpoint version {meta.get('version')}")
+            return None
+        return meta
+
+    def resume(self) -> int:
+        """
+        Continue the existing log without touching the monitor.
+
+        Only snapshots after the footer's checkpointed_seq are appended
+        by the next save. Returns that seq.
+        """
+        meta = self._read_meta()
+        with self._lock:
+            self._index_log()
+            if meta is not None:
+                self.checkpointed_seq = max(self.checkpointed_seq,
+                                            meta.get("checkpointed_seq", 0))
+        return self.checkpointed_seq
+
+    def load(self) -> int:
+        """Restore monitor (and healer backoff) state; returns snapshots restored."""
+        meta = self._read_meta()
+        if meta is None:
+            return 0
+
+        snapshots = self._read_log()
+        if self.max_age_seconds is not None:
+            cutoff = datetime.now() - timedelta(seconds=self.max_age_seconds)
+            snapshots = [s for s in snapshots if s.timestamp >= cutoff]
+        snapshots = snapshots[-self.monitor.history_size:]
+
+        monitor = self.monitor
+        monitor.phi_min = meta.get("phi_min", monitor.phi_min)
+        monitor.basin_drift_max = meta.get("basin_drift_max", monitor.basin_drift_max)
+        if meta.get("baseline_basin") is not None:
+            monitor.baseline_basin = np.array(meta["baseline_basin"])
+        monitor.snapshots = snapshots
+        monitor.next_seq = max(
+            meta.get("next_seq", 1),
+            snapshots[-1].seq + 1 if snapshots else 1,
+            monitor.next_seq
+        )
+
+        if self.healer is not None and meta.get("triggers"):
+            self.healer.triggers.restore(meta["triggers"],
+                                         elapsed_seconds=time.time() - meta["saved_at"])
+
+        self.checkpointed_seq = max(meta.get("checkpointed_seq", 0),
+                                    snapshots[-1].seq if snapshots else 0)
+        return len(snapshots)
+
+    def _index_log(self) -> List[bytes]:
+        """Complete log lines, indexed for the footer; a torn final line is cut off."""
+        self._offsets.clear()
+        self._log_size = 0
+        self.log_lines = 0
+
+        if not os.path.exists(self.snapshots_path):
+            return []
+
+        with open(self.snapshots_path, "rb") as f:
+            data = f.read()
+
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            # Crash mid-append: drop the partial line so appends stay aligned
+            with open(self.snapshots_path, "r+b") as f:
+                f.truncate(end)
+
+        lines = data[:end].splitlines(keepends=True)
+        for line in lines:
+            self._offsets.append(self._log_size)
+            self._log_size += len(line)
+
+        self.log_lines = len(lines)
+        return lines
+
+    def _read_log(self) -> List[GeometricSnapshot]:
+        """Snapshots in the log, oldest first."""
+        by_seq: Dict[int, GeometricSnapshot] = {}
+
+        for line in self._index_log():
+            try:
+                snapshot = GeometricSnapshot.from_dict(json.loads(line))
+            except (ValueError, KeyError) as e:
+                print(f"⚠️  Skipping bad checkpoint line: {e}")
+                continue
+            by_seq[snapshot.seq] = snapshot
+
+        return [by_seq[seq] for seq in sorted(by_seq)]
+
+    # ---- periodic ----
+
+    async def run(self, interval_seconds: Optional[float] = None):
+        """Checkpoint every `interval_seconds` (file I/O off the event loop)."""
+        interval = interval_seconds or self.interval_seconds
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.save)
+            except Exception as e:
+                print(f"❌ Checkpoint error: {e}")
+
+    def to_dict(self) -> Dict:
+        return {
+            "directory": self.directory,
+            "checkpointed_seq": self.checkpointed_seq,
+            "log_lines": self.log_lines,
+            "saves": self.saves
+        }
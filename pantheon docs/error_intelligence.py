@@ -0,0 +1,316 @@
+"""
+Error Intelligence - Exception fingerprinting for targeted error healing
+Hooks logging and the interpreter's exception handlers, fingerprints
+tracebacks by normalized frames, and counts them per time window.
+
+Counting uses a bounded Space-Saving top-K per window, so memory stays
+O(k × windows) however many distinct errors occur. The healer reads the
+top fingerprints to patch only the functions that actually raise.
+
+With several server workers only the leader runs the healer. Followers
+hook their own exceptions too and hand the counts over with drain();
+the leader adds them with merge().
+"""
+
+import hashlib
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sampling_profiler import is_app_code
+
+# LogRecord attribute marking errors already handled (and counted) by a
+# healing patch; the logging hook skips them so they don't inflate their
+# own fingerprint
+HANDLED_ATTR = "qig_handled"
+
+TRANSIENT_EXCEPTIONS = {
+    "builtins.ConnectionError",
+    "builtins.ConnectionResetError",
+    "builtins.ConnectionRefusedError",
+    "builtins.ConnectionAbortedError",
+    "builtins.BrokenPipeError",
+    "builtins.TimeoutError",
+    "asyncio.exceptions.TimeoutError",
+    "socket.timeout",
+}
+
+
+@dataclass
+class ErrorFingerprint:
+    """Aggregated occurrences of one normalized traceback."""
+    fingerprint: str
+    exc_type: str
+    origin: str                  # module:qualname of innermost app frame
+    frames: List[str]
+    message: str
+    count: int = 0
+    overestimate: int = 0        # Space-Saving error bound
+    first_seen: float = 0.0
+    last_seen: float = 0.0
+
+    @property
+    def transient(self) -> bool:
+        return self.exc_type in TRANSIENT_EXCEPTIONS
+
+    def to_dict(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "exc_type": self.exc_type,
+            "origin": self.origin,
+            "frames": self.frames,
+            "message": self.message,
+            "count": self.count,
+            "overestimate": self.overestimate,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "transient": self.transient
+        }
+
+
+def normalize_traceback(exc_type, tb) -> Tuple[List[str], Optional[str]]:
+    """
+    Normalized frames (module:qualname, no line numbers) and the origin.
+
+    Line numbers and addresses are dropped so the same failure keeps its
+    fingerprint across unrelated edits to the file.
+    """
+    frames = []
+    origin = None
+
+    while tb is not None:
+        frame = tb.tb_frame
+        code = frame.f_code
+        name = f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+        frames.append(name)
+        if is_app_code(code.co_filename):
+            origin = name
+        tb = tb.tb_next
+
+    return frames, origin
+
+
+def exception_name(exc_type) -> str:
+    return f"{exc_type.__module__}.{exc_type.__qualname__}"
+
+
+def fingerprint(exc_type_name: str, frames: List[str]) -> str:
+    payload = "|".join([exc_type_name] + frames)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+class TopKCounter:
+    """Space-Saving heavy-hitters counter with fixed capacity."""
+
+    def __init__(self, capacity: int = 50):
+        self.capacity = capacity
+        self.items: Dict[str, ErrorFingerprint] = {}
+
+    def add(self, key: str, make: Callable[[], ErrorFingerprint], now: float,
+            count: int = 1) -> ErrorFingerprint:
+        item = self.items.get(key)
+
+        if item is None:
+            item = make()
+            if len(self.items) >= self.capacity:
+                # Replace the minimum; inherit its count as overestimate
+                victim = min(self.items.values(), key=lambda i: i.count)
+                del self.items[victim.fingerprint]
+                item.count = victim.count
+                item.overestimate = victim.count
+            item.first_seen = now
+            self.items[key] = item
+
+        item.count += count
+        item.last_seen = now
+        return item
+
+    def top(self, n: int) -> List[ErrorFingerprint]:
+        return sorted(self.items.values(), key=lambda i: i.count, reverse=True)[:n]
+
+
+class ErrorFingerprintHandler(logging.Handler):
+    """logging handler that feeds records carrying exc_info (unless handled)."""
+
+    def __init__(self, intel: "ErrorIntelligence"):
+        super().__init__(level=logging.ERROR)
+        self.intel = intel
+
+    def emit(self, record: logging.LogRecord):
+        if getattr(record, HANDLED_ATTR, False):
+            return
+        if record.exc_info and record.exc_info[0] is not None:
+            self.intel.record(*record.exc_info)
+
+
+class ErrorIntelligence:
+    """
+    Windowed top-K exception fingerprints.
+
+    Usage:
+        intel = ErrorIntelligence(k=50, window_seconds=300)
+        intel.install()              # logging + sys/threading/asyncio hooks
+
+        for fp in intel.top(5):
+            print(fp.origin, fp.exc_type, fp.count)
+    """
+
+    def __init__(self,
+                 k: int = 50,
+                 window_seconds: float = 300.0,
+                 windows: int = 12,
+                 clock: Callable[[], float] = time.time):
+
+        self.k = k
+        self.window_seconds = window_seconds
+        self.clock = clock
+
+        self.windows: deque = deque(maxlen=windows)  # (start, TopKCounter)
+        self._outbox = TopKCounter(k)                 # counted since drain()
+        self._lock = threading.Lock()
+
+        self._handler: Optional[ErrorFingerprintHandler] = None
+        self._prev_excepthook = None
+        self._prev_threading_hook = None
+        self._loops: List[Tuple[object, Optional[Callable]]] = []  # (loop, previous handler)
+
+    def record(self, exc_type, exc_value, tb) -> ErrorFingerprint:
+        """Fingerprint and count one exception."""
+        frames, origin = normalize_traceback(exc_type, tb)
+        type_name = exception_name(exc_type)
+        key = fingerprint(type_name, frames)
+        now = self.clock()
+
+        def make():
+            return ErrorFingerprint(
+                fingerprint=key,
+                exc_type=type_name,
+                origin=origin or (frames[-1] if frames else "?"),
+                frames=frames,
+                message=str(exc_value)
+            )
+
+        with self._lock:
+            self._outbox.add(key, make, now)
+            return self._window(now).add(key, make, now)
+
+    def drain(self) -> List[Dict]:
+        """Fingerprints counted since the previous drain, for the leader to merge()."""
+        with self._lock:
+            outbox, self._outbox = self._outbox, TopKCounter(self.k)
+        return [fp.to_dict() for fp in outbox.top(self.k)]
+
+    def merge(self, fingerprints: List[Dict]):
+        """Add fingerprints another worker drained (ErrorFingerprint.to_dict())."""
+        now = self.clock()
+
+        with self._lock:
+            counter = self._window(now)
+            for data in fingerprints:
+                def make(data=data):
+                    return ErrorFingerprint(
+                        fingerprint=data["fingerprint"],
+                        exc_type=data["exc_type"],
+                        origin=data["origin"],
+                        frames=list(data["frames"]),
+                        message=data["message"]
+                    )
+                counter.add(data["fingerprint"], make, now, count=data["count"])
+
+    def _window(self, now: float) -> TopKCounter:
+        """Counter for the current window (caller holds the lock)."""
+        if not self.windows or now - self.windows[-1][0] >= self.window_seconds:
+            self.windows.append((now, TopKCounter(self.k)))
+        return self.windows[-1][1]
+
+    def top(self, n: int = 10, windows: Optional[int] = None) -> List[ErrorFingerprint]:
+        """Top fingerprints merged over the most recent `windows` windows."""
+        with self._lock:
+            recent = list(self.windows)[-windows:] if windows else list(self.windows)
+
+        merged: Dict[str, ErrorFingerprint] = {}
+        for _, counter in recent:
+            for item in counter.items.values():
+                total = merged.get(item.fingerprint)
+                if total is None:
+                    merged[item.fingerprint] = ErrorFingerprint(**{
+                        **item.__dict__, "frames": list(item.frames)
+                    })
+                else:
+                    total.count += item.count
+                    total.overestimate += item.overestimate
+                    total.first_seen = min(total.first_seen, item.first_seen)
+                    total.last_seen = max(total.last_seen, item.last_seen)
+
+        return sorted(merged.values(), key=lambda i: i.count, reverse=True)[:n]
+
+    def to_dict(self, n: int = 10) -> Dict:
+        return {
+            "window_seconds": self.window_seconds,
+            "windows": len(self.windows),
+            "top": [fp.to_dict() for fp in self.top(n)]
+        }
+
+    # ------------------------------------------------------------------
+    # Hooks
+    # ------------------------------------------------------------------
+
+    def install(self, logger: Optional[logging.Logger] = None):
+        """Hook logging, sys.excepthook and threading.excepthook."""
+        if self._handler is not None:
+            return
+
+        self._handler = ErrorFingerprintHandler(self)
+        (logger or logging.getLogger()).addHandler(self._handler)
+
+        self._prev_excepthook = sys.excepthook
+
+        def excepthook(exc_type, exc_value, tb):
+            self.record(exc_type, exc_value, tb)
+            self._prev_excepthook(exc_type, exc_value, tb)
+
+        sys.excepthook = excepthook
+
+        self._prev_threading_hook = threading.excepthook
+
+        def threading_hook(args):
+            if args.exc_type is not None:
+                self.record(args.exc_type, args.exc_value, args.exc_traceback)
+            self._prev_threading_hook(args)
+
+        threading.excepthook = threading_hook
+
+    def install_asyncio(self, loop):
+        """Hook an event loop's exception handler (unhandled task errors)."""
+        previous = loop.get_exception_handler()
+
+        def handler(loop, context):
+            exc = context.get("exception")
+            if exc is not None:
+                self.record(type(exc), exc, exc.__traceback__)
+            if previous is not None:
+                previous(loop, context)
+            else:
+                loop.default_exception_handler(context)
+
+        loop.set_exception_handler(handler)
+        self._loops.append((loop, previous))
+
+    def uninstall(self, logger: Optional[logging.Logger] = None):
+        """Remove logging/sys/threading hooks and restore hooked event loops."""
+        for loop, previous in reversed(self._loops):
+            if not loop.is_closed():
+                loop.set_exception_handler(previous)
+        self._loops = []
+
+        if self._handler is None:
+            return
+
+        (logger or logging.getLogger()).removeHandler(self._handler)
+        sys.excepthook = self._prev_excepthook
+        threading.excepthook = self._prev_threading_hook
+        self._handler = None
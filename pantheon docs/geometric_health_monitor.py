@@ -6,9 +6,10 @@ Measures system geometry in real-time, detects degradation.
 """
 
 import numpy as np
+import bisect
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import json
 import os
 
@@ -33,8 +34,15 @@ class GeometricSnapshot:
     avg_latency_ms: float
     memory_mb: float
     
+    # Canary arm that produced this measurement ("control" | "canary")
+    variant: str = "control"
+    
+    # Monotonic capture sequence number (pagination cursor)
+    seq: int = 0
+    
     def to_dict(self):
         return {
+            "seq": self.seq,
             "timestamp": self.timestamp.isoformat(),
             "phi": self.phi,
             "kappa_eff": self.kappa_eff,
@@ -47,7 +55,48 @@ class GeometricSnapshot:
             "module_name": self.module_name,
             "error_rate": self.error_rate,
             "avg_latency_ms": self.avg_latency_ms,
-            "memory_mb": self.memory_mb
+            "memory_mb": self.memory_mb,
+            "variant": self.variant
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict, seq: int = 0) -> "GeometricSnapshot":
+        """Inverse of to_dict(); `seq` is used for records saved without one."""
+        return cls(
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            phi=data["phi"],
+            kappa_eff=data["kappa_eff"],
+            basin_coords=np.array(data["basin_coords"]),
+            confidence=data["confidence"],
+            surprise=data["surprise"],
+            agency=data["agency"],
+            regime=data["regime"],
+            code_hash=data["code_hash"],
+            module_name=data["module_name"],
+            error_rate=data["error_rate"],
+            avg_latency_ms=data["avg_latency_ms"],
+            memory_mb=data["memory_mb"],
+            variant=data.get("variant", "control"),
+            seq=data.get("seq", seq)
+        )
+
+@dataclass
+class HealthEvent:
+    """Severity/issue transition emitted by capture()."""
+    timestamp: datetime
+    previous_severity: str
+    severity: str
+    issue_types: List[str]
+    health: Dict
+    snapshot: GeometricSnapshot
+    
+    def to_dict(self):
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "previous_severity": self.previous_severity,
+            "severity": self.severity,
+            "issue_types": self.issue_types,
+            "issues": self.health["issues"]
         }
 
 class GeometricHealthMonitor:
@@ -64,19 +113,136 @@ class GeometricHealthMonitor:
         health = monitor.check_health()
         if health["degraded"]:
             trigger_healing(health)
+        
+        # Or react to transitions as they happen
+        unsubscribe = monitor.subscribe(lambda event: print(event.severity))
+        
+        # Or see every snapshot
+        remove = monitor.on_capture(lambda snapshot: print(snapshot.phi))
     """
     
     def __init__(self, 
                  phi_min: float = 0.65,
                  basin_drift_max: float = 2.0,
-                 history_size: int = 1000):
+                 history_size: int = 1000,
+                 memory_growth_max: float = 1.0,
+                 memory_window: int = 30,
+                 git_hash_ttl: float = 60.0):
         
         self.phi_min = phi_min
         self.basin_drift_max = basin_drift_max
         self.history_size = history_size
+        self.memory_growth_max = memory_growth_max  # MB per snapshot
+        self.memory_window = memory_window
+        self.git_hash_ttl = git_hash_ttl  # seconds between `git rev-parse` runs
         
         self.snapshots: List[GeometricSnapshot] = []
+        self.next_seq = 1
         self.baseline_basin: Optional[np.ndarray] = None
+        self._git_hash: Optional[str] = None
+        self._git_hash_at = 0.0
+        
+        # Exported cache counters (see memo_cache.MemoCache.stats)
+        self._cache_sources: Dict[str, Callable[[], Dict]] = {}
+        self.cache_stats: Dict[str, Dict] = {}
+        
+        # Per-stage timings drained each capture (see stage_metrics.StageRecorder)
+        self._stage_sources: Dict[str, Callable[[], Dict]] = {}
+        self.stage_stats: Dict[str, Dict] = {}
+        
+        # Transition subscribers
+        self._subscribers: List[Callable[[HealthEvent], None]] = []
+        self.last_severity = "normal"
+        self.last_issue_types: List[str] = []
+        
+        # Per-snapshot listeners
+        self._capture_listeners: List[Callable[[GeometricSnapshot], None]] = []
+    
+    def subscribe(self, callback: Callable[[HealthEvent], None]) -> Callable[[], None]:
+        """
+        Register a callback for severity/issue-type transitions.
+        
+        The callback runs synchronously inside capture(), on whichever
+        thread called it, so it should only hand the event off
+        (e.g. loop.call_soon_threadsafe). Returns an unsubscribe function.
+        """
+        self._subscribers.append(callback)
+        return lambda: self.unsubscribe(callback)
+    
+    def unsubscribe(self, callback: Callable[[HealthEvent], None]):
+        """Remove a transition callback."""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def on_capture(self, callback: Callable[[GeometricSnapshot], None]) -> Callable[[], None]:
+        """
+        Register a callback run with every captured snapshot.
+        
+        Same threading rules as subscribe(). Returns a remove function.
+        """
+        self._capture_listeners.append(callback)
+        return lambda: self.remove_capture_listener(callback)
+    
+    def remove_capture_listener(self, callback: Callable[[GeometricSnapshot], None]):
+        """Remove a per-snapshot callback."""
+        if callback in self._capture_listeners:
+            self._capture_listeners.remove(callback)
+    
+    def register_cache_stats(self, name: str, stats_fn: Callable[[], Dict]):
+        """
+        Export a cache's hit/miss/eviction counters.
+        
+        `stats_fn` is polled on every capture(); latest values are in
+        `cache_stats[name]`.
+        """
+        self._cache_sources[name] = stats_fn
+        self.cache_stats[name] = stats_fn()
+    
+    def unregister_cache_stats(self, name: str):
+        """Stop exporting a cache's counters."""
+        self._cache_sources.pop(name, None)
+        self.cache_stats.pop(name, None)
+    
+    def register_stage_stats(self, name: str, drain_fn: Callable[[], Dict]):
+        """
+        Ingest per-stage timings.
+        
+        `drain_fn` is called on every capture() and returns the window
+        since its previous call ({stream: {stage: stats}}); the latest
+        window is in `stage_stats[name]`.
+        """
+        self._stage_sources[name] = drain_fn
+    
+    def unregister_stage_stats(self, name: str):
+        """Stop ingesting a stage recorder."""
+        self._stage_sources.pop(name, None)
+        self.stage_stats.pop(name, None)
+    
+    def _emit_transitions(self, snapshot: GeometricSnapshot):
+        """Notify subscribers if severity or the set of issue types changed."""
+        health = self.check_health()
+        severity = health["severity"]
+        issue_types = health.get("issue_types", [])
+        
+        if severity == self.last_severity and issue_types == self.last_issue_types:
+            return
+        
+        event = HealthEvent(
+            timestamp=snapshot.timestamp,
+            previous_severity=self.last_severity,
+            severity=severity,
+            issue_types=issue_types,
+            health=health,
+            snapshot=snapshot
+        )
+        self.last_severity = severity
+        self.last_issue_types = issue_types
+        
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"❌ Health subscriber error: {e}")
         
     def capture(self, state: Dict) -> GeometricSnapshot:
         """
@@ -87,6 +253,7 @@ class GeometricHealthMonitor:
         - confidence, surprise, agency
         - error_rate, avg_latency_ms, memory_mb
         - module_name (e.g., "geometric_search")
+        - variant (optional): canary arm, "control" by default
         """
         
         snapshot = GeometricSnapshot(
@@ -102,9 +269,23 @@ class GeometricHealthMonitor:
             module_name=state.get("module_name", "unknown"),
             error_rate=state["error_rate"],
             avg_latency_ms=state["avg_latency_ms"],
-            memory_mb=state["memory_mb"]
+            memory_mb=state["memory_mb"],
+            variant=state.get("variant", "control"),
+            seq=self.next_seq
         )
         
+        return self.ingest(snapshot)
+    
+    def ingest(self, snapshot: GeometricSnapshot) -> GeometricSnapshot:
+        """
+        Store an already-built snapshot (keeps its seq).
+        
+        capture() builds and ingests; followers of a shared store ingest
+        snapshots captured by the leader process. Listeners and
+        subscribers fire either way.
+        """
+        self.next_seq = max(self.next_seq, snapshot.seq + 1)
+        
         # Store
         self.snapshots.append(snapshot)
         if len(self.snapshots) > self.history_size:
@@ -114,8 +295,44 @@ class GeometricHealthMonitor:
         if self.baseline_basin is None:
             self.baseline_basin = snapshot.basin_coords.copy()
         
+        for name, stats_fn in self._cache_sources.items():
+            try:
+                self.cache_stats[name] = stats_fn()
+            except Exception as e:
+                print(f"❌ Cache stats error ({name}): {e}")
+        
+        for name, drain_fn in self._stage_sources.items():
+            try:
+                self.stage_stats[name] = drain_fn()
+            except Exception as e:
+                print(f"❌ Stage stats error ({name}): {e}")
+        
+        for callback in list(self._capture_listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"❌ Capture listener error: {e}")
+        
+        if self._subscribers:
+            self._emit_transitions(snapshot)
+        
         return snapshot
     
+    def snapshots_after(self, after_seq: Optional[int] = None,
+                        limit: int = 100) -> List[GeometricSnapshot]:
+        """
+        Page of snapshots by sequence number.
+        
+        With `after_seq`, the oldest `limit` snapshots with seq > after_seq
+        (pass the last seq received to get the next page); without it,
+        the most recent `limit`.
+        """
+        if after_seq is None:
+            return self.snapshots[-limit:] if limit > 0 else []
+        
+        start = bisect.bisect_right(self.snapshots, after_seq, key=lambda s: s.seq)
+        return self.snapshots[start:start + limit]
+    
     def check_health(self) -> Dict:
         """
         Check system health.
@@ -124,11 +341,13 @@ class GeometricHealthMonitor:
             {
                 "healthy": bool,
                 "issues": List[str],
+                "issue_types": List[str],
                 "severity": "normal" | "warning" | "critical",
                 "metrics": {
                     "phi": float,
                     "basin_drift": float,
-                    "breakdown_count": int
+                    "breakdown_count": int,
+                    "memory_growth_mb": float
                 }
             }
         """
@@ -137,6 +356,7 @@ class GeometricHealthMonitor:
             return {
                 "healthy": True,
                 "issues": [],
+                "issue_types": [],
                 "severity": "normal",
                 "metrics": {}
             }
@@ -145,15 +365,18 @@ class GeometricHealthMonitor:
         current = self.snapshots[-1]
         
         issues = []
+        issue_types = []
         severity = "normal"
         
         # 1. Check Φ
         avg_phi = np.mean([s.phi for s in recent])
         if avg_phi < self.phi_min:
             issues.append(f"Φ degraded: {avg_phi:.3f} < {self.phi_min}")
+            issue_types.append("phi_degradation")
             severity = "critical"
         elif current.phi < self.phi_min * 1.1:
             issues.append(f"Φ declining: {current.phi:.3f}")
+            issue_types.append("phi_degradation")
             severity = "warning"
         
         # 2. Check basin drift
@@ -163,9 +386,11 @@ class GeometricHealthMonitor:
         )
         if basin_dist > self.basin_drift_max:
             issues.append(f"Basin drift: {basin_dist:.3f} > {self.basin_drift_max}")
+            issue_types.append("basin_drift")
             severity = "critical"
         elif basin_dist > self.basin_drift_max * 0.7:
             issues.append(f"Basin drifting: {basin_dist:.3f}")
+            issue_types.append("basin_drift")
             if severity == "normal":
                 severity = "warning"
         
@@ -174,36 +399,70 @@ class GeometricHealthMonitor:
         breakdown_count = regimes.count("breakdown")
         if breakdown_count > 3:
             issues.append(f"Frequent breakdowns: {breakdown_count}/10")
+            issue_types.append("breakdown")
             severity = "critical"
         
         # 4. Check performance
         if current.error_rate > 0.05:
             issues.append(f"High errors: {current.error_rate:.1%}")
+            issue_types.append("errors")
             severity = "critical"
         
         if current.avg_latency_ms > 2000:
             issues.append(f"High latency: {current.avg_latency_ms:.0f}ms")
+            issue_types.append("latency")
+            if severity == "normal":
+                severity = "warning"
+        
+        # 5. Check sustained memory growth (leaks, not spikes)
+        memory_growth = self._memory_growth()
+        if memory_growth > self.memory_growth_max:
+            issues.append(f"Memory growth: +{memory_growth:.1f}MB/snapshot")
+            issue_types.append("memory")
             if severity == "normal":
                 severity = "warning"
         
         return {
             "healthy": len(issues) == 0,
             "issues": issues,
+            "issue_types": issue_types,
             "severity": severity,
             "metrics": {
                 "phi": current.phi,
                 "basin_drift": basin_dist,
                 "breakdown_count": breakdown_count,
                 "error_rate": current.error_rate,
-                "latency_ms": current.avg_latency_ms
+                "latency_ms": current.avg_latency_ms,
+                "memory_mb": current.memory_mb,
+                "memory_growth_mb": memory_growth
             }
         }
     
+    def _memory_growth(self) -> float:
+        """
+        Sustained memory growth in MB per snapshot over `memory_window`.
+        
+        Returns the regression slope only when growth is sustained (at
+        least 70% of steps non-decreasing), else 0.0, so GC sawtooth and
+        one-off spikes don't count as leaks.
+        """
+        if len(self.snapshots) < self.memory_window:
+            return 0.0
+        
+        values = np.array([s.memory_mb for s in self.snapshots[-self.memory_window:]])
+        steps = np.diff(values)
+        
+        if np.mean(steps >= 0) < 0.7:
+            return 0.0
+        
+        slope = np.polyfit(np.arange(len(values)), values, 1)[0]
+        return float(max(slope, 0.0))
+    
     def get_trend(self, metric: str, window: int = 50) -> Dict:
         """
         Analyze trend for a metric.
         
-        metric: "phi" | "basin_drift" | "latency" | "errors"
+        metric: "phi" | "basin_drift" | "latency" | "errors" | "memory"
         
         Returns:
             {
@@ -229,6 +488,8 @@ class GeometricHealthMonitor:
             values = [s.avg_latency_ms for s in recent]
         elif metric == "errors":
             values = [s.error_rate for s in recent]
+        elif metric == "memory":
+            values = [s.memory_mb for s in recent]
         else:
             raise ValueError(f"Unknown metric: {metric}")
         
@@ -280,24 +541,12 @@ class GeometricHealthMonitor:
         self.baseline_basin = np.array(data["baseline_basin"]) if data["baseline_basin"] else None
         
         # Reconstruct snapshots
-        self.snapshots = []
-        for snap_dict in data["snapshots"]:
-            snapshot = GeometricSnapshot(
-                timestamp=datetime.fromisoformat(snap_dict["timestamp"]),
-                phi=snap_dict["phi"],
-                kappa_eff=snap_dict["kappa_eff"],
-                basin_coords=np.array(snap_dict["basin_coords"]),
-                confidence=snap_dict["confidence"],
-                surprise=snap_dict["surprise"],
-                agency=snap_dict["agency"],
-                regime=snap_dict["regime"],
-                code_hash=snap_dict["code_hash"],
-                module_name=snap_dict["module_name"],
-                error_rate=snap_dict["error_rate"],
-                avg_latency_ms=snap_dict["avg_latency_ms"],
-                memory_mb=snap_dict["memory_mb"]
-            )
-            self.snapshots.append(snapshot)
+        self.snapshots = [
+            GeometricSnapshot.from_dict(snap_dict, seq=i)
+            for i, snap_dict in enumerate(data["snapshots"], 1)
+        ]
+        
+        self.next_seq = self.snapshots[-1].seq + 1 if self.snapshots else 1
     
     def _fisher_distance(self, basin1: np.ndarray, basin2: np.ndarray) -> float:
         """Fisher-Rao distance (geodesic on unit sphere)."""
@@ -314,8 +563,12 @@ class GeometricHealthMonitor:
             return "breakdown"
     
     def _get_git_hash(self) -> str:
-        """Get current git commit hash."""
+        """Get current git commit hash (cached for `git_hash_ttl` seconds)."""
         import subprocess
+        import time
+        now = time.monotonic()
+        if self._git_hash is not None and now - self._git_hash_at < self.git_hash_ttl:
+            return self._git_hash
         try:
             result = subprocess.run(
                 ["git", "rev-parse", "HEAD"],
@@ -323,9 +576,15 @@ class GeometricHealthMonitor:
                 text=True,
                 timeout=1
             )
-            return result.stdout.strip()[:8]
+            self._git_hash = result.stdout.strip()[:8]
         except:
-            return "unknown"
+            self._git_hash = "unknown"
+        self._git_hash_at = now
+        return self._git_hash
+    
+    def invalidate_git_hash(self):
+        """Re-read the commit on the next capture (after a commit/revert)."""
+        self._git_hash = None
 
 
 # Example usage
@@ -0,0 +1,272 @@
+"""
+Healing CLI - Fast self-healing status for shells and health probes
+Reads the checkpoint footer and log tail; heavy imports only on demand.
+
+`status` answers from the checkpoint meta file alone (latest health is
+stored there on every checkpoint), `history` and `trends` read only the
+indexed tail of the snapshot log, and only `trends` / `export` import
+NumPy and the monitor. Without a checkpoint, the CLI falls back to
+parsing monitor_history.json (written by save_state()).
+
+`status` also checks how old the checkpoint is: a leader that died or
+hung stops writing it, and its last health must not read as current.
+
+Exit codes for `status`: 0 normal, 1 warning, 2 critical, 3 no state or
+stale state (older than --max-age).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+CHECKPOINT_DIR = "checkpoint"
+META_FILE = "meta.json"              # checkpoint.META_FILE
+SNAPSHOTS_FILE = "snapshots.ndjson"  # checkpoint.SNAPSHOTS_FILE
+
+SEVERITY_EXIT = {"normal": 0, "warning": 1, "critical": 2}
+NO_STATE_EXIT = 3
+STALE_EXIT = 3
+
+# Three missed checkpoints (Checkpointer interval_seconds defaults to 60)
+DEFAULT_MAX_AGE_SECONDS = 180.0
+
+BASIN_MODES = ("full", "none", "downsample")  # snapshot_stream.BASIN_MODES
+
+
+def read_meta(state_dir: str) -> Optional[Dict]:
+    """Checkpoint footer, or None without a checkpoint."""
+    try:
+        with open(os.path.join(state_dir, CHECKPOINT_DIR, META_FILE), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def read_tail(state_dir: str, meta: Dict, limit: int = 50) -> List[Dict]:
+    """Last `limit` snapshot records, read from meta["tail_offset"] on."""
+    path = os.path.join(state_dir, CHECKPOINT_DIR, SNAPSHOTS_FILE)
+    try:
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            offset = meta.get("tail_offset", 0)
+            if offset > size:
+                offset = 0    # log compacted since the meta was written
+            f.seek(max(0, offset - 1))
+            data = f.read()
+    except FileNotFoundError:
+        return []
+
+    if offset > 0:
+        # The byte before `offset` was read to check for a line boundary
+        data = data[1:] if data.startswith(b"\n") else data[data.find(b"\n") + 1:]
+
+    records = []
+    for line in data.split(b"\n")[-limit - 1:]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue    # empty or torn final line
+    return records[-limit:]
+
+
+def _load_monitor(state_dir: str, records: Optional[List[Dict]] = None, meta: Optional[Dict] = None):
+    """Monitor built from tail records, else the full checkpoint or saved history."""
+    from geometric_health_monitor import GeometricHealthMonitor, GeometricSnapshot
+
+    monitor = GeometricHealthMonitor()
+
+    if records is not None:
+        import numpy as np
+        monitor.snapshots = [GeometricSnapshot.from_dict(r) for r in records]
+        if meta and meta.get("baseline_basin") is not None:
+            monitor.baseline_basin = np.array(meta["baseline_basin"])
+        return monitor
+
+    if meta is not None:
+        from checkpoint import Checkpointer
+        Checkpointer(os.path.join(state_dir, CHECKPOINT_DIR), monitor,
+                     max_age_seconds=None).load()
+        return monitor
+
+    monitor.load_history(os.path.join(state_dir, "monitor_history.json"))
+    return monitor
+
+
+def _print_json(data):
+    json.dump(data, sys.stdout, indent=2, default=float)
+    sys.stdout.write("\n")
+
+
+def cli_main(argv: Optional[List[str]] = None) -> int:
+    """
+    CLI for self-healing management.
+
+    Usage:
+        python searchspace_self_healing.py status [--json] [--max-age 180]
+        python searchspace_self_healing.py heal
+        python searchspace_self_healing.py trends [--json]
+        python searchspace_self_healing.py history [--json]
+        python searchspace_self_healing.py export --format arrow -o snapshots.arrow
+    """
+
+    parser = argparse.ArgumentParser(description="SearchSpaceCollapse Self-Healing CLI")
+    parser.add_argument("command", choices=["status", "heal", "trends", "history", "export"])
+    parser.add_argument("--state-dir", default="./self_healing_state")
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE_SECONDS,
+                        help="status: seconds before saved state counts as stale (0: never)")
+    parser.add_argument("--format", default="ndjson",
+                        choices=["json", "ndjson", "arrow", "msgpack"],
+                        help="export: output format")
+    parser.add_argument("--basins", default="full", choices=BASIN_MODES,
+                        help="export: keep, drop or downsample basin coordinates")
+    parser.add_argument("--after-seq", type=int, default=None,
+                        help="export: only snapshots after this seq")
+    parser.add_argument("-o", "--output", default=None,
+                        help="export: output file (default stdout)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "heal":
+        print("\n🔧 MANUAL HEALING")
+        print("=" * 60)
+        print("This requires an active QIGChain instance.")
+        print("Use Python API instead:")
+        print()
+        print("  from searchspace_self_healing import SearchSpaceCollapseSelfHealing")
+        print("  healer = SearchSpaceCollapseSelfHealing(chain)")
+        print("  await healer.manual_heal()")
+        return 0
+
+    meta = read_meta(args.state_dir)
+
+    if meta is None and not os.path.exists(os.path.join(args.state_dir, "monitor_history.json")):
+        if args.json:
+            _print_json({"error": "no saved state"})
+        else:
+            print("⚠️  No saved state found. Run system first to generate state.")
+        return NO_STATE_EXIT
+
+    if args.command == "status":
+        if meta is not None and "health" in meta:
+            health = meta["health"]
+            as_of = meta["latest"]["timestamp"] if meta.get("latest") else None
+            saved_at = meta.get("saved_at")
+        else:
+            health = _load_monitor(args.state_dir).check_health()
+            as_of = None
+            saved_at = os.path.getmtime(os.path.join(args.state_dir, "monitor_history.json"))
+
+        age = time.time() - saved_at if saved_at is not None else None
+        stale = bool(args.max_age) and (age is None or age > args.max_age)
+        code = STALE_EXIT if stale else SEVERITY_EXIT.get(health["severity"], NO_STATE_EXIT)
+
+        if args.json:
+            _print_json(dict(health, as_of=as_of, age_seconds=age, stale=stale))
+            return code
+
+        print("\n📊 GEOMETRIC HEALTH STATUS")
+        print("=" * 60)
+        if stale:
+            saved = f"{age:.0f}s ago" if age is not None else "at an unknown time"
+            print(f"⚠️  STALE: state saved {saved} (max age {args.max_age:.0f}s)")
+        print(f"Status: {health['severity'].upper()}")
+        print(f"Healthy: {health['healthy']}")
+        if as_of:
+            print(f"As of: {as_of}")
+        if age is not None:
+            print(f"Saved: {age:.0f}s ago")
+
+        if health['issues']:
+            print("\nIssues:")
+            for issue in health['issues']:
+                print(f"  - {issue}")
+
+        print("\nMetrics:")
+        for key, value in health['metrics'].items():
+            print(f"  {key}: {value:.3f}")
+
+        return code
+
+    if args.command == "trends":
+        records = read_tail(args.state_dir, meta) if meta is not None else None
+        monitor = _load_monitor(args.state_dir, records, meta)
+        trends = {
+            "phi": monitor.get_trend("phi"),
+            "basin_drift": monitor.get_trend("basin_drift"),
+            "latency": monitor.get_trend("latency"),
+            "errors": monitor.get_trend("errors")
+        }
+
+        if args.json:
+            _print_json(trends)
+            return 0
+
+        print("\n📈 HEALTH TRENDS (last 50 snapshots)")
+        print("=" * 60)
+
+        for metric, trend in trends.items():
+            arrow = "↑" if trend["direction"] == "improving" else "↓" if trend["direction"] == "degrading" else "→"
+            print(f"{metric:15} {arrow} {trend['direction']:10} (slope: {trend['slope']:+.4f})")
+        return 0
+
+    if args.command == "history":
+        if meta is not None:
+            total = meta.get("count", 0)
+            recent = read_tail(args.state_dir, meta, limit=5)
+        else:
+            snapshots = _load_monitor(args.state_dir).snapshots
+            total = len(snapshots)
+            recent = [s.to_dict() for s in snapshots[-5:]]
+
+        if args.json:
+            _print_json({
+                "total": total,
+                "recent": [{k: v for k, v in r.items() if k != "basin_coords"} for r in recent]
+            })
+            return 0
+
+        print(f"\n📜 SNAPSHOT HISTORY")
+        print("=" * 60)
+        print(f"Total snapshots: {total}")
+
+        if recent:
+            print("\nRecent snapshots:")
+            for snap in recent:
+                print(f"  {snap['timestamp']} | Φ={snap['phi']:.3f} | regime={snap['regime']}")
+        return 0
+
+    # export: same serializers as /api/self-healing/snapshots
+    from snapshot_stream import iter_ndjson, snapshot_record
+    from snapshot_codec import encode_snapshots
+
+    monitor = _load_monitor(args.state_dir, meta=meta)
+    snapshots = monitor.snapshots_after(args.after_seq, len(monitor.snapshots))
+
+    if args.format in ("arrow", "msgpack"):
+        try:
+            chunks = [encode_snapshots(snapshots, args.format, basins=args.basins)]
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return 1
+    elif args.format == "ndjson":
+        chunks = iter_ndjson(snapshots, basins=args.basins)
+    else:
+        chunks = [json.dumps([snapshot_record(s, args.basins) for s in snapshots]).encode("utf-8")]
+
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+            print(f"✅ Exported {len(snapshots)} snapshots to {args.output} ({args.format})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli_main())
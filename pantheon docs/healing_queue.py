@@ -0,0 +1,331 @@
+"""
+Healing Queue - Durable job queue and worker pool for healing stages
+Generate → evaluate → apply | pr, each stage a persisted job.
+
+Jobs live in SQLite (stdlib), so work survives restarts: jobs that were
+running when the process died are re-queued by resume(). Workers claim the
+highest-priority pending job atomically; a stage's follow-up job is
+enqueued in the same transaction that completes it, so no work is lost
+between stages. Failures retry with exponential backoff up to
+max_attempts. Per-stage counts, wait time, run time and throughput are
+available from stats().
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+STAGES = ("generate", "evaluate", "apply", "pr")
+
+SEVERITY_PRIORITY = {
+    "critical": 2,
+    "warning": 1,
+    "normal": 0,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage TEXT NOT NULL,
+    key TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    error TEXT,
+    created REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority DESC, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (stage, key, status);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (status, finished_at);
+"""
+
+# (stage, payload) follow-ups returned by a stage handler
+FollowUps = Optional[List[Tuple[str, Dict]]]
+
+
+@dataclass
+class Job:
+    """One claimed unit of healing work."""
+    id: int
+    stage: str
+    key: Optional[str]
+    priority: int
+    payload: Dict
+    attempts: int
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "stage": self.stage,
+            "key": self.key,
+            "priority": self.priority,
+            "payload": self.payload,
+            "attempts": self.attempts
+        }
+
+
+class HealingQueue:
+    """
+    SQLite-backed priority job queue.
+
+    Usage:
+        jobs = HealingQueue("./self_healing_state/healing_queue.db")
+        jobs.enqueue("generate", {"severity": "critical"}, priority=2, key="abc")
+
+        job = jobs.claim()
+        jobs.complete(job.id, follow_ups=[("evaluate", {"key": "abc"})])
+        print(jobs.stats())
+    """
+
+    def __init__(self,
+                 filepath: Optional[str] = None,
+                 max_attempts: int = 3,
+                 retry_seconds: float = 5.0,
+                 clock: Callable[[], float] = time.time):
+
+        self.filepath = filepath
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+
+        if filepath:
+            directory = os.path.dirname(filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filepath or ":memory:", check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+
+        with self._lock, self._conn:
+            if filepath:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+        self.resumed = 0
+
+    def resume(self) -> int:
+        """
+        Re-queue jobs left running by a process that stopped.
+
+        Call once from the process that runs the workers (other
+        processes may only enqueue). Returns the number re-queued.
+        """
+        with self._lock, self._conn:
+            self.resumed = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', started_at = NULL WHERE status = 'running'"
+            ).rowcount
+        return self.resumed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def enqueue(self, stage: str, payload: Dict, priority: int = 0,
+                key: Optional[str] = None) -> int:
+        """Add a job. A pending/running job with the same (stage, key) is reused."""
+        with self._lock, self._conn:
+            return self._enqueue(stage, payload, priority, key)
+
+    def _enqueue(self, stage, payload, priority, key) -> int:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+
+        if key is not None:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE stage = ? AND key = ? AND status IN ('pending', 'running')",
+                (stage, key)
+            ).fetchone()
+            if row is not None:
+                return row["id"]
+
+        now = self.clock()
+        return self._conn.execute(
+            """INSERT INTO jobs (stage, key, priority, payload, max_attempts, created, available_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (stage, key, priority, json.dumps(payload, default=str), self.max_attempts, now, now)
+        ).lastrowid
+
+    def claim(self, stages: Optional[Sequence[str]] = None) -> Optional[Job]:
+        """Atomically take the highest-priority available job."""
+        now = self.clock()
+        stages = tuple(stages or STAGES)
+        placeholders = ", ".join("?" for _ in stages)
+
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"""SELECT * FROM jobs
+                    WHERE status = 'pending' AND available_at <= ? AND stage IN ({placeholders})
+                    ORDER BY priority DESC, id LIMIT 1""",
+                (now, *stages)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (now, row["id"])
+            )
+
+        return Job(
+            id=row["id"],
+            stage=row["stage"],
+            key=row["key"],
+            priority=row["priority"],
+            payload=json.loads(row["payload"]),
+            attempts=row["attempts"] + 1
+        )
+
+    def complete(self, job_id: int, follow_ups: FollowUps = None):
+        """Mark done and enqueue the next stage(s) in the same transaction."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT priority FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, error = NULL WHERE id = ?",
+                (self.clock(), job_id)
+            )
+            for stage, payload in follow_ups or []:
+                self._enqueue(stage, payload, row["priority"] if row else 0, payload.get("key"))
+
+    def fail(self, job_id: int, error: str):
+        """Retry with exponential backoff, or mark failed after max_attempts."""
+        now = self.clock()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return
+
+            if row["attempts"] >= row["max_attempts"]:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                    (now, error, job_id)
+                )
+            else:
+                delay = self.retry_seconds * 2 ** (row["attempts"] - 1)
+                self._conn.execute(
+                    """UPDATE jobs SET status = 'pending', started_at = NULL, error = ?,
+                              available_at = ? WHERE id = ?""",
+                    (error, now + delay, job_id)
+                )
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')"
+            ).fetchone()[0]
+
+    def stats(self, window_seconds: float = 3600.0) -> Dict:
+        """
+        Per-stage observability.
+
+        Returns:
+            {stage: {"pending", "running", "done", "failed",
+                     "wait_seconds", "run_seconds", "throughput_per_min"}}
+        """
+        since = self.clock() - window_seconds
+        result = {
+            stage: {"pending": 0, "running": 0, "done": 0, "failed": 0,
+                    "wait_seconds": None, "run_seconds": None, "throughput_per_min": 0.0}
+            for stage in STAGES
+        }
+
+        with self._lock:
+            for row in self._conn.execute(
+                "SELECT stage, status, COUNT(*) AS n FROM jobs GROUP BY stage, status"
+            ):
+                result[row["stage"]][row["status"]] = row["n"]
+
+            for row in self._conn.execute(
+                """SELECT stage, COUNT(*) AS n,
+                          AVG(started_at - created) AS wait, AVG(finished_at - started_at) AS run
+                   FROM jobs WHERE status = 'done' AND finished_at >= ? GROUP BY stage""",
+                (since,)
+            ):
+                stage = result[row["stage"]]
+                stage["wait_seconds"] = row["wait"]
+                stage["run_seconds"] = row["run"]
+                stage["throughput_per_min"] = row["n"] / (window_seconds / 60)
+
+        return result
+
+
+class WorkerPool:
+    """
+    asyncio workers draining a HealingQueue.
+
+    Handlers map stage → async fn(payload) returning follow-up
+    (stage, payload) jobs or None.
+
+    Usage:
+        pool = WorkerPool(jobs, {"generate": gen, "evaluate": ev, ...}, workers=2)
+        task = asyncio.create_task(pool.run())
+        pool.notify()   # after enqueue, to skip the poll delay
+    """
+
+    def __init__(self,
+                 queue: HealingQueue,
+                 handlers: Dict[str, Callable[[Dict], Awaitable[FollowUps]]],
+                 workers: int = 2,
+                 poll_seconds: float = 1.0):
+
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._wake: Optional[asyncio.Event] = None
+
+    def notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run(self):
+        """Run `workers` workers until cancelled."""
+        self._wake = asyncio.Event()
+        await asyncio.gather(*(self._worker() for _ in range(self.workers)))
+
+    async def run_until_idle(self):
+        """Drain available jobs (no waiting on backoff) and return."""
+        while True:
+            job = self.queue.claim(list(self.handlers))
+            if job is None:
+                return
+            await self._process(job)
+
+    async def _worker(self):
+        while True:
+            job = self.queue.claim(list(self.handlers))
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job)
+            # Follow-ups may be claimable right away by idle workers
+            self._wake.set()
+
+    async def _process(self, job: Job):
+        try:
+            follow_ups = await self.handlers[job.stage](job.payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Healing job {job.id} ({job.stage}) failed: {e}")
+            self.queue.fail(job.id, str(e))
+            return
+        self.queue.complete(job.id, follow_ups)
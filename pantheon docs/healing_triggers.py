@@ -0,0 +1,91 @@
+"""
+Healing Triggers - Debounce, cooldown and backoff for event-driven healing
+Decides when a severity-transition event should actually start a heal.
+
+Used by SelfHealingEngine.autonomous_loop, which reacts to events from
+GeometricHealthMonitor.subscribe() instead of polling on a fixed timer.
+"""
+
+import time
+from typing import Callable, Dict
+
+
+class TriggerPolicy:
+    """
+    Per-issue-type gate for healing attempts.
+
+    - debounce: wait for a burst of events to settle before acting
+    - cooldown: minimum gap between attempts for the same issue type
+    - backoff:  cooldown doubles after every attempt that didn't heal,
+                capped at max_backoff_seconds; resets on success
+
+    Usage:
+        policy = TriggerPolicy(cooldown_seconds=60)
+
+        if policy.ready("phi_degradation"):
+            result = await healer.check_and_heal()
+            policy.record_attempt("phi_degradation", result["healed"])
+    """
+
+    def __init__(self,
+                 debounce_seconds: float = 5.0,
+                 cooldown_seconds: float = 60.0,
+                 max_backoff_seconds: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+
+        self.debounce_seconds = debounce_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.clock = clock
+
+        self.failures: Dict[str, int] = {}
+        self.next_allowed: Dict[str, float] = {}
+
+    def ready(self, issue_type: str) -> bool:
+        """True if an attempt for this issue type is allowed now."""
+        return self.clock() >= self.next_allowed.get(issue_type, 0.0)
+
+    def delay(self, issue_type: str) -> float:
+        """Current wait for the issue type after a failed attempt."""
+        failures = self.failures.get(issue_type, 0)
+        return min(
+            self.cooldown_seconds * (2 ** failures),
+            self.max_backoff_seconds
+        )
+
+    def record_attempt(self, issue_type: str, healed: bool):
+        """Record an attempt and schedule the next allowed one."""
+        if healed:
+            self.failures[issue_type] = 0
+            wait = self.cooldown_seconds
+        else:
+            wait = self.delay(issue_type)
+            self.failures[issue_type] = self.failures.get(issue_type, 0) + 1
+
+        self.next_allowed[issue_type] = self.clock() + wait
+
+    def reset(self, issue_type: str):
+        """Forget history for an issue type (e.g. after recovery)."""
+        self.failures.pop(issue_type, None)
+        self.next_allowed.pop(issue_type, None)
+
+    def restore(self, state: Dict, elapsed_seconds: float = 0.0):
+        """
+        Reload to_dict() output (e.g. from a checkpoint).
+
+        `elapsed_seconds` since it was saved is taken off the waits.
+        """
+        now = self.clock()
+        for issue_type, entry in state.items():
+            self.failures[issue_type] = entry.get("failures", 0)
+            self.next_allowed[issue_type] = now + max(0.0, entry.get("wait_seconds", 0.0) - elapsed_seconds)
+
+    def to_dict(self) -> Dict:
+        now = self.clock()
+        return {
+            issue_type: {
+                "failures": self.failures.get(issue_type, 0),
+                "wait_seconds": max(0.0, allowed - now)
+            }
+            for issue_type, allowed in self.next_allowed.items()
+        }
@@ -0,0 +1,158 @@
+"""
+Health Broadcast - Server-sent events fan-out for the health dashboard
+One health computation per capture, however many tabs are open.
+
+While any client is connected, each capture() computes health once,
+diffs it against the last broadcast state and encodes the changed
+fields as a single SSE frame; the same bytes are then queued to every
+connected client. New clients (and clients too slow to keep up) first
+receive a full "state" frame, then "delta" frames; a severity change
+is sent as a "severity" frame carrying the issues. Idle connections
+get a keepalive comment.
+"""
+
+import asyncio
+import json
+from typing import Dict, Optional, Set
+
+# Fields broadcast to the dashboard (health["metrics"] keys + severity/issues)
+METRIC_FIELDS = ("phi", "basin_drift", "error_rate", "latency_ms", "memory_mb")
+
+MEDIA_TYPE = "text/event-stream"
+
+
+def sse_frame(event: str, data: Dict, event_id: Optional[int] = None) -> bytes:
+    """Encode one server-sent event."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":"), default=float))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+class _Client:
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+
+class HealthBroadcaster:
+    """
+    Push compact health deltas to all SSE clients.
+
+    Usage:
+        broadcaster = HealthBroadcaster(monitor)
+        broadcaster.attach(asyncio.get_running_loop())
+
+        @router.get("/stream")
+        async def stream():
+            return StreamingResponse(broadcaster.stream(), media_type=MEDIA_TYPE)
+    """
+
+    def __init__(self,
+                 monitor,
+                 queue_size: int = 64,
+                 keepalive_seconds: float = 15.0,
+                 precision: int = 4):
+
+        self.monitor = monitor
+        self.queue_size = queue_size
+        self.keepalive_seconds = keepalive_seconds
+        self.precision = precision
+
+        self.state: Dict = {}
+        self.seq = 0
+        self.computations = 0
+        self._clients: Set[_Client] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._detach = None
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Start listening to captures; frames are delivered on `loop`."""
+        self._loop = loop
+        self._detach = self.monitor.on_capture(self._on_capture)
+        return self.detach
+
+    def detach(self):
+        if self._detach is not None:
+            self._detach()
+            self._detach = None
+
+    def _snapshot_state(self, snapshot) -> Dict:
+        health = self.monitor.check_health()
+        self.computations += 1
+        metrics = health.get("metrics", {})
+
+        state = {
+            "timestamp": snapshot.timestamp.isoformat(),
+            "severity": health["severity"],
+            "issues": health["issues"]
+        }
+        for field in METRIC_FIELDS:
+            value = metrics.get(field)
+            state[field] = round(float(value), self.precision) if value is not None else None
+        return state
+
+    def _on_capture(self, snapshot):
+        # Runs in capture()'s thread; the loop only does the fan-out
+        if not self._clients:
+            self.state = {}    # recomputed when the next client connects
+            return
+
+        state = self._snapshot_state(snapshot)
+        previous, self.state = self.state, state
+        self.seq = getattr(snapshot, "seq", self.seq + 1)
+
+        if not previous:
+            frame = sse_frame("state", state, self.seq)
+        else:
+            delta = {k: v for k, v in state.items() if previous.get(k) != v}
+            if "severity" in delta:
+                delta["issues"] = state["issues"]
+                frame = sse_frame("severity", delta, self.seq)
+            else:
+                frame = sse_frame("delta", delta, self.seq)
+
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._fan_out, frame)
+
+    def _fan_out(self, frame: bytes):
+        resync = None
+        for client in list(self._clients):
+            try:
+                client.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Too slow for deltas: replace its backlog with one full state
+                resync = resync or sse_frame("state", self.state, self.seq)
+                while not client.queue.empty():
+                    client.queue.get_nowait()
+                client.queue.put_nowait(resync)
+
+    def _initial_state(self) -> Dict:
+        if not self.state and self.monitor.snapshots:
+            self.state = self._snapshot_state(self.monitor.snapshots[-1])
+            self.seq = getattr(self.monitor.snapshots[-1], "seq", self.seq)
+        return self.state
+
+    async def stream(self):
+        """Async iterator of SSE bytes for one client."""
+        client = _Client(self.queue_size)
+        self._clients.add(client)
+
+        try:
+            yield b"retry: 3000\n\n" + sse_frame("state", self._initial_state(), self.seq)
+
+            while True:
+                try:
+                    frame = await asyncio.wait_for(client.queue.get(),
+                                                   timeout=self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield frame
+        finally:
+            self._clients.discard(client)
@@ -0,0 +1,326 @@
+"""
+Memo Cache - Bounded memoization layer for generated latency patches
+Structural keys, LRU eviction by byte budget, TTL, invalidation hooks.
+
+Thread-safe (one lock around the LRU map, never held while the wrapped
+function runs) and works for both sync and async functions. Hit/miss/
+eviction counters are exported via stats() so GeometricHealthMonitor can
+record them and the healer can judge latency patches on measured hit rate.
+
+Opaque arguments (e.g. `self` for memoized methods) have no structural
+encoding; they are keyed by hash/identity and kept alongside the entry, and
+a hit only counts when they compare equal to the call's own arguments.
+
+This module is stdlib + NumPy only: SelfHealingEngine embeds its source
+verbatim into latency patches so they deploy without this package.
+"""
+
+import functools
+import hashlib
+import inspect
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as _np
+except ImportError:  # pragma: no cover - NumPy is optional for keying
+    _np = None
+
+
+def _feed(h, value, depth: int = 0, opaque: Optional[list] = None):
+    """
+    Feed a structural encoding of `value` into hash `h`.
+
+    Values without one are appended to `opaque` so callers can verify them.
+    """
+    if depth > 32:
+        h.update(b"D" + struct.pack("<q", id(value)))
+        if opaque is not None:
+            opaque.append(value)
+        return
+
+    if value is None or isinstance(value, bool):
+        h.update(b"N" if value is None else (b"T" if value else b"F"))
+    elif isinstance(value, int):
+        h.update(b"i" + str(value).encode())
+    elif isinstance(value, float):
+        h.update(b"f" + struct.pack("<d", value))
+    elif isinstance(value, str):
+        data = value.encode("utf-8", "surrogatepass")
+        h.update(b"s" + struct.pack("<q", len(data)) + data)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        data = bytes(value)
+        h.update(b"b" + struct.pack("<q", len(data)) + data)
+    elif _np is not None and isinstance(value, _np.ndarray):
+        # Basin coords etc.: key on dtype, shape and raw contents
+        array = _np.ascontiguousarray(value)
+        h.update(b"a" + array.dtype.str.encode() + repr(array.shape).encode())
+        h.update(array.tobytes())
+    elif _np is not None and isinstance(value, _np.generic):
+        _feed(h, value.item(), depth + 1, opaque)
+    elif isinstance(value, (list, tuple)):
+        h.update((b"l" if isinstance(value, list) else b"t") + struct.pack("<q", len(value)))
+        for item in value:
+            _feed(h, item, depth + 1, opaque)
+    elif isinstance(value, dict):
+        h.update(b"d" + struct.pack("<q", len(value)))
+        for k in sorted(value, key=repr):
+            _feed(h, k, depth + 1, opaque)
+            _feed(h, value[k], depth + 1, opaque)
+    elif isinstance(value, (set, frozenset)):
+        digests = []
+        for item in value:
+            item_hash = hashlib.blake2b(digest_size=16)
+            _feed(item_hash, item, depth + 1, opaque)
+            digests.append(item_hash.digest())
+        digests.sort()
+        h.update(b"S" + struct.pack("<q", len(digests)) + b"".join(digests))
+    else:
+        # Opaque objects: hashable → by hash, otherwise by identity. Neither
+        # is unique, so the value itself is handed back for an equality check
+        h.update(b"o" + type(value).__qualname__.encode())
+        try:
+            h.update(struct.pack("<q", hash(value) & 0x7FFFFFFFFFFFFFFF))
+        except TypeError:
+            h.update(struct.pack("<q", id(value)))
+        if opaque is not None:
+            opaque.append(value)
+
+
+def _same_args(stored: tuple, given: tuple) -> bool:
+    """True when two opaque-argument tuples are pairwise identical or equal."""
+    if len(stored) != len(given):
+        return False
+    for a, b in zip(stored, given):
+        if a is b:
+            continue
+        try:
+            if not bool(a == b):
+                return False
+        except Exception:
+            return False
+    return True
+
+
+def structural_key(*args, **kwargs) -> bytes:
+    """Stable 16-byte digest of call arguments (NumPy-aware)."""
+    return call_key(*args, **kwargs)[0]
+
+
+def call_key(*args, **kwargs) -> Tuple[bytes, tuple]:
+    """
+    structural_key() plus the opaque arguments it could only hash.
+
+    Pass both to MemoCache.get()/set() so colliding opaque arguments
+    never share an entry.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    opaque: list = []
+    _feed(h, args, opaque=opaque)
+    _feed(h, kwargs, opaque=opaque)
+    return h.digest(), tuple(opaque)
+
+
+def estimate_size(value, depth: int = 0) -> int:
+    """Approximate retained bytes of a cached value."""
+    if _np is not None and isinstance(value, _np.ndarray):
+        return int(value.nbytes) + 112
+    size = sys.getsizeof(value)
+    if depth >= 3:
+        return size
+    if isinstance(value, dict):
+        size += sum(
+            estimate_size(k, depth + 1) + estimate_size(v, depth + 1)
+            for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, depth + 1) for item in value)
+    return size
+
+
+class MemoCache:
+    """
+    LRU cache bounded by bytes, with optional TTL.
+
+    Usage:
+        cache = MemoCache("geometric_search:score", max_bytes=32 * 1024 * 1024,
+                          ttl_seconds=300)
+
+        hit, value = cache.get(key)
+        if not hit:
+            cache.set(key, compute())
+
+        cache.on_invalidate(lambda key: print("dropped", key))
+        monitor.register_cache_stats(cache.name, cache.stats)
+    """
+
+    def __init__(self,
+                 name: str,
+                 max_bytes: int = 32 * 1024 * 1024,
+                 ttl_seconds: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hooks: List[Callable[[Optional[bytes]], None]] = []
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.collisions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes, args: tuple = ()):
+        """Returns (hit, value). `args` are the opaque arguments from call_key()."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            value, size, expires_at, stored_args = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+
+            if not _same_args(stored_args, args):
+                self.collisions += 1
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key: bytes, value: Any, args: tuple = ()):
+        """Store a value, evicting least-recently-used entries to fit."""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        expires_at = self.clock() + self.ttl_seconds if self.ttl_seconds else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, expires_at, args)
+            self.bytes += size
+
+            while self.bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[bytes] = None):
+        """Drop one entry (or everything when key is None) and run hooks."""
+        with self._lock:
+            if key is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self.bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+            hooks = list(self._hooks)
+
+        for hook in hooks:
+            try:
+                hook(key)
+            except Exception as e:
+                print(f"❌ Cache invalidation hook error: {e}")
+
+    def clear(self):
+        self.invalidate(None)
+
+    def on_invalidate(self, hook: Callable[[Optional[bytes]], None]):
+        """Register a callback run after each invalidation."""
+        self._hooks.append(hook)
+
+    def stats(self) -> Dict:
+        """Counters for GeometricHealthMonitor.register_cache_stats()."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "collisions": self.collisions,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _remove(self, key: bytes):
+        _, size, _, _ = self._entries.pop(key)
+        self.bytes -= size
+
+
+def memoize(func: Optional[Callable] = None, *,
+            name: Optional[str] = None,
+            max_bytes: int = 32 * 1024 * 1024,
+            ttl_seconds: Optional[float] = None,
+            cache: Optional[MemoCache] = None):
+    """
+    Memoize a sync or async function with a MemoCache.
+
+    The wrapper exposes `.cache` and `.invalidate(*args, **kwargs)`.
+
+    Usage:
+        @memoize(ttl_seconds=60)
+        def fisher_distance(basin_a, basin_b): ...
+    """
+
+    def decorator(fn):
+        memo = cache or MemoCache(
+            name or f"{fn.__module__}:{fn.__qualname__}",
+            max_bytes=max_bytes,
+            ttl_seconds=ttl_seconds
+        )
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                key, opaque = call_key(*args, **kwargs)
+                hit, value = memo.get(key, opaque)
+                if hit:
+                    return value
+                value = await fn(*args, **kwargs)
+                memo.set(key, value, opaque)
+                return value
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                key, opaque = call_key(*args, **kwargs)
+                hit, value = memo.get(key, opaque)
+                if hit:
+                    return value
+                value = fn(*args, **kwargs)
+                memo.set(key, value, opaque)
+                return value
+
+        wrapper.cache = memo
+        wrapper.invalidate = lambda *a, **kw: memo.invalidate(structural_key(*a, **kw))
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
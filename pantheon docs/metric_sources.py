@@ -0,0 +1,133 @@
+"""
+Metric Sources - Concurrent, deadline-bound metric collection
+Every source is polled at once; a slow one can't stall the snapshot.
+
+Sources are plain callables returning a dict, sync or async. collect()
+runs them all concurrently (sync ones in the default executor), each
+under its own deadline. A source that times out or raises contributes
+its last good values (or its defaults), marked stale, so the snapshot
+still goes out on schedule. A sync source whose previous call is still
+stuck in its thread is not called again until that call returns, so a
+hung source can't pile up executor threads.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+
+@dataclass
+class MetricSource:
+    """One registered source and its collection counters."""
+    name: str
+    fn: Callable[[], Dict]
+    timeout_seconds: float = 2.0
+    defaults: Dict = field(default_factory=dict)
+    last_values: Optional[Dict] = None
+    last_ok: Optional[datetime] = None
+    latency_ms: float = 0.0
+    calls: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    stale: bool = False
+    pending: Optional[asyncio.Future] = field(default=None, repr=False)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "timeout_seconds": self.timeout_seconds,
+            "last_ok": self.last_ok.isoformat() if self.last_ok else None,
+            "latency_ms": self.latency_ms,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "stale": self.stale
+        }
+
+
+class MetricCollector:
+    """
+    Gather all registered metric sources concurrently.
+
+    Usage:
+        collector = MetricCollector()
+        collector.register("consciousness", chain.get_consciousness_metrics,
+                           timeout_seconds=2.0, defaults={"phi": 0.5})
+        collector.register("performance", chain.get_performance_metrics)
+
+        values = await collector.collect()    # {"consciousness": {...}, ...}
+        collector.stats()                     # per-source latency/timeouts
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.sources: Dict[str, MetricSource] = {}
+        self.collection_ms = 0.0
+        self.collections = 0
+
+    def register(self, name: str, fn: Callable[[], Dict],
+                 timeout_seconds: float = 2.0,
+                 defaults: Optional[Dict] = None) -> Callable[[], None]:
+        """Add a source (sync or async callable). Returns a remove function."""
+        self.sources[name] = MetricSource(name, fn, timeout_seconds, dict(defaults or {}))
+        return lambda: self.sources.pop(name, None)
+
+    async def collect(self) -> Dict[str, Dict]:
+        """Latest values per source; stale sources repeat their last values."""
+        started = self.clock()
+        sources = list(self.sources.values())
+
+        results = await asyncio.gather(*(self._collect_one(source) for source in sources))
+
+        self.collection_ms = (self.clock() - started) * 1000
+        self.collections += 1
+        return {source.name: values for source, values in zip(sources, results)}
+
+    async def _collect_one(self, source: MetricSource) -> Dict:
+        started = self.clock()
+        source.calls += 1
+
+        try:
+            values = await asyncio.wait_for(self._call(source), source.timeout_seconds)
+            if not isinstance(values, dict):
+                raise TypeError(f"returned {type(values).__name__}, expected dict")
+        except asyncio.TimeoutError:
+            source.timeouts += 1
+            print(f"⚠️  Metric source {source.name} timed out after {source.timeout_seconds}s, "
+                  f"using last values")
+            return self._fallback(source, started)
+        except Exception as e:
+            source.errors += 1
+            print(f"❌ Metric source {source.name} failed: {e}")
+            return self._fallback(source, started)
+
+        source.latency_ms = (self.clock() - started) * 1000
+        source.last_values = values
+        source.last_ok = datetime.now()
+        source.stale = False
+        return values
+
+    def _call(self, source: MetricSource):
+        if asyncio.iscoroutinefunction(source.fn):
+            return source.fn()
+
+        # Sync source: reuse a call still running from a previous deadline
+        if source.pending is None or source.pending.done():
+            loop = asyncio.get_running_loop()
+            source.pending = loop.run_in_executor(None, source.fn)
+        # shield: a timeout must not cancel the shared future
+        return asyncio.shield(source.pending)
+
+    def _fallback(self, source: MetricSource, started: float) -> Dict:
+        source.latency_ms = (self.clock() - started) * 1000
+        source.stale = True
+        return source.last_values if source.last_values is not None else dict(source.defaults)
+
+    def stats(self) -> Dict:
+        return {
+            "collection_ms": self.collection_ms,
+            "collections": self.collections,
+            "sources": {name: source.to_dict() for name, source in self.sources.items()}
+        }
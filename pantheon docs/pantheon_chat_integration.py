@@ -8,19 +8,61 @@ Wire self-healing into existing telemetry and health check endpoints.
 """
 
 import asyncio
+import os
+import time
 from fastapi import FastAPI, BackgroundTasks
 from geometric_health_monitor import GeometricHealthMonitor, GeometricSnapshot
 from self_healing_engine import SelfHealingEngine
+from patch_cache import PatchCache
+from patch_history import PatchHistory
+from sharded_test_runner import ShardedTestRunner
+from healing_queue import HealingQueue
+from pr_batcher import PRBatcher
+from health_broadcast import HealthBroadcaster, MEDIA_TYPE as SSE_MEDIA_TYPE
+from snapshot_stream import iter_ndjson, snapshot_record, last_seq, BASIN_MODES, MEDIA_TYPE
+from snapshot_codec import negotiate, select_format, encode, encode_snapshots, record_columns, available_formats, MEDIA_TYPES
+from shared_state import LeaderElection, SharedSnapshotStore, WorkerReports, shared_name
+from request_metrics import RequestMetrics, RequestMetricsMiddleware
+from capture_pipeline import CapturePipeline
+from stage_metrics import STAGES
+from checkpoint import Checkpointer
 import numpy as np
 
 # ============================================================================
 # INTEGRATION POINT 1: Startup
 # ============================================================================
 
-def setup_self_healing(app: FastAPI):
+def install_request_metrics(app: FastAPI) -> RequestMetrics:
+    """
+    Measure request latency and errors for the monitoring loop.
+    
+    Call right after creating the app: middleware cannot be added once
+    the app has started.
+    """
+    
+    app.state.geo_requests = RequestMetrics()
+    app.add_middleware(RequestMetricsMiddleware, metrics=app.state.geo_requests)
+    return app.state.geo_requests
+
+def setup_self_healing(app: FastAPI, state_dir: str = "./self_healing_state",
+                       benchmark_suite: str = None):
     """
     Call this from server/main.py startup event.
     
+    Generated patches, fitness scores and PR state persist in
+    `state_dir` so restarts don't re-open PRs for the same issue.
+    Healing stages run as durable jobs (healing_queue.db) on a small
+    worker pool, so interrupted work resumes after a restart.
+    
+    With several server workers, one is elected leader (leader.lock):
+    only it captures snapshots and runs healing. The others read its
+    snapshots from shared memory, enqueue heals into the same queue and
+    report their request counters and exception fingerprints to it
+    (reports/), so its snapshots cover every worker.
+    
+    Pass `benchmark_suite` (a pytest-benchmark suite, e.g.
+    "tests/benchmarks/") to gate latency patches on a benchmark run.
+    
     Usage:
         @app.on_event("startup")
         async def startup():
@@ -34,37 +76,176 @@ def setup_self_healing(app: FastAPI):
         history_size=1000
     )
     
+    # Handler stages (@stage(..., stream="pantheon-chat")) feed latency attribution
+    STAGES.attach(app.state.geo_monitor)
+    
     # Create healer
     app.state.geo_healer = SelfHealingEngine(
         app.state.geo_monitor,
         fitness_threshold=0.6,
-        auto_apply=False  # Require PR review
+        auto_apply=False,  # Require PR review
+        cache=PatchCache(f"{state_dir}/patch_cache.json"),
+        history=PatchHistory(f"{state_dir}/patch_history.db"),
+        test_runner=ShardedTestRunner(durations_file=f"{state_dir}/test_durations.json"),
+        queue=HealingQueue(f"{state_dir}/healing_queue.db"),
+        pr_batcher=PRBatcher(window_seconds=900, state_file=f"{state_dir}/pr_batch.json"),
+        benchmark_suite=benchmark_suite
     )
     
-    # Start monitoring loop
-    asyncio.create_task(monitoring_loop(app))
+    # Push health deltas to dashboard clients (one computation per capture)
+    app.state.geo_broadcaster = HealthBroadcaster(app.state.geo_monitor)
+    app.state.geo_broadcaster.attach(asyncio.get_running_loop())
+    
+    # Incremental checkpoints (written by the leader) for warm restarts
+    app.state.geo_checkpoint = Checkpointer(
+        f"{state_dir}/checkpoint", app.state.geo_monitor, app.state.geo_healer
+    )
     
-    # Start healing loop
-    asyncio.create_task(app.state.geo_healer.autonomous_loop(interval_seconds=300))
+    # Fingerprint exceptions for targeted error healing, in every worker
+    # (followers report theirs to the leader's engine)
+    app.state.geo_healer.error_intel.install()
+    app.state.geo_healer.error_intel.install_asyncio(asyncio.get_running_loop())
+    
+    # One capturing/healing leader per host; other workers follow it
+    app.state.geo_election = LeaderElection(f"{state_dir}/leader.lock")
+    app.state.geo_store = SharedSnapshotStore(shared_name(state_dir), capacity=1000)
+    app.state.geo_reports = WorkerReports(f"{state_dir}/reports")
+    asyncio.create_task(leadership_loop(app))
     
     print("✅ Self-healing initialized")
 
+async def leadership_loop(app: FastAPI, interval_seconds: float = 1.0,
+                          report_seconds: float = 10.0):
+    """
+    Follow the leader's snapshots until this worker becomes leader.
+    
+    The leader lock is released by the OS when its process exits, so a
+    surviving worker takes over capture and healing within a second,
+    continuing from the shared history. Meanwhile this worker reports to
+    the leader every `report_seconds`.
+    """
+    
+    last_report = time.monotonic()
+    
+    while True:
+        app.state.geo_store.sync(app.state.geo_monitor)
+        
+        if app.state.geo_election.try_acquire():
+            if not app.state.geo_monitor.snapshots:
+                # First leader on this host: warm restart from the checkpoint
+                restored = app.state.geo_checkpoint.load()
+                if restored:
+                    print(f"🔄 Restored {restored} snapshots from checkpoint")
+            else:
+                # Failover: history is mirrored; append after the old leader's last record
+                app.state.geo_checkpoint.resume()
+            app.state.geo_store.publish(app.state.geo_monitor)
+            asyncio.create_task(app.state.geo_checkpoint.run())
+            
+            # Start capture thread and monitoring loop
+            app.state.geo_capture = CapturePipeline(
+                app.state.geo_monitor,
+                on_captured=report_degradation
+            ).start()
+            asyncio.create_task(monitoring_loop(app))
+            
+            # Start healing workers and loop
+            asyncio.create_task(app.state.geo_healer.run_workers(workers=2))
+            asyncio.create_task(app.state.geo_healer.autonomous_loop(interval_seconds=300))
+            
+            # Allocation snapshots for the memory strategy (tracing starts on growth)
+            asyncio.create_task(app.state.geo_healer.track_allocations(interval_seconds=60))
+            
+            print(f"👑 Worker {os.getpid()} is the self-healing leader")
+            return
+        
+        if time.monotonic() - last_report >= report_seconds:
+            last_report = time.monotonic()
+            await report_to_leader(app)
+        
+        await asyncio.sleep(interval_seconds)
+
+async def report_to_leader(app: FastAPI):
+    """Follower: post request counters and exception fingerprints since the last report."""
+    
+    reports = []
+    requests = getattr(app.state, "geo_requests", None)
+    if requests is not None:
+        # Drained on the event loop: the middleware updates it without locks
+        reports.append(("requests", requests.drain()))
+    fingerprints = app.state.geo_healer.error_intel.drain()
+    if fingerprints:
+        reports.append(("errors", {"fingerprints": fingerprints}))
+    
+    loop = asyncio.get_running_loop()
+    for kind, payload in reports:
+        try:
+            await loop.run_in_executor(None, app.state.geo_reports.post, kind, payload)
+        except OSError as e:
+            print(f"❌ Worker report failed: {e}")
+
+def merge_worker_reports(app: FastAPI):
+    """Leader: fold followers' exception fingerprints into the engine's counts."""
+    
+    for report in app.state.geo_reports.drain("errors"):
+        app.state.geo_healer.error_intel.merge(report["fingerprints"])
+
+async def shutdown_self_healing(app: FastAPI):
+    """
+    Call this from server/main.py shutdown event.
+    
+    Every worker removes its exception hooks; followers post their last
+    report. The leader drains pending captures and writes a final
+    checkpoint.
+    """
+    
+    app.state.geo_healer.error_intel.uninstall()
+    
+    if not app.state.geo_election.is_leader:
+        await report_to_leader(app)
+        return
+    
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, app.state.geo_capture.stop)
+    await loop.run_in_executor(None, app.state.geo_checkpoint.save)
+    app.state.geo_election.release()
+
 # ============================================================================
 # INTEGRATION POINT 2: Monitoring Loop
 # ============================================================================
 
+def report_degradation(snapshot: GeometricSnapshot):
+    """Log degraded snapshots (runs on the capture thread)."""
+    
+    if snapshot.phi < 0.65 or snapshot.regime == "breakdown":
+        print(f"⚠️  Geometric degradation: Φ={snapshot.phi:.3f}, regime={snapshot.regime}")
+
 async def monitoring_loop(app: FastAPI):
     """
     Capture geometric snapshots every 60 seconds.
     
+    Only gathers raw state on the event loop; normalization, git hash
+    and storage happen on the capture thread (app.state.geo_capture).
+    
     Pulls data from:
     - app.gary_telemetry (consciousness metrics)
-    - app.metrics (performance metrics)
+    - RequestMetrics window (measured latency/errors, see
+      install_request_metrics), else app.metrics (performance metrics)
+    
+    Followers' request reports are merged into the window, and their
+    exception reports into the healer.
     """
     
+    loop = asyncio.get_running_loop()
+    
     while True:
         await asyncio.sleep(60)  # Every minute
         
+        try:
+            await loop.run_in_executor(None, merge_worker_reports, app)
+        except Exception as e:
+            print(f"❌ Worker report merge error: {e}")
+        
         try:
             # Get consciousness metrics
             gary = app.gary_telemetry
@@ -76,21 +257,20 @@ async def monitoring_loop(app: FastAPI):
             surprise = gary.get("surprise", 0.5)
             agency = gary.get("agency", 0.5)
             
-            # Get performance metrics
-            metrics = app.metrics
+            # Get performance metrics (measured window since the last pass,
+            # over every worker's requests)
+            requests = getattr(app.state, "geo_requests", None)
+            if requests is not None:
+                peers = await loop.run_in_executor(None, app.state.geo_reports.drain, "requests")
+                metrics = requests.window(peers)
+            else:
+                metrics = app.metrics
             
             error_rate = metrics.get("error_rate", 0.0)
             avg_latency_ms = metrics.get("avg_latency_ms", 0.0)
             memory_mb = metrics.get("memory_mb", 0.0)
             
-            # Normalize basin if needed
-            if np.linalg.norm(basin_coords) > 0:
-                basin_coords = basin_coords / np.linalg.norm(basin_coords)
-            else:
-                basin_coords = np.zeros(64)
-                basin_coords[0] = 1.0
-            
-            # Capture snapshot
+            # Hand off for capture (never blocks; oldest dropped if behind)
             state = {
                 "phi": phi,
                 "kappa_eff": kappa_eff,
@@ -104,11 +284,7 @@ async def monitoring_loop(app: FastAPI):
                 "module_name": "pantheon-chat"
             }
             
-            snapshot = app.state.geo_monitor.capture(state)
-            
-            # Log to console (optional)
-            if snapshot.phi < 0.65 or snapshot.regime == "breakdown":
-                print(f"⚠️  Geometric degradation: Φ={snapshot.phi:.3f}, regime={snapshot.regime}")
+            app.state.geo_capture.submit(state)
             
         except Exception as e:
             print(f"❌ Monitoring loop error: {e}")
@@ -117,7 +293,8 @@ async def monitoring_loop(app: FastAPI):
 # INTEGRATION POINT 3: Health Check Endpoint
 # ============================================================================
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header
+from fastapi.responses import Response, StreamingResponse
 
 router = APIRouter(prefix="/api/self-healing", tags=["self-healing"])
 
@@ -143,6 +320,9 @@ async def get_geometric_health(app: FastAPI = None):
         }
     """
     
+    # Followers: pick up the leader's latest snapshots first
+    app.state.geo_store.sync(app.state.geo_monitor)
+    
     health = app.state.geo_monitor.check_health()
     
     # Add trends
@@ -155,26 +335,88 @@ async def get_geometric_health(app: FastAPI = None):
     
     return health
 
+@router.get("/stream")
+async def stream_health(app: FastAPI = None):
+    """
+    Server-sent events: live geometric health for dashboards.
+    
+    Events:
+        state     full {"timestamp", "severity", "issues", "phi", "basin_drift",
+                  "error_rate", "latency_ms", "memory_mb"} (on connect / resync)
+        delta     changed fields only, per captured snapshot
+        severity  delta whose severity changed (includes issues)
+    """
+    
+    return StreamingResponse(
+        app.state.geo_broadcaster.stream(),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/snapshots")
-async def get_snapshots(limit: int = 100, app: FastAPI = None):
+async def get_snapshots(limit: int = 100,
+                        after_seq: int = None,
+                        format: str = None,
+                        basins: str = "full",
+                        basin_points: int = 8,
+                        accept: str = Header(None),
+                        app: FastAPI = None):
     """
-    Get recent geometric snapshots.
+    Get geometric snapshots.
     
     Params:
         limit: Number of snapshots to return (default 100)
-    
-    Response:
+        after_seq: Cursor; snapshots with seq > after_seq, oldest first
+                   (default: the most recent `limit`)
+        format: "json" (default), "ndjson" (streamed, one snapshot per
+                line), "arrow" or "msgpack" (columnar). Without it, the
+                Accept header may pick a columnar format
+                (application/vnd.apache.arrow.stream, application/msgpack);
+                an explicit format always wins over Accept.
+        basins: "full" | "none" | "downsample" (to `basin_points` values)
+    
+    Response (json):
         {
             "count": int,
-            "snapshots": [GeometricSnapshot]
+            "snapshots": [GeometricSnapshot],
+            "last_seq": int | None    # pass as after_seq for the next page
         }
+    
+    Response (ndjson):
+        application/x-ndjson, one GeometricSnapshot per line
+    
+    Response (arrow / msgpack):
+        One column per field; basin_coords as an (N, D) float64 block
     """
     
-    recent = app.state.geo_monitor.snapshots[-limit:]
+    if basins not in BASIN_MODES:
+        return {"error": f"basins must be one of {', '.join(BASIN_MODES)}"}
+    
+    binary = select_format(format, accept)
+    if binary and binary not in available_formats():
+        return {"error": f"{binary} export is not installed on this server"}
+    
+    app.state.geo_store.sync(app.state.geo_monitor)
+    page = app.state.geo_monitor.snapshots_after(after_seq, max(0, limit))
+    
+    if binary:
+        return Response(
+            encode_snapshots(page, binary, basins=basins, basin_points=basin_points),
+            media_type=MEDIA_TYPES[binary],
+            headers={"X-Last-Seq": str(last_seq(page) or "")}
+        )
+    
+    if format == "ndjson":
+        return StreamingResponse(
+            iter_ndjson(page, basins=basins, basin_points=basin_points),
+            media_type=MEDIA_TYPE,
+            headers={"X-Last-Seq": str(last_seq(page) or "")}
+        )
     
     return {
-        "count": len(recent),
-        "snapshots": [s.to_dict() for s in recent]
+        "count": len(page),
+        "snapshots": [snapshot_record(s, basins, basin_points) for s in page],
+        "last_seq": last_seq(page)
     }
 
 @router.post("/heal")
@@ -185,14 +427,31 @@ async def trigger_healing(background_tasks: BackgroundTasks, app: FastAPI = None
     Response:
         {
             "triggered": bool,
-            "health": Dict
+            "health": Dict,
+            "job_id": int    # when a healing queue is configured
         }
     """
     
+    app.state.geo_store.sync(app.state.geo_monitor)
     health = app.state.geo_monitor.check_health()
     
+    if not health["healthy"] and app.state.geo_healer.queue is not None:
+        # Durable and shared: the leader's workers pick it up
+        return {
+            "triggered": True,
+            "health": health,
+            "job_id": app.state.geo_healer.enqueue_heal(health)
+        }
+    
+    if not health["healthy"] and app.state.geo_healer.single_flight.full():
+        return {
+            "triggered": False,
+            "health": health,
+            "reason": "Heal queue full"
+        }
+    
     if not health["healthy"]:
-        # Run healing in background
+        # Run healing in background (coalesced with any in-flight run)
         background_tasks.add_task(app.state.geo_healer.check_and_heal)
         
         return {
@@ -207,38 +466,131 @@ async def trigger_healing(background_tasks: BackgroundTasks, app: FastAPI = None
         }
 
 @router.get("/patches")
-async def get_patches(app: FastAPI = None):
+async def get_patches(limit: int = 50,
+                      cursor: int = None,
+                      reason: str = None,
+                      strategy: str = None,
+                      applied: bool = None,
+                      event: str = None,
+                      since: str = None,
+                      until: str = None,
+                      accept: str = Header(None),
+                      app: FastAPI = None):
     """
-    Get healing patch history.
+    Get healing patch history (newest first, paginated).
+    
+    Params:
+        limit: Page size (default 50, max 500)
+        cursor: `next_cursor` from the previous page
+        reason: Reason prefix filter
+        strategy, applied, event: Exact filters
+        since, until: ISO timestamp range
+    
+    Patch bodies are not included; fetch /patches/{id} for patch_code.
+    With Accept: application/vnd.apache.arrow.stream or application/msgpack
+    the page is returned columnar (cursor in the X-Next-Cursor header).
     
     Response:
         {
             "generated": int,
             "applied": int,
-            "patches": [HealingPatch]
+            "patches": [Dict],
+            "next_cursor": int | None
         }
     """
     
-    healer = app.state.geo_healer
+    history = app.state.geo_healer.history
+    
+    page = history.query(
+        limit=max(1, min(limit, 500)),
+        cursor=cursor,
+        reason=reason,
+        strategy=strategy,
+        applied=applied,
+        event=event,
+        since=since,
+        until=until
+    )
+    
+    binary = negotiate(accept)
+    if binary:
+        return Response(
+            encode(record_columns(page["items"]), binary, kind="patches"),
+            media_type=MEDIA_TYPES[binary],
+            headers={"X-Next-Cursor": str(page["next_cursor"] or "")}
+        )
     
     return {
-        "generated": len(healer.patches_generated),
-        "applied": len(healer.patches_applied),
-        "patches": [p.to_dict() for p in healer.patches_generated]
+        "generated": history.count(event="generated"),
+        "applied": history.count(event="applied"),
+        "patches": page["items"],
+        "next_cursor": page["next_cursor"]
     }
 
+@router.get("/patches/{patch_id}")
+async def get_patch(patch_id: int, app: FastAPI = None):
+    """
+    Get one history record with evidence and patch_code.
+    
+    Response:
+        Dict | {"error": str}
+    """
+    
+    record = app.state.geo_healer.history.get(patch_id)
+    
+    if record is None:
+        return {"error": f"Patch {patch_id} not found"}
+    
+    return record
+
+@router.get("/queue")
+async def get_queue(window_seconds: float = 3600, app: FastAPI = None):
+    """
+    Healing job queue and capture pipeline observability.
+    
+    Response:
+        {
+            "stages": {stage: {"pending", "running", "done", "failed",
+                               "wait_seconds", "run_seconds", "throughput_per_min"}},
+            "capture": {"depth", "max_depth", "submitted", "captured", "dropped",
+                        "errors", "avg_wait_ms", "avg_capture_ms"}    # leader only
+        }
+    """
+    
+    queue = app.state.geo_healer.queue
+    
+    if queue is None:
+        return {"error": "No healing queue configured"}
+    
+    response = {"stages": queue.stats(window_seconds)}
+    
+    capture = getattr(app.state, "geo_capture", None)
+    if capture is not None:
+        response["capture"] = capture.stats()
+    
+    return response
+
 # ============================================================================
 # INTEGRATION POINT 4: Add to server/main.py
 # ============================================================================
 
 # In server/main.py, add:
 #
-# from server.lib.self_healing import setup_self_healing, router as self_healing_router
+# from server.lib.self_healing import (
+#     setup_self_healing, shutdown_self_healing, install_request_metrics,
+#     router as self_healing_router
+# )
+#
+# install_request_metrics(app)
 #
 # @app.on_event("startup")
 # async def startup():
 #     setup_self_healing(app)
 #
+# @app.on_event("shutdown")
+# async def shutdown():
+#     await shutdown_self_healing(app)
+#
 # app.include_router(self_healing_router)
 
 # ============================================================================
@@ -265,14 +617,20 @@ def get_dashboard_widget():
     </div>
     
     <script>
-        // Fetch health every 10 seconds
-        setInterval(async () => {
-            const response = await fetch('/api/self-healing/health');
-            const health = await response.json();
+        // Live updates pushed by the server (shared fan-out, no polling)
+        const health = {};
+        const events = new EventSource('/api/self-healing/stream');
+        
+        function render(update) {
+            Object.assign(health, update);
             
-            document.getElementById('phi-value').textContent = health.metrics.phi.toFixed(3);
-            document.getElementById('drift-value').textContent = health.metrics.basin_drift.toFixed(3);
-            document.getElementById('status-value').textContent = health.severity;
+            if (health.phi != null) {
+                document.getElementById('phi-value').textContent = health.phi.toFixed(3);
+            }
+            if (health.basin_drift != null) {
+                document.getElementById('drift-value').textContent = health.basin_drift.toFixed(3);
+            }
+            document.getElementById('status-value').textContent = health.severity || '--';
             
             // Update status color
             const statusEl = document.getElementById('status-value');
@@ -280,7 +638,14 @@ def get_dashboard_widget():
             
             // Update chart (using Chart.js)
             updatePhiChart(health);
-        }, 10000);
+        }
+        
+        events.addEventListener('state', (e) => {
+            for (const key of Object.keys(health)) delete health[key];
+            render(JSON.parse(e.data));
+        });
+        events.addEventListener('delta', (e) => render(JSON.parse(e.data)));
+        events.addEventListener('severity', (e) => render(JSON.parse(e.data)));
         
         async function triggerHealing() {
             const response = await fetch('/api/self-healing/heal', { method: 'POST' });
@@ -327,17 +692,18 @@ if __name__ == "__main__":
     }
     app.gary_telemetry["basin_coords"] /= np.linalg.norm(app.gary_telemetry["basin_coords"])
     
-    app.metrics = {
-        "error_rate": 0.01,
-        "avg_latency_ms": 500,
-        "memory_mb": 1500
-    }
+    # Measure request latency/errors
+    install_request_metrics(app)
     
     # Setup self-healing
     @app.on_event("startup")
     async def startup():
         setup_self_healing(app)
     
+    @app.on_event("shutdown")
+    async def shutdown():
+        await shutdown_self_healing(app)
+    
     # Add routes
     app.include_router(router)
     
@@ -352,5 +718,6 @@ if __name__ == "__main__":
     print("  GET  /api/self-healing/snapshots")
     print("  POST /api/self-healing/heal")
     print("  GET  /api/self-healing/patches")
+    print("  GET  /api/self-healing/patches/{id}")
     
     uvicorn.run(app, host="0.0.0.0", port=8000)
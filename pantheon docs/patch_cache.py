@@ -0,0 +1,143 @@
+"""
+Patch Cache - Content-addressed store for healing work
+Remembers generated patches, fitness results and PR/branch state.
+
+Entries are keyed by a normalized hash of (strategy, parameters, code_hash),
+so a system that stays degraded reuses previous work instead of
+regenerating, re-scoring and re-opening PRs every cycle.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+
+def normalize_params(params: Dict, significant: int = 2) -> Dict:
+    """
+    Normalize patch parameters for hashing.
+
+    Floats are rounded to `significant` significant figures so that
+    essentially identical health readings (Φ=0.553 vs Φ=0.548) map to
+    the same key. Nested dicts/lists are normalized recursively.
+    """
+
+    def _norm(value):
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, (int, float)):
+            return float(f"{float(value):.{significant}g}")
+        if isinstance(value, dict):
+            return {str(k): _norm(v) for k, v in sorted(value.items())}
+        if isinstance(value, (list, tuple)):
+            return [_norm(v) for v in value]
+        if hasattr(value, "tolist"):  # numpy scalars/arrays
+            return _norm(value.tolist())
+        return str(value)
+
+    return _norm(params or {})
+
+
+def patch_key(strategy: str, params: Dict, code_hash: str) -> str:
+    """Content address for a healing patch."""
+    payload = json.dumps(
+        {
+            "strategy": strategy,
+            "params": normalize_params(params),
+            "code_hash": code_hash
+        },
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class PatchCache:
+    """
+    Content-addressed patch/fitness store with optional JSON persistence.
+
+    Each entry holds:
+        {
+            "patch": HealingPatch.to_dict(),
+            "fitness_score": float | None,
+            "applied": bool,
+            "branch": str | None,
+            "pr_opened": bool,
+            "hits": int,
+            "created": str,
+            "updated": str
+        }
+
+    Usage:
+        cache = PatchCache("./self_healing_state/patch_cache.json")
+
+        key = patch_key("phi_degradation", {"phi": 0.55}, "abc12345")
+        entry = cache.get(key)
+        if entry is None:
+            cache.put(key, patch=patch.to_dict(), fitness_score=0.75)
+    """
+
+    def __init__(self, filepath: Optional[str] = None):
+        self.filepath = filepath
+        self.entries: Dict[str, Dict] = {}
+
+        if filepath and os.path.exists(filepath):
+            self.load()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Look up an entry (O(1)). Counts a hit when found."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry["hits"] = entry.get("hits", 0) + 1
+        return entry
+
+    def put(self, key: str, **fields) -> Dict:
+        """Create or update an entry and persist it."""
+        now = datetime.now().isoformat()
+        entry = self.entries.get(key)
+
+        if entry is None:
+            entry = {
+                "patch": None,
+                "fitness_score": None,
+                "applied": False,
+                "branch": None,
+                "pr_opened": False,
+                "hits": 0,
+                "created": now
+            }
+            self.entries[key] = entry
+
+        entry.update(fields)
+        entry["updated"] = now
+
+        self.save()
+        return entry
+
+    def save(self):
+        """Persist entries atomically (no-op for in-memory caches)."""
+        if not self.filepath:
+            return
+
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.filepath}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"entries": self.entries}, f, indent=2)
+        os.replace(tmp_path, self.filepath)
+
+    def load(self):
+        """Load entries from disk."""
+        with open(self.filepath, 'r') as f:
+            data = json.load(f)
+
+        self.entries = data.get("entries", {})
@@ -0,0 +1,245 @@
+"""
+Patch History - Append-only, indexed store of healing patches
+Replaces rewriting one JSON file with every patch body on each save.
+
+SQLite (stdlib) with one row per event ("generated", "applied", ...),
+indexed on timestamp, reason and applied. Patch bodies live in a
+separate table keyed by patch key and are written once, so listing
+history never reads patch_code; callers fetch a body only when they
+open a single record. Queries use keyset pagination (id < cursor),
+which stays O(page) however long the history grows.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    event TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    recorded TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    strategy TEXT,
+    module_path TEXT,
+    fitness_score REAL,
+    applied INTEGER NOT NULL DEFAULT 0,
+    params TEXT,
+    evidence TEXT
+);
+CREATE TABLE IF NOT EXISTS patch_bodies (
+    key TEXT PRIMARY KEY,
+    patch_code TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_patches_timestamp ON patches (timestamp);
+CREATE INDEX IF NOT EXISTS idx_patches_reason ON patches (reason);
+CREATE INDEX IF NOT EXISTS idx_patches_applied ON patches (applied, id);
+CREATE INDEX IF NOT EXISTS idx_patches_key ON patches (key);
+"""
+
+def _patch_key(patch: Dict) -> str:
+    """Patch key, or a content hash for legacy records without one."""
+    return patch.get("key") or "code:" + hashlib.sha256(
+        patch["patch_code"].encode("utf-8")
+    ).hexdigest()[:16]
+
+
+_COLUMNS = (
+    "id", "key", "event", "timestamp", "recorded", "reason", "strategy",
+    "module_path", "fitness_score", "applied", "params", "evidence"
+)
+
+
+class PatchHistory:
+    """
+    Append-only patch history with paginated queries.
+
+    Usage:
+        history = PatchHistory("./self_healing_state/patch_history.db")
+        history.append(patch.to_dict(), event="generated")
+
+        page = history.query(limit=50, applied=True)
+        more = history.query(limit=50, applied=True, cursor=page["next_cursor"])
+        full = history.get(page["items"][0]["id"])   # includes patch_code
+    """
+
+    def __init__(self, filepath: Optional[str] = None):
+        self.filepath = filepath
+
+        if filepath:
+            directory = os.path.dirname(filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filepath or ":memory:", check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+
+        with self._lock, self._conn:
+            if filepath:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def append(self, patch: Dict, event: str = "generated") -> int:
+        """Append one event for a patch (HealingPatch.to_dict()). Returns its id."""
+        key = _patch_key(patch)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO patch_bodies (key, patch_code) VALUES (?, ?)",
+                (key, patch["patch_code"])
+            )
+            cursor = self._conn.execute(
+                """INSERT INTO patches (key, event, timestamp, recorded, reason, strategy,
+                                        module_path, fitness_score, applied, params, evidence)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    key,
+                    event,
+                    patch["timestamp"],
+                    datetime.now().isoformat(),
+                    patch["reason"],
+                    patch.get("strategy"),
+                    patch.get("module_path"),
+                    patch.get("fitness_score"),
+                    1 if patch.get("applied") else 0,
+                    json.dumps(patch.get("params") or {}, default=str),
+                    json.dumps(patch.get("evidence") or {}, default=str)
+                )
+            )
+            return cursor.lastrowid
+
+    def query(self,
+              limit: int = 50,
+              cursor: Optional[int] = None,
+              reason: Optional[str] = None,
+              strategy: Optional[str] = None,
+              applied: Optional[bool] = None,
+              event: Optional[str] = None,
+              since: Optional[str] = None,
+              until: Optional[str] = None,
+              include_evidence: bool = False) -> Dict:
+        """
+        Newest-first page of records (without patch bodies).
+
+        `cursor` is the `next_cursor` of the previous page. `reason`
+        matches a prefix; `since`/`until` are ISO timestamps.
+
+        Returns:
+            {"items": [Dict], "next_cursor": int | None}
+        """
+        clauses, args = [], []
+
+        if cursor is not None:
+            clauses.append("id < ?")
+            args.append(cursor)
+        if reason:
+            clauses.append("reason >= ? AND reason < ?")
+            args += [reason, reason + "\uffff"]
+        if strategy:
+            clauses.append("strategy = ?")
+            args.append(strategy)
+        if applied is not None:
+            clauses.append("applied = ?")
+            args.append(1 if applied else 0)
+        if event:
+            clauses.append("event = ?")
+            args.append(event)
+        if since:
+            clauses.append("timestamp >= ?")
+            args.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            args.append(until)
+
+        columns = _COLUMNS if include_evidence else tuple(c for c in _COLUMNS if c != "evidence")
+        sql = f"SELECT {', '.join(columns)} FROM patches"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC LIMIT ?"
+        args.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+
+        items = [self._row_to_dict(row) for row in rows[:limit]]
+        next_cursor = items[-1]["id"] if len(rows) > limit else None
+
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get(self, record_id: int, include_code: bool = True) -> Optional[Dict]:
+        """One full record, with evidence and (lazily) its patch body."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM patches WHERE id = ?", (record_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            record = self._row_to_dict(row)
+            if include_code:
+                body = self._conn.execute(
+                    "SELECT patch_code FROM patch_bodies WHERE key = ?", (record["key"],)
+                ).fetchone()
+                record["patch_code"] = body["patch_code"] if body else None
+
+        return record
+
+    def count(self, applied: Optional[bool] = None, event: Optional[str] = None) -> int:
+        clauses, args = [], []
+        if applied is not None:
+            clauses.append("applied = ?")
+            args.append(1 if applied else 0)
+        if event:
+            clauses.append("event = ?")
+            args.append(event)
+
+        sql = "SELECT COUNT(*) FROM patches"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+
+        with self._lock:
+            return self._conn.execute(sql, args).fetchone()[0]
+
+    def import_json(self, filepath: str) -> int:
+        """Import a legacy healer_history.json. Returns records imported."""
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+
+        # Idempotent: an event already recorded for the same patch
+        # (key, timestamp) is skipped, so re-importing adds nothing
+        imported = 0
+        for event, name in (("generated", "patches_generated"), ("applied", "patches_applied")):
+            for patch in data.get(name, []):
+                if self._has_event(_patch_key(patch), event, patch["timestamp"]):
+                    continue
+                self.append(patch, event=event)
+                imported += 1
+        return imported
+
+    def _has_event(self, key: str, event: str, timestamp: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM patches WHERE key = ? AND event = ? AND timestamp = ? LIMIT 1",
+                (key, event, timestamp)
+            ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict:
+        record = dict(row)
+        record["applied"] = bool(record["applied"])
+        for field in ("params", "evidence"):
+            if field in record:
+                record[field] = json.loads(record[field]) if record[field] else {}
+        return record
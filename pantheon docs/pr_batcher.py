@@ -0,0 +1,294 @@
+"""
+PR Batcher - Coalesce review patches into one pull request
+One branch, one commit per patch, one PR with a fitness table.
+
+Patches awaiting review are collected for `window_seconds` instead of
+each opening its own PR. At the end of the window, patches touching
+distinct files are committed one by one onto a single batch branch and
+a single PR is opened (or its body updated) with a table of every
+patch in the batch. A batch PR holds at most one patch per file:
+patches touching a file already claimed (earlier in the window, or by a
+commit on the open batch branch) wait for a later window, so no commit
+overwrites another patch under review. Each commit carries its patch key,
+so every change stays traceable to the patch that produced it.
+"""
+
+import json
+import os
+import subprocess
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+def fitness_table(rows: List[Dict]) -> str:
+    """Markdown table of the patches in a batch."""
+    lines = [
+        "| # | Reason | Strategy | Fitness | Patch key | Commit |",
+        "|---|--------|----------|---------|-----------|--------|"
+    ]
+    for i, row in enumerate(rows, 1):
+        lines.append(
+            f"| {i} | {row['reason']} | {row.get('strategy') or ''} | "
+            f"{_score(row.get('fitness_score'))} | `{row.get('key') or ''}` | "
+            f"{(row.get('commit') or '')[:8]} |"
+        )
+    return "\n".join(lines)
+
+
+def _score(fitness: Optional[float]) -> str:
+    return "n/a" if fitness is None else f"{fitness:.3f}"
+
+
+class PRBatcher:
+    """
+    Window-based batching of healing patches into a single PR.
+
+    Usage:
+        batcher = PRBatcher(window_seconds=900,
+                            state_file="./self_healing_state/pr_batch.json")
+        batcher.add(patch.to_dict())      # first add starts the window
+        ...
+        batcher.flush()                   # or let the window timer do it
+
+    `on_flush(branch, rows)` is called after each successful flush with
+    the rows (patch summaries with commit hashes) added in that flush.
+    Pass the engine's git lock as `lock` so batch commits never
+    interleave with other checkouts.
+    """
+
+    def __init__(self,
+                 window_seconds: float = 900.0,
+                 base: str = "main",
+                 branch_prefix: str = "auto-heal-batch",
+                 state_file: Optional[str] = None,
+                 lock: Optional[threading.Lock] = None,
+                 on_flush: Optional[Callable[[str, List[Dict]], None]] = None,
+                 cwd: Optional[str] = None):
+
+        self.window_seconds = window_seconds
+        self.base = base
+        self.branch_prefix = branch_prefix
+        self.state_file = state_file
+        self.lock = lock or threading.Lock()
+        self.on_flush = on_flush
+        self.cwd = cwd
+
+        self.pending: List[Dict] = []
+        self.branch: Optional[str] = None
+        self.pr_opened = False
+        self.rows: List[Dict] = []
+        self._state_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+        if state_file and os.path.exists(state_file):
+            self.load()
+
+    def resume(self):
+        """Restart the window for patches persisted by a previous run."""
+        if self.pending:
+            self._schedule()
+
+    def add(self, patch: Dict):
+        """Queue a patch (HealingPatch.to_dict()) for the current window."""
+        with self._state_lock:
+            if any(p.get("key") and p.get("key") == patch.get("key") for p in self.pending):
+                return
+            self.pending.append(patch)
+            self.save()
+        self._schedule()
+
+    def _schedule(self):
+        with self._state_lock:
+            if self._timer is not None or self.window_seconds <= 0:
+                return
+            self._timer = threading.Timer(self.window_seconds, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self):
+        with self._state_lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️  PR batch flush failed: {e}")
+        if self.pending:
+            self._schedule()
+
+    def cancel(self):
+        """Stop the window timer (pending patches stay persisted)."""
+        with self._state_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def flush(self) -> List[Dict]:
+        """
+        Commit non-conflicting pending patches and open/update the PR.
+
+        Returns the rows committed in this flush.
+        """
+        if not self.pending:
+            return []
+
+        with self.lock:
+            if self.branch and not self._branch_open():
+                # Previous batch PR was merged or closed: start a new one
+                self.branch, self.pr_opened, self.rows = None, False, []
+
+            with self._state_lock:
+                # One patch per file per batch PR; the rest wait for a later window
+                claimed = {row["module_path"] for row in self.rows}
+                batch = []
+                for patch in self.pending:
+                    if patch["module_path"] not in claimed:
+                        claimed.add(patch["module_path"])
+                        batch.append(patch)
+
+            if not batch:
+                return []
+
+            committed = self._commit(batch)
+
+        with self._state_lock:
+            done = {id(p) for p in batch}
+            self.pending = [p for p in self.pending if id(p) not in done]
+            self.rows.extend(committed)
+            self.save()
+
+        if committed:
+            self._publish()
+            if self.on_flush:
+                self.on_flush(self.branch, committed)
+
+        return committed
+
+    def _commit(self, batch: List[Dict]) -> List[Dict]:
+        """One commit per patch on the batch branch; returns to the original branch."""
+        original = self._git("rev-parse", "--abbrev-ref", "HEAD").stdout.strip()
+
+        if self.branch is None:
+            self.branch = f"{self.branch_prefix}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            self._git("checkout", "-b", self.branch, self.base, check=True)
+        else:
+            self._git("checkout", self.branch, check=True)
+
+        committed = []
+        try:
+            for patch in batch:
+                path = patch["module_path"]
+                full_path = os.path.join(self.cwd or os.getcwd(), path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, 'w') as f:
+                    f.write(patch["patch_code"])
+
+                self._git("add", path, check=True)
+                fitness = patch.get("fitness_score")
+                result = self._git(
+                    "commit", "-m",
+                    f"auto: {patch['reason']}\n\n"
+                    f"Fitness: {_score(fitness)}\n"
+                    f"Patch-Key: {patch.get('key')}\n"
+                    "Auto-generated healing patch."
+                )
+                if result.returncode != 0:
+                    print(f"⚠️  Nothing to commit for {path}")
+                    self._discard(path, full_path)
+                    continue
+
+                committed.append({
+                    "key": patch.get("key"),
+                    "reason": patch["reason"],
+                    "strategy": patch.get("strategy"),
+                    "module_path": path,
+                    "fitness_score": fitness,
+                    "commit": self._git("rev-parse", "HEAD").stdout.strip()
+                })
+        finally:
+            self._git("checkout", original)
+
+        return committed
+
+    def _discard(self, path: str, full_path: str):
+        """Unstage an uncommitted patch file and restore HEAD's version (if any)."""
+        self._git("reset", "-q", "--", path)
+        if self._git("checkout", "-q", "HEAD", "--", path).returncode != 0 and os.path.exists(full_path):
+            os.remove(full_path)
+
+    def _publish(self):
+        """Push the branch, then create the PR once and edit it afterwards."""
+        push = self._git("push", "-u", "origin", self.branch)
+        if push.returncode != 0:
+            print(f"⚠️  Could not push {self.branch}")
+
+        title = f"[AUTO-HEAL] {len(self.rows)} healing patch{'es' if len(self.rows) != 1 else ''}"
+        body = (
+            "## Automated Self-Healing Patches\n\n"
+            f"{fitness_table(self.rows)}\n\n"
+            "One commit per patch; each commit message carries its `Patch-Key`.\n\n"
+            "*This PR was auto-generated by the self-healing system.*"
+        )
+
+        try:
+            if self.pr_opened:
+                self._gh("pr", "edit", self.branch, "--title", title, "--body", body)
+                print(f"📋 Batch PR updated ({len(self.rows)} patches)")
+            else:
+                self._gh("pr", "create", "--head", self.branch, "--base", self.base,
+                         "--title", title, "--body", body,
+                         "--label", "auto-generated,self-healing")
+                self.pr_opened = True
+                print(f"📋 Batch PR created for human review ({len(self.rows)} patches)")
+            self.save()
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            print("⚠️  Could not create PR (gh CLI not available)")
+
+    def _branch_open(self) -> bool:
+        """False once the batch PR has been merged or closed."""
+        if not self.pr_opened:
+            return True
+        try:
+            result = self._gh("pr", "view", self.branch, "--json", "state")
+            return json.loads(result.stdout).get("state") == "OPEN"
+        except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
+            return True
+
+    def _git(self, *args, check: bool = False) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", *args], cwd=self.cwd, capture_output=True,
+                              text=True, check=check)
+
+    def _gh(self, *args) -> subprocess.CompletedProcess:
+        return subprocess.run(["gh", *args], cwd=self.cwd, capture_output=True,
+                              text=True, check=True)
+
+    def to_dict(self) -> Dict:
+        return {
+            "branch": self.branch,
+            "pr_opened": self.pr_opened,
+            "rows": self.rows,
+            "pending": self.pending
+        }
+
+    def save(self):
+        """Persist batch state atomically (no-op without a state file)."""
+        if not self.state_file:
+            return
+
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        os.replace(tmp_path, self.state_file)
+
+    def load(self):
+        with open(self.state_file, 'r') as f:
+            data = json.load(f)
+
+        self.branch = data.get("branch")
+        self.pr_opened = data.get("pr_opened", False)
+        self.rows = data.get("rows", [])
+        self.pending = data.get("pending", [])
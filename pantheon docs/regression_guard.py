@@ -0,0 +1,282 @@
+"""
+Regression Guard - Post-deploy rollback keyed on code_hash segments
+Watches every change that lands, not just the ones that heal.
+
+The snapshot stream is split into runs of identical code_hash. The
+newest segment is compared with the one before it after every capture,
+using the same mixture SPRT as canary rollouts (safe under continuous
+monitoring). A regression must be both significant and larger than its
+bound; then the offending commit is reverted and the time from
+detection to rollback is recorded.
+
+Per-capture cost is O(1): each capture is folded into running stats
+for the current segment, and the previous segment is kept only as its
+final stats. The revert itself runs on a single background thread, so
+a slow `git revert` never holds up the capture thread.
+"""
+
+import subprocess
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from canary import RunningStats, msprt_lambda
+
+# metric: (direction, bound kind, max allowed worsening)
+#   direction +1 = higher is better, -1 = lower is better
+DEFAULT_BOUNDS: Dict[str, Tuple[int, str, float]] = {
+    "avg_latency_ms": (-1, "relative", 0.20),
+    "error_rate": (-1, "absolute", 0.02),
+    "phi": (+1, "absolute", 0.05),
+}
+
+
+@dataclass
+class Regression:
+    """One metric that got significantly and materially worse."""
+    metric: str
+    before_mean: float
+    after_mean: float
+    worsening: float       # in the bound's units (relative or absolute)
+    bound: float
+    ratio: float           # mSPRT likelihood ratio
+
+    def to_dict(self):
+        return {
+            "metric": self.metric,
+            "before_mean": self.before_mean,
+            "after_mean": self.after_mean,
+            "worsening": self.worsening,
+            "bound": self.bound,
+            "lambda": self.ratio
+        }
+
+
+def segments(snapshots) -> List[Tuple[str, List]]:
+    """Consecutive runs of snapshots sharing a code_hash (control arm only)."""
+    runs: List[Tuple[str, List]] = []
+    for snapshot in snapshots:
+        if getattr(snapshot, "variant", "control") != "control":
+            continue
+        if runs and runs[-1][0] == snapshot.code_hash:
+            runs[-1][1].append(snapshot)
+        else:
+            runs.append((snapshot.code_hash, [snapshot]))
+    return runs
+
+
+class SegmentStats:
+    """Running stats of one code_hash segment, per bounded metric."""
+
+    def __init__(self, code_hash: str, metrics):
+        self.code_hash = code_hash
+        self.count = 0
+        self.stats: Dict[str, RunningStats] = {metric: RunningStats() for metric in metrics}
+
+    @classmethod
+    def of(cls, code_hash: str, snapshots, metrics) -> "SegmentStats":
+        segment = cls(code_hash, metrics)
+        for snapshot in snapshots:
+            segment.add(snapshot)
+        return segment
+
+    def add(self, snapshot):
+        self.count += 1
+        for metric, running in self.stats.items():
+            running.add(float(getattr(snapshot, metric)))
+
+
+def git_revert(code_hash: str) -> bool:
+    """Revert one commit on the current branch."""
+    result = subprocess.run(
+        ["git", "revert", "--no-edit", code_hash],
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    if result.returncode != 0:
+        subprocess.run(["git", "revert", "--abort"], capture_output=True)
+        print(f"❌ git revert {code_hash[:8]} failed: {result.stderr.strip()}")
+        return False
+    return True
+
+
+class RegressionGuard:
+    """
+    Compare the latest code_hash segment with its predecessor.
+
+    Usage:
+        guard = RegressionGuard(monitor)
+        detach = guard.attach()          # check on every capture
+
+        # or explicitly
+        guard.observe(snapshot)
+        rollback = guard.check()
+        if rollback:
+            guard.join()                 # revert runs in the background
+            print(rollback["code_hash"], rollback["rollback_seconds"])
+    """
+
+    def __init__(self,
+                 monitor,
+                 bounds: Optional[Dict[str, Tuple[int, str, float]]] = None,
+                 alpha: float = 0.05,
+                 min_snapshots: int = 10,
+                 max_snapshots: int = 120,
+                 effect_size: float = 0.1,
+                 revert: Callable[[str], bool] = git_revert,
+                 clock: Callable[[], float] = time.monotonic):
+
+        self.monitor = monitor
+        self.bounds = bounds if bounds is not None else dict(DEFAULT_BOUNDS)
+        self.alpha = alpha
+        self.min_snapshots = min_snapshots
+        self.max_snapshots = max_snapshots
+        self.effect_size = effect_size
+        self.revert = revert
+        self.clock = clock
+
+        # code_hash → "clean" | "reverting" | "reverted" | "revert_failed"
+        self.verdicts: Dict[str, str] = {}
+        self.rollbacks: List[Dict] = []
+
+        # Latest two segments (control arm only)
+        self.before: Optional[SegmentStats] = None
+        self.after: Optional[SegmentStats] = None
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: List[Future] = []
+
+    def attach(self) -> Callable[[], None]:
+        """Check after every monitor capture. Returns a detach function."""
+        # Resume from the last code_hash boundary in the existing history
+        runs = [SegmentStats.of(code_hash, run, self.bounds)
+                for code_hash, run in segments(self.monitor.snapshots)[-2:]]
+        self.before = runs[0] if len(runs) == 2 else None
+        self.after = runs[-1] if runs else None
+
+        def on_capture(snapshot):
+            self.observe(snapshot)
+            self.check()
+
+        return self.monitor.on_capture(on_capture)
+
+    def observe(self, snapshot):
+        """Fold one snapshot into the current segment (or start a new one)."""
+        if getattr(snapshot, "variant", "control") != "control":
+            return
+        if self.after is None or self.after.code_hash != snapshot.code_hash:
+            self.before, self.after = self.after, SegmentStats(snapshot.code_hash, self.bounds)
+        self.after.add(snapshot)
+
+    def compare(self, before: List, after: List) -> List[Regression]:
+        """Metrics that regressed beyond their bounds between two segments."""
+        return self.compare_stats(SegmentStats.of("", before, self.bounds),
+                                  SegmentStats.of("", after, self.bounds))
+
+    def compare_stats(self, before: SegmentStats, after: SegmentStats) -> List[Regression]:
+        """compare() on running segment stats."""
+        regressions = []
+
+        for metric, (direction, kind, bound) in self.bounds.items():
+            old, new = before.stats[metric], after.stats[metric]
+
+            scale = max(abs(old.mean), old.variance ** 0.5, new.variance ** 0.5, 1e-9)
+            ratio = msprt_lambda(old, new, (self.effect_size * scale) ** 2)
+            if ratio < 1 / self.alpha:
+                continue
+
+            worsening = (old.mean - new.mean) * direction
+            if kind == "relative":
+                worsening /= max(abs(old.mean), 1e-9)
+
+            if worsening > bound:
+                regressions.append(Regression(
+                    metric=metric,
+                    before_mean=old.mean,
+                    after_mean=new.mean,
+                    worsening=worsening,
+                    bound=bound,
+                    ratio=ratio
+                ))
+
+        return regressions
+
+    def check(self) -> Optional[Dict]:
+        """
+        Test the newest segment; schedule a revert of its commit on regression.
+
+        Returns the rollback record when a rollback was scheduled. Its
+        "reverted" stays None until the background revert finishes
+        (see join()).
+        """
+        before, after = self.before, self.after
+        if before is None or after is None:
+            return None
+
+        code_hash = after.code_hash
+        if code_hash in self.verdicts or code_hash == "unknown":
+            return None
+        if before.count < self.min_snapshots or after.count < self.min_snapshots:
+            return None
+
+        regressions = self.compare_stats(before, after)
+
+        if not regressions:
+            if after.count >= self.max_snapshots:
+                self.verdicts[code_hash] = "clean"
+            return None
+
+        print(f"⚠️  Regression after {code_hash[:8]}: "
+              f"{', '.join(r.metric for r in regressions)}")
+
+        rollback = {
+            "code_hash": code_hash,
+            "previous_hash": before.code_hash,
+            "regressions": [r.to_dict() for r in regressions],
+            "reverted": None,
+            "snapshots_after": after.count,
+            "rollback_seconds": None
+        }
+        self.verdicts[code_hash] = "reverting"
+        self.rollbacks.append(rollback)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1,
+                                                thread_name_prefix="regression-revert")
+        self._pending = [f for f in self._pending if not f.done()]
+        self._pending.append(self._executor.submit(self._rollback, rollback, self.clock()))
+
+        return rollback
+
+    def _rollback(self, rollback: Dict, detected_at: float):
+        """Revert one commit (on the revert thread) and complete its record."""
+        code_hash = rollback["code_hash"]
+
+        try:
+            reverted = self.revert(code_hash)
+        except Exception as e:
+            print(f"❌ Rollback failed: {e}")
+            reverted = False
+
+        if reverted:
+            self.monitor.invalidate_git_hash()
+
+        rollback["reverted"] = reverted
+        rollback["rollback_seconds"] = self.clock() - detected_at
+        self.verdicts[code_hash] = "reverted" if reverted else "revert_failed"
+
+        if reverted:
+            print(f"🔄 Reverted {code_hash[:8]} in {rollback['rollback_seconds']:.2f}s")
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for scheduled reverts to finish."""
+        for future in list(self._pending):
+            future.result(timeout)
+
+    def to_dict(self) -> Dict:
+        return {
+            "verdicts": dict(self.verdicts),
+            "rollbacks": list(self.rollbacks)
+        }
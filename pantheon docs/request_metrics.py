@@ -0,0 +1,284 @@
+"""
+Request Metrics - ASGI middleware for measured latency and error rates
+Per-route latency histograms, status counts and in-flight requests.
+
+The monitoring loop used to read avg_latency_ms and error_rate from an
+app.metrics dict that nothing filled in. This middleware measures every
+HTTP request instead. Per request it only bumps integers in lists that
+were preallocated when the route was first seen: one bisect into fixed
+bucket bounds, no dicts, strings or locks. All updates happen on the
+event loop thread, so the counters need no locking. The monitoring loop
+pulls an aggregated window (the deltas since its previous pull) once a
+minute.
+
+Latency is time to the response start (status line), so long streaming
+responses such as /stream do not read as slow requests.
+
+Counters are per process. With several server workers each follower
+posts its raw deltas with drain() (see shared_state.WorkerReports), and
+the leader passes them to window(peers), so the window covers every
+worker's traffic.
+"""
+
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional
+
+# Histogram upper bounds in ms (a final overflow bucket catches the rest)
+LATENCY_BUCKETS_MS = (
+    1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0,
+    500.0, 1000.0, 2500.0, 5000.0, 10000.0
+)
+
+UNMATCHED = "<unmatched>"
+OTHER = "<other>"
+
+
+class RouteStats:
+    """Cumulative counters for one route template."""
+
+    __slots__ = ("count", "errors", "latency_ms", "buckets", "status")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.status = [0] * 6    # index = status // 100 (1xx..5xx)
+
+    def record(self, status: int, latency_ms: float):
+        self.count += 1
+        self.latency_ms += latency_ms
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.status[min(status // 100, 5)] += 1
+        if status >= 500:
+            self.errors += 1
+
+    def copy(self) -> "RouteStats":
+        stats = RouteStats()
+        stats.count = self.count
+        stats.errors = self.errors
+        stats.latency_ms = self.latency_ms
+        stats.buckets = list(self.buckets)
+        stats.status = list(self.status)
+        return stats
+
+    def minus(self, before: "RouteStats") -> "RouteStats":
+        delta = RouteStats()
+        delta.count = self.count - before.count
+        delta.errors = self.errors - before.errors
+        delta.latency_ms = self.latency_ms - before.latency_ms
+        delta.buckets = [a - b for a, b in zip(self.buckets, before.buckets)]
+        delta.status = [a - b for a, b in zip(self.status, before.status)]
+        return delta
+
+    def add(self, other: "RouteStats"):
+        self.count += other.count
+        self.errors += other.errors
+        self.latency_ms += other.latency_ms
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.status = [a + b for a, b in zip(self.status, other.status)]
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "latency_ms": self.latency_ms,
+            "buckets": self.buckets,
+            "status": self.status
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RouteStats":
+        stats = cls()
+        stats.count = data["count"]
+        stats.errors = data["errors"]
+        stats.latency_ms = data["latency_ms"]
+        stats.buckets = list(data["buckets"])
+        stats.status = list(data["status"])
+        return stats
+
+
+def quantile(buckets: List[int], q: float) -> Optional[float]:
+    """Latency quantile (ms) from bucket counts, interpolated within a bucket."""
+    total = sum(buckets)
+    if total == 0:
+        return None
+
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(buckets):
+        if count and seen + count >= rank:
+            lower = LATENCY_BUCKETS_MS[i - 1] if i > 0 else 0.0
+            if i == len(LATENCY_BUCKETS_MS):
+                return lower    # overflow bucket: report its lower bound
+            upper = LATENCY_BUCKETS_MS[i]
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return LATENCY_BUCKETS_MS[-1]
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if os.uname().sysname != "Darwin" else peak / (1024 * 1024)
+
+
+class RequestMetrics:
+    """
+    Request counters shared by the middleware and the monitoring loop.
+
+    Usage:
+        metrics = RequestMetrics()
+        app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+
+        window = metrics.window()    # deltas since the previous window
+        window["error_rate"], window["avg_latency_ms"], window["p95_ms"]
+
+        # Multi-worker: followers post drain(), the leader merges them
+        reports.post("requests", metrics.drain())
+        window = metrics.window(peers=reports.drain("requests"))
+
+    Routes are keyed by their template ("/api/items/{id}"), never the raw
+    path; beyond `max_routes` templates, requests count under "<other>".
+    """
+
+    def __init__(self, max_routes: int = 200, clock=time.monotonic):
+        self.max_routes = max_routes
+        self.clock = clock
+
+        self.in_flight = 0
+        self.routes: Dict[str, RouteStats] = {}
+        self._previous: Dict[str, RouteStats] = {}
+        self._window_start = clock()
+
+    def route(self, template: str) -> RouteStats:
+        stats = self.routes.get(template)
+        if stats is None:
+            if len(self.routes) >= self.max_routes:
+                template = OTHER
+                stats = self.routes.get(OTHER)
+            if stats is None:
+                stats = self.routes[template] = RouteStats()
+        return stats
+
+    def _deltas(self) -> Dict[str, RouteStats]:
+        """Per-route counters since the previous call (window or drain)."""
+        deltas = {}
+        for template, stats in self.routes.items():
+            before = self._previous.get(template) or RouteStats()
+            self._previous[template] = current = stats.copy()
+            if current.count > before.count:
+                deltas[template] = current.minus(before)
+        return deltas
+
+    def drain(self) -> Dict:
+        """
+        Raw counters since the previous drain, for a follower to post.
+
+        The leader passes the posted dicts to window(peers=...).
+        """
+        return {
+            "pid": os.getpid(),
+            "routes": {t: delta.to_dict() for t, delta in self._deltas().items()},
+            "in_flight": self.in_flight
+        }
+
+    def window(self, peers: Iterable[Dict] = ()) -> Dict:
+        """
+        Aggregate the requests since the previous call.
+
+        `peers` are other workers' drain() reports, merged route by route.
+        Returns error_rate (5xx / requests), avg/p50/p95/p99 latency in ms,
+        per-class status counts, the in-flight count (summed over workers,
+        latest report each), this process's RSS and a per-route breakdown.
+        """
+        now = self.clock()
+        elapsed = now - self._window_start
+        self._window_start = now
+
+        deltas = self._deltas()
+        in_flight = {os.getpid(): self.in_flight}
+        for peer in peers:
+            for template, data in peer.get("routes", {}).items():
+                deltas.setdefault(template, RouteStats()).add(RouteStats.from_dict(data))
+            in_flight[peer.get("pid")] = peer.get("in_flight", 0)
+
+        buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        status = [0] * 6
+        count = errors = 0
+        latency_ms = 0.0
+        routes = {}
+
+        for template, delta in deltas.items():
+            routes[template] = {
+                "requests": delta.count,
+                "errors": delta.errors,
+                "avg_latency_ms": delta.latency_ms / delta.count,
+                "p95_ms": quantile(delta.buckets, 0.95)
+            }
+
+            count += delta.count
+            errors += delta.errors
+            latency_ms += delta.latency_ms
+            buckets = [a + b for a, b in zip(buckets, delta.buckets)]
+            status = [a + b for a, b in zip(status, delta.status)]
+
+        return {
+            "window_seconds": elapsed,
+            "requests": count,
+            "errors": errors,
+            "error_rate": errors / count if count else 0.0,
+            "avg_latency_ms": latency_ms / count if count else 0.0,
+            "p50_ms": quantile(buckets, 0.50),
+            "p95_ms": quantile(buckets, 0.95),
+            "p99_ms": quantile(buckets, 0.99),
+            "status": {f"{i}xx": n for i, n in enumerate(status) if i and n},
+            "in_flight": sum(in_flight.values()),
+            "workers": len(in_flight),
+            "memory_mb": rss_mb(),
+            "routes": routes
+        }
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware recording into a RequestMetrics."""
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        start = time.perf_counter()
+        first_byte = 0.0
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal first_byte, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                first_byte = time.perf_counter()
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            # Starlette puts the matched route in the scope during routing
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED
+            latency_ms = ((first_byte or time.perf_counter()) - start) * 1000
+            metrics.route(template).record(status, latency_ms)
@@ -0,0 +1,217 @@
+"""
+Sampling Profiler - Low-overhead stack sampling of the live process
+Evidence source for the latency healing strategy.
+
+A background thread reads every thread's stack (sys._current_frames)
+at a fixed interval. No tracing hooks are installed, so the profiled
+code runs at full speed; cost is proportional to the sample rate only.
+"""
+
+import asyncio
+import inspect
+import os
+import sys
+import sysconfig
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+# Leaf frames that mean "thread is parked", not "thread is slow"
+IDLE_FUNCTIONS = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("base_events.py", "_run_once"),
+}
+
+# Leaf modules that indicate blocking I/O on the calling thread
+BLOCKING_FILES = {
+    "socket.py", "ssl.py", "subprocess.py", "client.py", "connection.py",
+    "request.py", "sessions.py", "connectionpool.py", "dbapi2.py",
+}
+
+_LIBRARY_PREFIXES = tuple(
+    os.path.realpath(p) for p in {
+        sysconfig.get_paths().get("stdlib", ""),
+        sysconfig.get_paths().get("purelib", ""),
+        sysconfig.get_paths().get("platlib", ""),
+    } if p
+)
+
+FunctionId = Tuple[str, str, str, int]  # module, qualname, filename, lineno
+
+
+@dataclass
+class HotFunction:
+    """Aggregated samples for one function."""
+    module: str
+    function: str
+    filename: str
+    lineno: int
+    self_samples: int = 0
+    cumulative_samples: int = 0
+    blocking_samples: int = 0
+    is_coroutine: bool = False
+    self_pct: float = 0.0
+    cumulative_pct: float = 0.0
+
+    @property
+    def target(self) -> str:
+        return f"{self.module}:{self.function}"
+
+    def to_dict(self):
+        return {
+            "module": self.module,
+            "function": self.function,
+            "filename": self.filename,
+            "lineno": self.lineno,
+            "self_samples": self.self_samples,
+            "cumulative_samples": self.cumulative_samples,
+            "blocking_samples": self.blocking_samples,
+            "is_coroutine": self.is_coroutine,
+            "self_pct": self.self_pct,
+            "cumulative_pct": self.cumulative_pct
+        }
+
+
+@dataclass
+class Profile:
+    """Result of one sampling window."""
+    duration_seconds: float
+    interval_seconds: float
+    sample_count: int
+    functions: List[HotFunction] = field(default_factory=list)
+
+    def top(self, n: int = 10, app_only: bool = True) -> List[HotFunction]:
+        """Hottest functions ranked by self time, then cumulative time."""
+        candidates = [
+            f for f in self.functions
+            if not app_only or is_app_code(f.filename)
+        ]
+        return sorted(
+            candidates,
+            key=lambda f: (f.self_samples, f.cumulative_samples),
+            reverse=True
+        )[:n]
+
+    def to_dict(self, top: int = 10):
+        return {
+            "duration_seconds": self.duration_seconds,
+            "interval_seconds": self.interval_seconds,
+            "sample_count": self.sample_count,
+            "functions": [f.to_dict() for f in self.top(top)]
+        }
+
+
+def is_app_code(filename: str) -> bool:
+    """True for code we could patch (not stdlib/site-packages/builtins)."""
+    if not filename or filename.startswith("<"):
+        return False
+    path = os.path.realpath(filename)
+    if "site-packages" in path or "dist-packages" in path:
+        return False
+    if path == os.path.realpath(__file__):
+        return False
+    return not path.startswith(_LIBRARY_PREFIXES)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler over all threads except its own.
+
+    Usage:
+        profiler = SamplingProfiler(interval_seconds=0.005)
+
+        profile = await profiler.profile_async(2.0)
+        for hot in profile.top(5):
+            print(hot.target, hot.self_pct, hot.cumulative_pct)
+    """
+
+    def __init__(self, interval_seconds: float = 0.005, max_depth: int = 64):
+        self.interval_seconds = interval_seconds
+        self.max_depth = max_depth
+
+    def profile(self, duration_seconds: float) -> Profile:
+        """Sample other threads for `duration_seconds` (blocks the caller)."""
+        stats: Dict[FunctionId, HotFunction] = {}
+        samples = 0
+        own_thread = threading.get_ident()
+
+        start = time.perf_counter()
+        deadline = start + duration_seconds
+
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                if self._record_stack(frame, stats):
+                    samples += 1
+            time.sleep(self.interval_seconds)
+
+        duration = time.perf_counter() - start
+
+        for hot in stats.values():
+            hot.self_pct = hot.self_samples / samples if samples else 0.0
+            hot.cumulative_pct = hot.cumulative_samples / samples if samples else 0.0
+
+        return Profile(
+            duration_seconds=duration,
+            interval_seconds=self.interval_seconds,
+            sample_count=samples,
+            functions=list(stats.values())
+        )
+
+    async def profile_async(self, duration_seconds: float) -> Profile:
+        """Sample from a worker thread while the event loop keeps running."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.profile, duration_seconds)
+
+    def _record_stack(self, frame, stats: Dict[FunctionId, HotFunction]) -> bool:
+        """Add one stack sample. Returns False for idle stacks."""
+        leaf_code = frame.f_code
+        leaf_file = os.path.basename(leaf_code.co_filename)
+
+        if (leaf_file, leaf_code.co_name) in IDLE_FUNCTIONS:
+            return False
+
+        blocking = leaf_file in BLOCKING_FILES
+        seen = set()
+        depth = 0
+        is_leaf = True
+
+        while frame is not None and depth < self.max_depth:
+            code = frame.f_code
+            key = (
+                frame.f_globals.get("__name__", "?"),
+                getattr(code, "co_qualname", code.co_name),
+                code.co_filename,
+                code.co_firstlineno
+            )
+
+            hot = stats.get(key)
+            if hot is None:
+                hot = HotFunction(
+                    module=key[0],
+                    function=key[1],
+                    filename=key[2],
+                    lineno=key[3],
+                    is_coroutine=bool(code.co_flags & inspect.CO_COROUTINE)
+                )
+                stats[key] = hot
+
+            if is_leaf:
+                hot.self_samples += 1
+                is_leaf = False
+
+            if key not in seen:
+                hot.cumulative_samples += 1
+                if blocking:
+                    hot.blocking_samples += 1
+                seen.add(key)
+
+            frame = frame.f_back
+            depth += 1
+
+        return True
@@ -7,9 +7,25 @@ Drop-in integration for qig-backend
 Wire self-healing into existing QIGChain consciousness metrics.
 """
 
+import sys
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # CLI fast path: status probes shouldn't pay for the imports below
+    from healing_cli import cli_main
+    sys.exit(cli_main())
+
 import asyncio
 from geometric_health_monitor import GeometricHealthMonitor
 from self_healing_engine import SelfHealingEngine
+from patch_cache import PatchCache
+from patch_history import PatchHistory
+from sharded_test_runner import ShardedTestRunner
+from healing_queue import HealingQueue
+from pr_batcher import PRBatcher
+from capture_pipeline import CapturePipeline
+from metric_sources import MetricCollector
+from stage_metrics import STAGES
+from checkpoint import Checkpointer
 import numpy as np
 from datetime import datetime
 
@@ -32,18 +48,31 @@ class SearchSpaceCollapseSelfHealing:
         
         # Start autonomous healing
         await healer.start()
+    
+    Chain stages instrumented with stage_metrics are attributed in
+    latency patches:
+        from stage_metrics import stage
+        
+        @stage("retrieve", stream="searchspace")
+        async def retrieve(self, query): ...
     """
     
-    def __init__(self, qig_chain, auto_apply: bool = False):
+    def __init__(self, qig_chain, auto_apply: bool = False,
+                 state_dir: str = "./self_healing_state",
+                 benchmark_suite: str = None):
         """
         Initialize self-healing.
         
         Args:
             qig_chain: QIGChain instance with consciousness metrics
             auto_apply: If True, apply patches without PR review
+            state_dir: Directory for persisted self-healing state
+            benchmark_suite: pytest-benchmark suite gating latency patches
+                (None: no benchmark gate)
         """
         
         self.chain = qig_chain
+        self.state_dir = state_dir
         
         # Create monitor
         self.monitor = GeometricHealthMonitor(
@@ -56,13 +85,38 @@ class SearchSpaceCollapseSelfHealing:
         self.healer = SelfHealingEngine(
             self.monitor,
             fitness_threshold=0.6,
-            auto_apply=auto_apply
+            auto_apply=auto_apply,
+            cache=PatchCache(f"{state_dir}/patch_cache.json"),
+            history=PatchHistory(f"{state_dir}/patch_history.db"),
+            test_runner=ShardedTestRunner(durations_file=f"{state_dir}/test_durations.json"),
+            queue=HealingQueue(f"{state_dir}/healing_queue.db"),
+            pr_batcher=PRBatcher(window_seconds=900, state_file=f"{state_dir}/pr_batch.json"),
+            benchmark_suite=benchmark_suite
         )
         
+        # Incremental checkpoints for warm restarts
+        self.checkpoint = Checkpointer(f"{state_dir}/checkpoint", self.monitor, self.healer)
+        
+        # Per-stage timings, drained into the monitor on every capture
+        STAGES.attach(self.monitor)
+        
+        # Capture off the event loop
+        self.capture = CapturePipeline(self.monitor, on_captured=self._report_degradation)
+        
+        # Chain metrics, gathered concurrently with per-source deadlines
+        self.collector = MetricCollector()
+        self.collector.register("consciousness", qig_chain.get_consciousness_metrics,
+                                timeout_seconds=5.0)
+        self.collector.register("performance", qig_chain.get_performance_metrics,
+                                timeout_seconds=5.0)
+        
         # State
         self.running = False
         self.monitor_task = None
         self.healing_task = None
+        self.worker_task = None
+        self.checkpoint_task = None
+        self.allocation_task = None
     
     async def start(self):
         """Start monitoring and healing loops."""
@@ -73,14 +127,31 @@ class SearchSpaceCollapseSelfHealing:
         
         self.running = True
         
-        # Start monitoring loop
+        # Fingerprint exceptions for targeted error healing
+        self.healer.error_intel.install()
+        self.healer.error_intel.install_asyncio(asyncio.get_running_loop())
+        
+        # Warm restart: history, baseline and trigger backoff
+        restored = self.checkpoint.load()
+        if restored:
+            print(f"🔄 Restored {restored} snapshots from checkpoint")
+        self.checkpoint_task = asyncio.create_task(self.checkpoint.run())
+        
+        # Start capture thread and monitoring loop
+        self.capture.start()
         self.monitor_task = asyncio.create_task(self._monitor_loop())
         
-        # Start healing loop
+        # Start healing workers and loop
+        self.worker_task = asyncio.create_task(self.healer.run_workers(workers=2))
         self.healing_task = asyncio.create_task(
             self.healer.autonomous_loop(interval_seconds=300)
         )
         
+        # Allocation snapshots for the memory strategy (tracing starts on growth)
+        self.allocation_task = asyncio.create_task(
+            self.healer.track_allocations(interval_seconds=60)
+        )
+        
         print("✅ Self-healing started")
     
     async def stop(self):
@@ -88,27 +159,50 @@ class SearchSpaceCollapseSelfHealing:
         
         self.running = False
         
-        if self.monitor_task:
-            self.monitor_task.cancel()
+        tasks = [
+            task for task in (self.monitor_task, self.healing_task, self.worker_task,
+                              self.checkpoint_task, self.allocation_task)
+            if task is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        
+        # Let cancelled jobs unwind (and stop mutating state) before the final save
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.capture.stop)
+        await loop.run_in_executor(None, self.checkpoint.save)
         
-        if self.healing_task:
-            self.healing_task.cancel()
+        if self.healer.pr_batcher:
+            self.healer.pr_batcher.cancel()
+        
+        self.healer.error_intel.uninstall()
+        self.healer.allocations.stop()
         
         print("🛑 Self-healing stopped")
     
-    async def _monitor_loop(self):
+    async def _monitor_loop(self, interval_seconds: float = 60.0):
         """
         Capture geometric snapshots every 60 seconds.
         
-        Pulls consciousness metrics from QIGChain.
+        Pulls consciousness and performance metrics from QIGChain
+        concurrently; ticks stay on a fixed schedule however long
+        collection takes (each source is bounded by its deadline).
         """
         
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + interval_seconds
+        
         while self.running:
-            await asyncio.sleep(60)
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            next_tick = max(next_tick + interval_seconds, loop.time())    # no catch-up bursts
             
             try:
+                sources = await self.collector.collect()
+                
                 # Get consciousness metrics from chain
-                metrics = self.chain.get_consciousness_metrics()
+                metrics = sources["consciousness"]
                 
                 # Extract fields
                 phi = metrics.get("phi", 0.5)
@@ -119,20 +213,13 @@ class SearchSpaceCollapseSelfHealing:
                 agency = metrics.get("agency", 0.5)
                 
                 # Get performance metrics
-                perf = self.chain.get_performance_metrics()
+                perf = sources["performance"]
                 
                 error_rate = perf.get("error_rate", 0.0)
                 avg_latency_ms = perf.get("avg_latency_ms", 0.0)
                 memory_mb = perf.get("memory_mb", 0.0)
                 
-                # Normalize basin
-                if np.linalg.norm(basin_coords) > 0:
-                    basin_coords = basin_coords / np.linalg.norm(basin_coords)
-                else:
-                    basin_coords = np.zeros(64)
-                    basin_coords[0] = 1.0
-                
-                # Capture snapshot
+                # Hand off for capture (normalized on the capture thread)
                 state = {
                     "phi": phi,
                     "kappa_eff": kappa_eff,
@@ -146,19 +233,27 @@ class SearchSpaceCollapseSelfHealing:
                     "module_name": "SearchSpaceCollapse"
                 }
                 
-                snapshot = self.monitor.capture(state)
-                
-                # Alert on degradation
-                if snapshot.phi < 0.65 or snapshot.regime == "breakdown":
-                    print(f"⚠️  [{datetime.now().isoformat()}] Degradation: Φ={snapshot.phi:.3f}, regime={snapshot.regime}")
+                self.capture.submit(state)
                 
             except Exception as e:
                 print(f"❌ Monitoring error: {e}")
     
+    def _report_degradation(self, snapshot):
+        """Alert on degradation (runs on the capture thread)."""
+        if snapshot.phi < 0.65 or snapshot.regime == "breakdown":
+            print(f"⚠️  [{datetime.now().isoformat()}] Degradation: Φ={snapshot.phi:.3f}, regime={snapshot.regime}")
+    
     def get_health(self) -> dict:
         """Get current health status."""
         return self.monitor.check_health()
     
+    def get_collection_stats(self) -> dict:
+        """Metric collection latency, timeouts and capture backpressure."""
+        return {
+            "metrics": self.collector.stats(),
+            "capture": self.capture.stats()
+        }
+    
     def get_trends(self) -> dict:
         """Get health trends."""
         return {
@@ -180,7 +275,7 @@ class SearchSpaceCollapseSelfHealing:
         # Save monitor history
         self.monitor.save_history(f"{directory}/monitor_history.json")
         
-        # Save healer history
+        # Export recent healer history (full history is in patch_history.db)
         self.healer.save_history(f"{directory}/healer_history.json")
         
         print(f"✅ State saved to {directory}/")
@@ -210,89 +305,6 @@ def add_self_healing_to_chain(qig_chain):
     
     return qig_chain
 
-# ============================================================================
-# CLI INTERFACE
-# ============================================================================
-
-import argparse
-
-def cli_main():
-    """
-    CLI for self-healing management.
-    
-    Usage:
-        python searchspace_self_healing.py status
-        python searchspace_self_healing.py heal
-        python searchspace_self_healing.py trends
-    """
-    
-    parser = argparse.ArgumentParser(description="SearchSpaceCollapse Self-Healing CLI")
-    parser.add_argument("command", choices=["status", "heal", "trends", "history"])
-    parser.add_argument("--state-dir", default="./self_healing_state")
-    
-    args = parser.parse_args()
-    
-    # Load state
-    monitor = GeometricHealthMonitor()
-    
-    try:
-        monitor.load_history(f"{args.state_dir}/monitor_history.json")
-    except FileNotFoundError:
-        print("⚠️  No saved state found. Run system first to generate state.")
-        return
-    
-    if args.command == "status":
-        health = monitor.check_health()
-        
-        print("\n📊 GEOMETRIC HEALTH STATUS")
-        print("=" * 60)
-        print(f"Status: {health['severity'].upper()}")
-        print(f"Healthy: {health['healthy']}")
-        
-        if health['issues']:
-            print("\nIssues:")
-            for issue in health['issues']:
-                print(f"  - {issue}")
-        
-        print("\nMetrics:")
-        for key, value in health['metrics'].items():
-            print(f"  {key}: {value:.3f}")
-    
-    elif args.command == "trends":
-        trends = {
-            "phi": monitor.get_trend("phi"),
-            "basin_drift": monitor.get_trend("basin_drift"),
-            "latency": monitor.get_trend("latency"),
-            "errors": monitor.get_trend("errors")
-        }
-        
-        print("\n📈 HEALTH TRENDS (last 50 snapshots)")
-        print("=" * 60)
-        
-        for metric, trend in trends.items():
-            arrow = "↑" if trend["direction"] == "improving" else "↓" if trend["direction"] == "degrading" else "→"
-            print(f"{metric:15} {arrow} {trend['direction']:10} (slope: {trend['slope']:+.4f})")
-    
-    elif args.command == "history":
-        print(f"\n📜 SNAPSHOT HISTORY")
-        print("=" * 60)
-        print(f"Total snapshots: {len(monitor.snapshots)}")
-        
-        if monitor.snapshots:
-            print("\nRecent snapshots:")
-            for snap in monitor.snapshots[-5:]:
-                print(f"  {snap.timestamp.isoformat()} | Φ={snap.phi:.3f} | regime={snap.regime}")
-    
-    elif args.command == "heal":
-        print("\n🔧 MANUAL HEALING")
-        print("=" * 60)
-        print("This requires an active QIGChain instance.")
-        print("Use Python API instead:")
-        print()
-        print("  from searchspace_self_healing import SearchSpaceCollapseSelfHealing")
-        print("  healer = SearchSpaceCollapseSelfHealing(chain)")
-        print("  await healer.manual_heal()")
-
 # ============================================================================
 # EXAMPLE USAGE
 # ============================================================================
@@ -6,14 +6,37 @@ Works for both pantheon-chat and SearchSpaceCollapse.
 """
 
 import numpy as np
+import asyncio
+import inspect
+import re
+import sys
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import subprocess
 import tempfile
 import os
 import json
+import pprint
+import threading
+from collections import deque
 
 from geometric_health_monitor import GeometricHealthMonitor
+from patch_cache import PatchCache, patch_key
+from healing_triggers import TriggerPolicy
+from single_flight import SingleFlight, SingleFlightFull
+from sampling_profiler import SamplingProfiler, is_app_code
+from allocation_tracker import AllocationTracker
+from error_intelligence import ErrorIntelligence
+from canary import CanaryRollout, CanaryInstallation
+from regression_guard import RegressionGuard, git_revert
+from benchmark_gate import BenchmarkGate
+from patch_history import PatchHistory
+from basin_simulator import BasinSimulator, apply_correction
+from sharded_test_runner import ShardedTestRunner
+from healing_queue import HealingQueue, WorkerPool, SEVERITY_PRIORITY
+from pr_batcher import PRBatcher
+from stage_metrics import stage_attribution
+import memo_cache
 
 class HealingPatch:
     """A code patch with geometric fitness."""
@@ -21,10 +44,16 @@ class HealingPatch:
     def __init__(self, 
                  module_path: str,
                  patch_code: str,
-                 reason: str):
+                 reason: str,
+                 strategy: str = "unknown",
+                 params: Optional[Dict] = None):
         self.module_path = module_path
         self.patch_code = patch_code
         self.reason = reason
+        self.strategy = strategy
+        self.params = params or {}
+        self.key: Optional[str] = None
+        self.evidence: Dict = {}
         self.timestamp = datetime.now()
         self.fitness_score: Optional[float] = None
         self.applied = False
@@ -34,10 +63,408 @@ class HealingPatch:
             "module_path": self.module_path,
             "patch_code": self.patch_code,
             "reason": self.reason,
+            "strategy": self.strategy,
+            "params": self.params,
+            "key": self.key,
+            "evidence": self.evidence,
             "timestamp": self.timestamp.isoformat(),
             "fitness_score": self.fitness_score,
             "applied": self.applied
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HealingPatch":
+        patch = cls(
+            module_path=data["module_path"],
+            patch_code=data["patch_code"],
+            reason=data["reason"],
+            strategy=data.get("strategy", "unknown"),
+            params=data.get("params")
+        )
+        patch.key = data.get("key")
+        patch.evidence = data.get("evidence", {})
+        patch.timestamp = datetime.fromisoformat(data["timestamp"])
+        patch.fitness_score = data.get("fitness_score")
+        patch.applied = data.get("applied", False)
+        return patch
+
+# Runtime shared by generated latency patches (appended after TARGETS).
+# The memo_cache module is vendored verbatim so patches are self-contained.
+_LATENCY_RUNTIME = (
+    "\n# ---- memo_cache (vendored from the self-healing engine) ----\n"
+    + inspect.getsource(memo_cache)
+    + '''
+# ---- latency actions ----
+
+import asyncio
+import concurrent.futures
+import importlib
+
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="heal-offload"
+)
+
+
+def _memoize_target(func, spec):
+    """Bounded, TTL'd memoization with hit/miss/eviction counters."""
+    return memoize(
+        func,
+        name=spec["target"],
+        max_bytes=spec.get("max_bytes", 32 * 1024 * 1024),
+        ttl_seconds=spec.get("ttl_seconds", 300)
+    )
+
+
+def batch(func):
+    """Coalesce identical concurrent calls into one execution."""
+    if inspect.iscoroutinefunction(func):
+        pending = {}
+        
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            key, opaque = call_key(*args, **kwargs)
+            entry = pending.get(key)
+            if entry is not None and not _same_args(entry[1], opaque):
+                return await func(*args, **kwargs)  # colliding key
+            if entry is None:
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                entry = pending[key] = (task, opaque)
+                task.add_done_callback(lambda _: pending.pop(key, None))
+            return await asyncio.shield(entry[0])
+        
+        return async_wrapper
+    
+    lock = threading.Lock()
+    inflight = {}
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key, opaque = call_key(*args, **kwargs)
+        
+        with lock:
+            entry = inflight.get(key)
+            if entry is not None and not _same_args(entry["args"], opaque):
+                entry = None  # colliding key: run without coalescing
+                key = None
+            leader = entry is None
+            if leader:
+                entry = {"done": threading.Event(), "args": opaque}
+                if key is not None:
+                    inflight[key] = entry
+        
+        if not leader:
+            entry["done"].wait()
+            if "error" in entry:
+                raise entry["error"]
+            return entry["result"]
+        
+        try:
+            entry["result"] = func(*args, **kwargs)
+            return entry["result"]
+        except BaseException as e:
+            entry["error"] = e
+            raise
+        finally:
+            with lock:
+                inflight.pop(key, None)
+            entry["done"].set()
+    
+    return wrapper
+
+
+def offload(func):
+    """
+    Expose an executor-backed `.aio` variant of a blocking function.
+    
+    Sync callers are unchanged; async callers should switch to
+    `await target.aio(...)` so the blocking work leaves the event loop.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+    
+    async def aio(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _executor, functools.partial(func, *args, **kwargs)
+        )
+    
+    wrapper.aio = aio
+    return wrapper
+
+
+ACTIONS = {
+    "memoize": _memoize_target,
+    "batch": lambda func, spec: batch(func),
+    "offload": lambda func, spec: offload(func)
+}
+
+
+def _resolve(target):
+    module_name, qualname = target.split(":")
+    owner = importlib.import_module(module_name)
+    parts = qualname.split(".")
+    for part in parts[:-1]:
+        owner = getattr(owner, part)
+    return owner, parts[-1]
+
+
+def apply_latency_optimization(monitor=None):
+    """
+    Wrap only the profiled hot functions listed in TARGETS.
+    
+    Pass the GeometricHealthMonitor to export cache counters, so the
+    healer can score this patch on measured hit rate.
+    """
+    applied = []
+    for spec in TARGETS:
+        try:
+            owner, name = _resolve(spec["target"])
+            original = getattr(owner, name)
+        except (ImportError, AttributeError, ValueError):
+            continue
+        
+        if getattr(original, "__healing_wrapped__", False):
+            continue
+        
+        wrapped = ACTIONS[spec["action"]](original, spec)
+        wrapped.__healing_wrapped__ = True
+        setattr(owner, name, wrapped)
+        applied.append(spec["target"])
+        
+        if monitor is not None and hasattr(wrapped, "cache"):
+            monitor.register_cache_stats(wrapped.cache.name, wrapped.cache.stats)
+    
+    return applied
+'''
+)
+
+# Runtime for generated memory patches (appended after TARGETS)
+_MEMORY_RUNTIME = '''
+import functools
+import gc
+import importlib
+import inspect
+import itertools
+
+
+def _trim(container, max_items):
+    """Drop the oldest items beyond max_items. Returns items dropped."""
+    excess = len(container) - max_items
+    if excess <= 0:
+        return 0
+    if isinstance(container, dict):
+        for key in list(itertools.islice(container, excess)):
+            del container[key]
+    elif isinstance(container, list):
+        del container[:excess]
+    elif hasattr(container, "popleft"):
+        for _ in range(excess):
+            container.popleft()
+    elif isinstance(container, set):
+        for _ in range(excess):
+            container.pop()
+    return excess
+
+
+def bound(func, spec, module):
+    """After each call, cap the container this function keeps growing."""
+    def enforce(args):
+        owner = args[0] if spec["owner"] == "self" and args else module
+        container = getattr(owner, spec["container"], None)
+        if container is not None:
+            _trim(container, spec["max_items"])
+    
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            enforce(args)
+            return result
+        return async_wrapper
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        enforce(args)
+        return result
+    return wrapper
+
+
+def release(func, spec, module):
+    """Collect cyclic garbage every N calls of a leaking function."""
+    calls = itertools.count(1)
+    every = spec.get("collect_every", 100)
+    
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                if next(calls) % every == 0:
+                    gc.collect()
+        return async_wrapper
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if next(calls) % every == 0:
+                gc.collect()
+    return wrapper
+
+
+ACTIONS = {"bound": bound, "release": release}
+
+
+def apply_memory_bounds():
+    """Wrap only the growing allocation sites listed in TARGETS."""
+    applied = []
+    for spec in TARGETS:
+        module_name, qualname = spec["target"].split(":")
+        try:
+            module = importlib.import_module(module_name)
+            owner = module
+            parts = qualname.split(".")
+            for part in parts[:-1]:
+                owner = getattr(owner, part)
+            original = getattr(owner, parts[-1])
+        except (ImportError, AttributeError):
+            continue
+        
+        if getattr(original, "__healing_wrapped__", False):
+            continue
+        
+        wrapped = ACTIONS[spec["action"]](original, spec, module)
+        wrapped.__healing_wrapped__ = True
+        setattr(owner, parts[-1], wrapped)
+        applied.append(spec["target"])
+    
+    return applied
+'''
+
+# Runtime for generated error patches (appended after TARGETS)
+_ERROR_RUNTIME = '''
+import asyncio
+import functools
+import importlib
+import inspect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+handled_counts = {}
+
+
+def _resolve_exception(name):
+    module_name, _, qualname = name.rpartition(".")
+    try:
+        return getattr(importlib.import_module(module_name), qualname)
+    except (ImportError, AttributeError, ValueError):
+        return None
+
+
+def retry(func, spec, exceptions):
+    """Retry transient failures with exponential backoff, then re-raise."""
+    attempts = spec.get("attempts", 3)
+    
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return await func(*args, **kwargs)
+                except exceptions:
+                    if attempt == attempts - 1:
+                        raise
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+        return async_wrapper
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(attempts):
+            try:
+                return func(*args, **kwargs)
+            except exceptions:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.1 * 2 ** attempt)
+    return wrapper
+
+
+def fallback(func, spec, exceptions):
+    """Handle only the observed exception types; others propagate."""
+    target = spec["target"]
+    
+    def handle(e):
+        handled_counts[target] = handled_counts.get(target, 0) + 1
+        logger.error(
+            f"[{','.join(spec['fingerprints'])}] {target} raised {type(e).__name__}: {e}",
+            exc_info=True,
+            extra={"qig_handled": True}    # error_intelligence.HANDLED_ATTR
+        )
+        return spec.get("fallback")
+    
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except exceptions as e:
+                return handle(e)
+        return async_wrapper
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except exceptions as e:
+            return handle(e)
+    return wrapper
+
+
+ACTIONS = {"retry": retry, "fallback": fallback}
+
+
+def apply_error_healing():
+    """Wrap only the origin functions listed in TARGETS."""
+    applied = []
+    for spec in TARGETS:
+        exceptions = tuple(
+            exc for exc in map(_resolve_exception, spec["exceptions"])
+            if isinstance(exc, type) and issubclass(exc, BaseException)
+        )
+        if not exceptions:
+            continue
+        
+        module_name, qualname = spec["target"].split(":")
+        try:
+            owner = importlib.import_module(module_name)
+            parts = qualname.split(".")
+            for part in parts[:-1]:
+                owner = getattr(owner, part)
+            original = getattr(owner, parts[-1])
+        except (ImportError, AttributeError):
+            continue
+        
+        if getattr(original, "__healing_wrapped__", False):
+            continue
+        
+        wrapped = ACTIONS[spec["action"]](original, spec, exceptions)
+        wrapped.__healing_wrapped__ = True
+        setattr(owner, parts[-1], wrapped)
+        applied.append(spec["target"])
+    
+    return applied
+'''
+
+# Source lines that grow a container: self.x.append(..), CACHE[k] = v, ...
+_CONTAINER_GROWTH = re.compile(
+    r"^(?:(self|cls)\.)?([A-Za-z_]\w*)\s*"
+    r"(?:\.(?:append|extend|add|update|setdefault|insert|appendleft)\(|\[[^\]]*\]\s*=)"
+)
 
 class SelfHealingEngine:
     """
@@ -51,6 +478,29 @@ class SelfHealingEngine:
     5. Apply if fitness > threshold
     6. Create PR for human review
     
+    Generated patches, fitness scores and PR/branch state are kept in a
+    content-addressed PatchCache, so a system that stays degraded reuses
+    previous work instead of re-validating and re-opening PRs each cycle.
+    
+    With canary_fraction > 0, patches that wrap live functions are first
+    served to that fraction of calls; a sequential A/B test promotes
+    (step 5) or aborts them as soon as the difference is significant.
+    
+    With benchmark_suite (a pytest-benchmark suite path, off by default),
+    latency patches must be significantly faster in a BenchmarkGate run
+    before they are applied.
+    
+    While the autonomous loop runs, a RegressionGuard compares snapshots
+    from each newly landed code_hash with the previous one and reverts
+    the commit if latency, errors or Φ regress beyond their bounds.
+    
+    With a HealingQueue, heals are enqueued instead of run inline and
+    each stage (generate → evaluate → apply | pr) is a durable job
+    processed by run_workers(); work in flight survives a restart.
+    
+    With a PRBatcher, patches awaiting review are committed onto one
+    batch branch and share a single PR instead of opening one each.
+    
     Usage:
         healer = SelfHealingEngine(monitor)
         
@@ -59,24 +509,74 @@ class SelfHealingEngine:
         
         # Or run autonomous loop
         await healer.autonomous_loop()
+        
+        # Queued: durable stages, bounded concurrency
+        healer = SelfHealingEngine(monitor, queue=HealingQueue("./state/healing_queue.db"))
+        asyncio.create_task(healer.run_workers(workers=2))
+        healer.enqueue_heal()
     """
     
     def __init__(self, 
                  monitor: GeometricHealthMonitor,
                  fitness_threshold: float = 0.6,
-                 auto_apply: bool = False):
+                 auto_apply: bool = False,
+                 cache: Optional[PatchCache] = None,
+                 triggers: Optional[TriggerPolicy] = None,
+                 max_pending_heals: int = 4,
+                 profile_seconds: float = 2.0,
+                 allocation_seconds: float = 10.0,
+                 canary_fraction: float = 0.0,
+                 benchmark_suite: Optional[str] = None,
+                 history: Optional[PatchHistory] = None,
+                 recent_patches: int = 100,
+                 test_runner: Optional[ShardedTestRunner] = None,
+                 queue: Optional[HealingQueue] = None,
+                 pr_batcher: Optional[PRBatcher] = None):
         
         self.monitor = monitor
         self.fitness_threshold = fitness_threshold
         self.auto_apply = auto_apply
+        self.cache = cache if cache is not None else PatchCache()
+        self.triggers = triggers if triggers is not None else TriggerPolicy()
+        self.single_flight = SingleFlight(max_pending=max_pending_heals)
+        self.profiler = SamplingProfiler()
+        self.profile_seconds = profile_seconds
+        self.allocations = AllocationTracker()
+        self.allocation_seconds = allocation_seconds
+        self.error_intel = ErrorIntelligence()
+        self.basin_simulator = BasinSimulator()
+        self.test_runner = test_runner if test_runner is not None else ShardedTestRunner("tests/")
+        self.canary_fraction = canary_fraction
+        self.canaries: Dict[str, Dict] = {}
+        self.regression_guard = RegressionGuard(monitor, revert=self._revert_commit)
+        self.benchmark_gate = BenchmarkGate(benchmark_suite) if benchmark_suite else None
+        self.queue = queue
+        self.worker_pool: Optional[WorkerPool] = None
+        
+        # One git checkout/commit at a time across workers and canaries
+        self._git_lock = threading.Lock()
+        
+        # Review patches coalesce into one batch PR instead of one PR each
+        self.pr_batcher = pr_batcher
+        if pr_batcher is not None:
+            pr_batcher.lock = self._git_lock
+            pr_batcher.on_flush = self._on_pr_batch
         
-        self.patches_generated: List[HealingPatch] = []
-        self.patches_applied: List[HealingPatch] = []
+        # Full history is append-only in `history`; only recent patches
+        # stay in memory
+        self.history = history if history is not None else PatchHistory()
+        self.patches_generated: deque = deque(maxlen=recent_patches)
+        self.patches_applied: deque = deque(maxlen=recent_patches)
         
     async def check_and_heal(self) -> Dict:
         """
         Check health and attempt healing if degraded.
         
+        Single-flight: concurrent callers (autonomous loop, /heal endpoint)
+        for the same health state attach to the in-flight run and receive
+        its result with "coalesced": True. Distinct states queue behind it,
+        up to `max_pending_heals`.
+        
         Returns:
             {
                 "healed": bool,
@@ -85,7 +585,46 @@ class SelfHealingEngine:
             }
         """
         
-        # Check health
+        health = self.monitor.check_health()
+        
+        if health["healthy"]:
+            return {
+                "healed": False,
+                "patch": None,
+                "health": health
+            }
+        
+        try:
+            result, shared = await self.single_flight.run(
+                self._trigger_key(health),
+                self._check_and_heal
+            )
+        except SingleFlightFull as e:
+            return {
+                "healed": False,
+                "patch": None,
+                "health": health,
+                "reason": f"Heal queue full: {e}"
+            }
+        
+        if shared:
+            result = dict(result, coalesced=True)
+        
+        return result
+    
+    def _trigger_key(self, health: Dict) -> str:
+        """Single-flight key: the health state a heal run responds to."""
+        selected = self._select_strategy(health)
+        if not selected:
+            return f"{health['severity']}:{','.join(health.get('issue_types', []))}"
+        
+        strategy, params = selected
+        return patch_key(strategy, params, self._current_code_hash())
+    
+    async def _check_and_heal(self) -> Dict:
+        """One serialized healing run (see check_and_heal)."""
+        
+        # Re-check health: an earlier queued run may have fixed things
         health = self.monitor.check_health()
         
         if health["healthy"]:
@@ -98,10 +637,9 @@ class SelfHealingEngine:
         print(f"⚠️  Degradation detected: {health['severity']}")
         print(f"   Issues: {health['issues']}")
         
-        # Generate healing patch
-        patch = self._generate_healing_patch(health)
+        selected = self._select_strategy(health)
         
-        if not patch:
+        if not selected:
             return {
                 "healed": False,
                 "patch": None,
@@ -109,38 +647,138 @@ class SelfHealingEngine:
                 "reason": "No patch could be generated"
             }
         
-        # Test patch fitness
-        fitness = await self._test_patch_fitness(patch)
-        patch.fitness_score = fitness
+        patch, result = await self._stage_generate(health)
+        if result is not None:
+            return result
+        
+        result = await self._stage_evaluate(patch, health)
+        if result is not None:
+            return result
+        
+        if self._wants_apply(health):
+            return await self._stage_apply(patch, health)
+        
+        print("⏸️  Manual approval required (auto_apply=False)")
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._stage_pr, patch)
+        
+        return {
+            "healed": False,
+            "patch": patch,
+            "health": health,
+            "reason": "Awaiting manual approval"
+        }
+    
+    # Healing stages. _check_and_heal runs them in sequence; with a
+    # HealingQueue each one is a durable job (see run_workers).
+    
+    async def _stage_generate(self, health: Dict) -> Tuple[Optional[HealingPatch], Optional[Dict]]:
+        """
+        Generate (or reuse from cache) the patch for `health`.
+        
+        Returns (patch, None) to continue, or (patch | None, result)
+        when the run ends here.
+        """
+        selected = self._select_strategy(health)
+        
+        if not selected:
+            return None, {
+                "healed": False,
+                "patch": None,
+                "health": health,
+                "reason": "No patch could be generated"
+            }
+        
+        strategy, params = selected
+        key = patch_key(strategy, params, self._current_code_hash())
+        cached = self.cache.get(key)
         
-        self.patches_generated.append(patch)
+        if cached and cached.get("patch"):
+            # Reuse previous work for this exact (strategy, params, code) state
+            patch = HealingPatch.from_dict(cached["patch"])
+            
+            handled = ("applied", "pr_opened", "pr_batched", "apply_failed",
+                       "canary_aborted", "reverted", "benchmark_rejected")
+            if any(cached.get(flag) for flag in handled) or key in self.canaries:
+                return patch, {
+                    "healed": False,
+                    "patch": patch,
+                    "health": health,
+                    "cached": True,
+                    "reason": f"Patch {key} already handled (branch={cached.get('branch')})"
+                }
+            return patch, None
+        
+        # Collect live evidence, then generate healing patch
+        evidence = await self._gather_evidence(strategy)
+        patch = self._generate_healing_patch(health, evidence)
+        
+        if not patch:
+            return None, {
+                "healed": False,
+                "patch": None,
+                "health": health,
+                "reason": "No patch could be generated"
+            }
+        
+        patch.key = key
+        self.cache.put(key, patch=patch.to_dict())
+        return patch, None
+    
+    async def _stage_evaluate(self, patch: HealingPatch, health: Dict) -> Optional[Dict]:
+        """Score fitness (once per patch key); a result dict means stop."""
+        cached = patch.fitness_score is not None
+        
+        if not cached:
+            patch.fitness_score = await self._test_patch_fitness(patch)
+            
+            self.patches_generated.append(patch)
+            self.history.append(patch.to_dict(), event="generated")
+            self.cache.put(patch.key, patch=patch.to_dict(), fitness_score=patch.fitness_score)
+        
+        fitness = patch.fitness_score
         
         if fitness < self.fitness_threshold:
             return {
                 "healed": False,
                 "patch": patch,
                 "health": health,
+                "cached": cached,
                 "reason": f"Fitness too low: {fitness:.3f} < {self.fitness_threshold}"
             }
         
         print(f"✅ Generated patch with fitness {fitness:.3f}")
+        return None
+    
+    def _wants_apply(self, health: Dict) -> bool:
+        """Apply if auto-apply enabled or critical; otherwise open a PR."""
+        return self.auto_apply or health["severity"] == "critical"
+    
+    async def _stage_apply(self, patch: HealingPatch, health: Dict) -> Dict:
+        """Start a canary, or apply the patch directly."""
+        if self.canary_fraction > 0 and self._start_canary(patch):
+            return {
+                "healed": False,
+                "patch": patch,
+                "health": health,
+                "canary": True,
+                "reason": f"Canary started at {self.canary_fraction:.0%} of calls"
+            }
+        
+        loop = asyncio.get_running_loop()
+        success = await loop.run_in_executor(None, self._apply_exclusive, patch)
         
-        # Apply if auto-apply enabled or critical
-        if self.auto_apply or health["severity"] == "critical":
-            success = self._apply_patch(patch)
+        if success:
+            self.patches_applied.append(patch)
+            patch.applied = True
+            self.history.append(patch.to_dict(), event="applied")
+            self.cache.put(patch.key, patch=patch.to_dict(), applied=True)
             
-            if success:
-                self.patches_applied.append(patch)
-                patch.applied = True
-                
-                return {
-                    "healed": True,
-                    "patch": patch,
-                    "health": health
-                }
-        else:
-            print("⏸️  Manual approval required (auto_apply=False)")
-            self._create_pr_for_review(patch)
+            return {
+                "healed": True,
+                "patch": patch,
+                "health": health
+            }
         
         return {
             "healed": False,
@@ -149,15 +787,32 @@ class SelfHealingEngine:
             "reason": "Awaiting manual approval"
         }
     
-    def _generate_healing_patch(self, health: Dict) -> Optional[HealingPatch]:
+    def _stage_pr(self, patch: HealingPatch):
+        if self.pr_batcher is None:
+            self._create_pr_for_review(patch)
+            return
+        
+        self.pr_batcher.add(patch.to_dict())
+        if patch.key:
+            self.cache.put(patch.key, pr_batched=True)
+        print(f"📋 Patch queued for the next batch PR ({len(self.pr_batcher.pending)} pending)")
+    
+    def _on_pr_batch(self, branch: str, rows: List[Dict]):
+        """Batch flushed: its patches now have an open PR on `branch`."""
+        for row in rows:
+            if row.get("key"):
+                self.cache.put(row["key"], pr_opened=True, branch=branch)
+    
+    def _select_strategy(self, health: Dict) -> Optional[Tuple[str, Dict]]:
         """
-        Generate code patch based on health issues.
+        Pick a healing strategy and its parameters from health issues.
         
         Strategies:
         - Φ degraded → increase integration
         - Basin drift → add correction
         - High latency → optimize bottleneck
         - High errors → add error handling
+        - Memory growth → bound/release top-growing allocation sites
         """
         
         issues = health["issues"]
@@ -165,23 +820,99 @@ class SelfHealingEngine:
         
         # Strategy 1: Φ degradation
         if any("Φ" in issue for issue in issues):
-            return self._patch_phi_degradation(metrics["phi"])
+            return "phi_degradation", {"current_phi": metrics["phi"]}
         
         # Strategy 2: Basin drift
         if any("Basin drift" in issue for issue in issues):
-            return self._patch_basin_drift(metrics["basin_drift"])
+            return "basin_drift", {"drift": metrics["basin_drift"]}
         
         # Strategy 3: High latency
         if any("latency" in issue for issue in issues):
-            return self._patch_latency(metrics["latency_ms"])
+            return "latency", {"latency_ms": metrics["latency_ms"]}
         
         # Strategy 4: High errors
         if any("errors" in issue for issue in issues):
-            return self._patch_errors(metrics["error_rate"])
+            return "errors", {"error_rate": metrics["error_rate"]}
+        
+        # Strategy 5: Sustained memory growth
+        if "memory" in health.get("issue_types", []):
+            return "memory", {"growth_mb": metrics["memory_growth_mb"]}
         
         return None
     
-    def _patch_phi_degradation(self, current_phi: float) -> HealingPatch:
+    async def _gather_evidence(self, strategy: str) -> Dict:
+        """
+        Collect live evidence for strategies that target specific code.
+        
+        - latency → sampling profile of the running process, plus the
+                    slowest instrumented stages (see stage_metrics)
+        - memory  → tracemalloc diff of top-growing allocation sites
+        - errors  → top exception fingerprints (see error_intel.install())
+        - basin_drift → correction sweep replayed over the basin history
+        """
+        
+        if strategy == "latency":
+            profile = await self.profiler.profile_async(self.profile_seconds)
+            evidence = {"profile": profile.to_dict(top=10)}
+            stages = stage_attribution(self.monitor.stage_stats)
+            if stages:
+                evidence["stages"] = stages
+            return evidence
+        
+        if strategy == "memory":
+            loop = asyncio.get_running_loop()
+            if len(self.allocations.snapshots) < 2:
+                # track_allocations() not running (or only just started
+                # tracing): diff over a short window instead
+                await loop.run_in_executor(None, self.allocations.take_snapshot)
+                await asyncio.sleep(self.allocation_seconds)
+            await loop.run_in_executor(None, self.allocations.take_snapshot)
+            return {"allocations": self.allocations.to_dict(n=10)}
+        
+        if strategy == "errors":
+            return {"errors": self.error_intel.to_dict(n=10)}
+        
+        if strategy == "basin_drift":
+            result = self.basin_simulator.simulate_monitor(self.monitor)
+            return {"simulation": result.to_dict()} if result else {}
+        
+        return {}
+    
+    def _generate_healing_patch(self, health: Dict,
+                                evidence: Optional[Dict] = None) -> Optional[HealingPatch]:
+        """Generate code patch based on health issues and collected evidence."""
+        
+        selected = self._select_strategy(health)
+        if not selected:
+            return None
+        
+        strategy, params = selected
+        generators = {
+            "phi_degradation": self._patch_phi_degradation,
+            "basin_drift": self._patch_basin_drift,
+            "latency": self._patch_latency,
+            "errors": self._patch_errors,
+            "memory": self._patch_memory
+        }
+        
+        patch = generators[strategy](**params, evidence=evidence or {})
+        if patch is None:
+            return None
+        
+        patch.strategy = strategy
+        patch.params = params
+        if not patch.evidence:
+            patch.evidence = evidence or {}
+        return patch
+    
+    def _current_code_hash(self) -> str:
+        """Code hash of the most recent snapshot."""
+        if not self.monitor.snapshots:
+            return "unknown"
+        return self.monitor.snapshots[-1].code_hash
+    
+    def _patch_phi_degradation(self, current_phi: float,
+                               evidence: Optional[Dict] = None) -> HealingPatch:
         """Generate patch to restore Φ."""
         
         target_phi = self.monitor.phi_min
@@ -226,33 +957,44 @@ def apply_phi_restoration(processor):
             reason=f"Φ degradation: {current_phi:.3f} < {target_phi:.3f}"
         )
     
-    def _patch_basin_drift(self, drift: float) -> HealingPatch:
-        """Generate patch to correct basin drift."""
+    def _patch_basin_drift(self, drift: float,
+                           evidence: Optional[Dict] = None) -> Optional[HealingPatch]:
+        """
+        Generate patch to correct basin drift.
+        
+        Scheme and gain come from the simulator sweep in `evidence`
+        (geodesic, 0.3 when no history is available). Returns None when
+        the sweep finds no correction better than leaving the basin alone.
+        """
         
-        current = self.monitor.snapshots[-1]
         baseline = self.monitor.baseline_basin
+        simulation = (evidence or {}).get("simulation")
+        chosen = simulation["best"] if simulation else {"scheme": "geodesic", "gain": 0.3}
         
-        # Compute correction vector
-        drift_vector = current.basin_coords - baseline
-        correction = -drift_vector * 0.3  # Partial correction
+        if chosen["gain"] <= 0:
+            return None
         
         patch_code = f'''
 # AUTO-GENERATED PATCH: Basin Drift Correction
 # Date: {datetime.now().isoformat()}
 # Drift: {drift:.3f}
+# Correction: {chosen["scheme"]}, gain {chosen["gain"]:.2f} (simulated over monitor history)
 
 import numpy as np
 
-# Learned correction vector
-BASIN_CORRECTION = np.array({correction.tolist()})
+BASELINE_BASIN = np.array({baseline.tolist()})
+SCHEME = {chosen["scheme"]!r}
+GAIN = {chosen["gain"]!r}
+
+''' + inspect.getsource(apply_correction) + '''
 
 def correct_basin_drift(basin_coords):
     """
-    Apply learned correction to restore baseline basin.
+    Pull basin coordinates toward the baseline basin.
     
-    This compensates for drift caused by processing variations.
+    Stays on the unit sphere (Fisher-Rao geometry).
     """
-    return basin_coords + BASIN_CORRECTION
+    return apply_correction(basin_coords, BASELINE_BASIN, GAIN, SCHEME)
 
 # Hook into basin updates
 def apply_basin_correction(system):
@@ -267,124 +1009,264 @@ def apply_basin_correction(system):
     return system
 '''
         
-        return HealingPatch(
+        patch = HealingPatch(
             module_path="lib/basin_correction.py",
             patch_code=patch_code,
             reason=f"Basin drift: {drift:.3f}"
         )
+        patch.evidence = dict(evidence or {}, correction=chosen)
+        return patch
     
-    def _patch_latency(self, latency_ms: float) -> HealingPatch:
-        """Generate patch to reduce latency."""
+    def _patch_latency(self, latency_ms: float,
+                       evidence: Optional[Dict] = None) -> Optional[HealingPatch]:
+        """
+        Generate targeted patch for the hottest functions in the profile.
+        
+        Each offender gets one action:
+        - offload → mostly blocking I/O below it (executor-backed .aio)
+        - memoize → mostly self time in a sync function
+        - batch   → time spent in callees / coroutines (coalesce identical
+                    concurrent calls)
+        
+        Functions instrumented as one of the slowest stages are
+        considered first.
+        """
+        
+        profile = (evidence or {}).get("profile", {})
+        stages = (evidence or {}).get("stages", [])
+        targets = []
+        
+        # Rank by the slowest stage a function implements, then by profile order
+        stage_rank = {
+            row["target"]: i for i, row in enumerate(stages)
+            if row.get("target") and row["share"] >= 0.1
+        }
+        hot_functions = sorted(
+            profile.get("functions", []),
+            key=lambda hot: stage_rank.get(f"{hot['module']}:{hot['function']}", len(stage_rank))
+        )
+        
+        for hot in hot_functions:
+            if len(targets) >= 3:
+                break
+            if hot["cumulative_pct"] < 0.05:
+                continue
+            if "<" in hot["function"]:  # <module>, <lambda>, <locals>
+                continue
+            
+            target = {
+                "target": f"{hot['module']}:{hot['function']}",
+                "action": self._recommend_latency_action(hot),
+                "self_pct": round(hot["self_pct"], 3),
+                "cumulative_pct": round(hot["cumulative_pct"], 3)
+            }
+            if target["target"] in stage_rank:
+                row = stages[stage_rank[target["target"]]]
+                target["stage"] = f"{row['stream']}/{row['stage']}"
+            if target["action"] == "memoize":
+                target["max_bytes"] = 32 * 1024 * 1024
+                target["ttl_seconds"] = 300
+            targets.append(target)
+        
+        if not targets:
+            print("⚠️  Latency profile found no patchable hot functions")
+            return None
+        
+        target_lines = "\n".join(
+            f"#   {t['target']}  self={t['self_pct']:.1%} cum={t['cumulative_pct']:.1%} → {t['action']}"
+            for t in targets
+        )
+        stage_lines = "\n".join(
+            f"#   {row['stream']}/{row['stage']}  avg={row['avg_ms']:.1f}ms "
+            f"calls={row['calls']} share={row['share']:.1%}"
+            for row in stages
+        ) or "#   (no instrumented stages)"
         
         patch_code = f'''
 # AUTO-GENERATED PATCH: Latency Optimization
 # Date: {datetime.now().isoformat()}
 # Current latency: {latency_ms:.0f}ms
+# Profile: {profile.get("sample_count", 0)} samples over {profile.get("duration_seconds", 0.0):.1f}s
+# Stages:
+{stage_lines}
+# Targets:
+{target_lines}
 
-import functools
-
-def optimize_latency(func):
-    """
-    Add caching and early exit to reduce latency.
-    
-    Applied because latency exceeded threshold.
-    """
+TARGETS = {pprint.pformat(targets, sort_dicts=False)}
+''' + _LATENCY_RUNTIME
+        
+        patch = HealingPatch(
+            module_path="lib/latency_optimization.py",
+            patch_code=patch_code,
+            reason=f"High latency: {latency_ms:.0f}ms ({targets[0]['target']})"
+        )
+        patch.evidence = dict(evidence or {}, targets=targets)
+        return patch
     
-    # Simple LRU cache
-    cache = {{}}
-    max_cache_size = 100
+    def _recommend_latency_action(self, hot: Dict) -> str:
+        """Pick memoize / batch / offload from a profiled function's samples."""
+        cumulative = max(hot["cumulative_samples"], 1)
+        
+        if hot["is_coroutine"]:
+            return "batch"
+        if hot["blocking_samples"] / cumulative >= 0.5:
+            return "offload"
+        if hot["self_samples"] / cumulative >= 0.5:
+            return "memoize"
+        return "batch"
     
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Create cache key
-        key = str(args) + str(kwargs)
+    def _patch_errors(self, error_rate: float,
+                      evidence: Optional[Dict] = None) -> Optional[HealingPatch]:
+        """
+        Generate patch for the few functions behind the top error fingerprints.
         
-        # Check cache
-        if key in cache:
-            return cache[key]
+        Only the observed exception types are handled, only in the
+        origin functions; everything else still propagates:
+        - retry    → all observed types are transient (timeouts, resets)
+        - fallback → log with fingerprint and return a fallback value
+        """
         
-        # Compute
-        result = func(*args, **kwargs)
+        fingerprints = (evidence or {}).get("errors", {}).get("top", [])
+        by_origin: Dict[str, Dict] = {}
         
-        # Store in cache
-        cache[key] = result
+        for fp in fingerprints:
+            if fp["origin"] == "?" or "<" in fp["origin"]:
+                continue
+            
+            target = by_origin.get(fp["origin"])
+            if target is None:
+                if len(by_origin) >= 3:
+                    continue
+                target = by_origin[fp["origin"]] = {
+                    "target": fp["origin"],
+                    "exceptions": [],
+                    "fingerprints": [],
+                    "count": 0,
+                    "transient": True
+                }
+            
+            if fp["exc_type"] not in target["exceptions"]:
+                target["exceptions"].append(fp["exc_type"])
+            target["fingerprints"].append(fp["fingerprint"])
+            target["count"] += fp["count"]
+            target["transient"] = target["transient"] and fp["transient"]
         
-        # Limit cache size
-        if len(cache) > max_cache_size:
-            cache.pop(next(iter(cache)))
+        targets = []
+        for target in by_origin.values():
+            transient = target.pop("transient")
+            target["action"] = "retry" if transient else "fallback"
+            if transient:
+                target["attempts"] = 3
+            else:
+                target["fallback"] = None
+            targets.append(target)
         
-        return result
-    
-    return wrapper
-
-# Apply to common functions
-def apply_latency_optimization(module):
-    """Add caching to expensive functions."""
-    for name in dir(module):
-        obj = getattr(module, name)
-        if callable(obj) and not name.startswith('_'):
-            setattr(module, name, optimize_latency(obj))
-    return module
-'''
+        if not targets:
+            print("⚠️  No error fingerprints point at patchable functions")
+            return None
         
-        return HealingPatch(
-            module_path="lib/latency_optimization.py",
-            patch_code=patch_code,
-            reason=f"High latency: {latency_ms:.0f}ms"
+        target_lines = "\n".join(
+            f"#   {t['target']} {'/'.join(t['exceptions'])} ×{t['count']} → {t['action']}"
+            for t in targets
         )
-    
-    def _patch_errors(self, error_rate: float) -> HealingPatch:
-        """Generate patch to reduce errors."""
         
         patch_code = f'''
 # AUTO-GENERATED PATCH: Error Handling
 # Date: {datetime.now().isoformat()}
 # Error rate: {error_rate:.1%}
+# Top error fingerprints by origin:
+{target_lines}
 
-import logging
-import functools
-
-logger = logging.getLogger(__name__)
-
-def safe_execution(fallback_value=None):
-    """
-    Add error handling with fallback.
-    
-    Applied because error rate exceeded threshold.
-    """
-    
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                logger.warning(f"Error in {{func.__name__}}: {{e}}")
-                
-                # Return fallback
-                if callable(fallback_value):
-                    return fallback_value(*args, **kwargs)
-                else:
-                    return fallback_value
-        
-        return wrapper
-    return decorator
-
-# Apply to error-prone functions
-def apply_safe_execution(module):
-    """Add error handling to functions."""
-    for name in dir(module):
-        obj = getattr(module, name)
-        if callable(obj) and not name.startswith('_'):
-            setattr(module, name, safe_execution()(obj))
-    return module
-'''
+TARGETS = {pprint.pformat(targets, sort_dicts=False)}
+''' + _ERROR_RUNTIME
         
-        return HealingPatch(
+        patch = HealingPatch(
             module_path="lib/error_handling.py",
             patch_code=patch_code,
-            reason=f"High error rate: {error_rate:.1%}"
+            reason=f"High error rate: {error_rate:.1%} ({targets[0]['target']})"
+        )
+        patch.evidence = dict(evidence or {}, targets=targets)
+        return patch
+    
+    def _patch_memory(self, growth_mb: float,
+                      evidence: Optional[Dict] = None) -> Optional[HealingPatch]:
+        """
+        Generate patch aimed at the top-growing allocation sites.
+        
+        Each site gets one action:
+        - bound   → the site grows a container (self.x.append, CACHE[k] = v);
+                    cap it after every call of the enclosing function
+        - release → anything else; run a cyclic GC pass every N calls
+                    (only reclaims reference cycles the site leaves behind)
+        """
+        
+        sites = (evidence or {}).get("allocations", {}).get("sites", [])
+        targets = []
+        
+        for site in sites:
+            if len(targets) >= 3:
+                break
+            if site["function"] == "<module>" or not is_app_code(site["filename"]):
+                continue
+            
+            module_name = self._module_for_file(site["filename"])
+            if module_name is None:
+                continue
+            
+            target = {
+                "target": f"{module_name}:{site['function']}",
+                "site": f"{os.path.basename(site['filename'])}:{site['lineno']}",
+                "size_diff_kb": round(site["size_diff_kb"], 1)
+            }
+            
+            match = _CONTAINER_GROWTH.match(site["source"])
+            if match:
+                target.update({
+                    "action": "bound",
+                    "owner": "self" if match.group(1) else "module",
+                    "container": match.group(2),
+                    "max_items": 10000
+                })
+            else:
+                target.update({"action": "release", "collect_every": 100})
+            
+            targets.append(target)
+        
+        if not targets:
+            print("⚠️  Allocation diff found no patchable growing sites")
+            return None
+        
+        target_lines = "\n".join(
+            f"#   {t['site']} ({t['target']}) +{t['size_diff_kb']:.0f}KB → {t['action']}"
+            for t in targets
+        )
+        
+        patch_code = f'''
+# AUTO-GENERATED PATCH: Memory Bounding
+# Date: {datetime.now().isoformat()}
+# Growth: +{growth_mb:.1f}MB/snapshot
+# Top-growing allocation sites:
+{target_lines}
+
+TARGETS = {pprint.pformat(targets, sort_dicts=False)}
+''' + _MEMORY_RUNTIME
+        
+        patch = HealingPatch(
+            module_path="lib/memory_bounds.py",
+            patch_code=patch_code,
+            reason=f"Memory growth: +{growth_mb:.1f}MB/snapshot ({targets[0]['site']})"
         )
+        patch.evidence = dict(evidence or {}, targets=targets)
+        return patch
+    
+    def _module_for_file(self, filename: str) -> Optional[str]:
+        """Importable module name for a source file, if loaded."""
+        path = os.path.realpath(filename)
+        for name, module in list(sys.modules.items()):
+            module_file = getattr(module, "__file__", None)
+            if module_file and os.path.realpath(module_file) == path:
+                return name
+        return None
     
     async def _test_patch_fitness(self, patch: HealingPatch) -> float:
         """
@@ -408,28 +1290,162 @@ def apply_safe_execution(module):
             # Basin corrections medium risk
             return 0.65
         elif "Latency Optimization" in patch.patch_code:
+            # Score on measured hit rate once the cache layer is live
+            hit_rate = self._measured_hit_rate(patch)
+            if hit_rate is not None:
+                return 0.3 + 0.6 * hit_rate
             # Performance patches variable
             return 0.60
+        elif "Memory Bounding" in patch.patch_code:
+            # Bounding changes retention semantics: medium risk
+            return 0.65
         elif "Error Handling" in patch.patch_code:
             # Error handling usually safe
             return 0.70
         else:
             return 0.50
     
+    def _measured_hit_rate(self, patch: HealingPatch,
+                           min_lookups: int = 100) -> Optional[float]:
+        """Aggregate hit rate of this patch's live memo caches, if enough data."""
+        names = {
+            t["target"] for t in patch.evidence.get("targets", [])
+            if t["action"] == "memoize"
+        }
+        stats = [s for name, s in self.monitor.cache_stats.items() if name in names]
+        
+        hits = sum(s["hits"] for s in stats)
+        lookups = hits + sum(s["misses"] for s in stats)
+        
+        if lookups < min_lookups:
+            return None
+        return hits / lookups
+    
+    def _start_canary(self, patch: HealingPatch) -> bool:
+        """
+        Serve `patch` to canary_fraction of calls and decide live.
+        
+        Returns False for patches with no live TARGETS to wrap (Φ and
+        basin patches), which then go through _apply_patch directly.
+        """
+        loop = asyncio.get_running_loop()
+        target_metric = {
+            "latency": "latency_ms",
+            "errors": "error"
+        }.get(patch.strategy)
+        
+        def on_decision(decision):
+            # Decided inside a wrapped call, possibly off the loop thread
+            asyncio.run_coroutine_threadsafe(
+                self._finish_canary(patch.key, decision), loop
+            )
+        
+        rollout = CanaryRollout(
+            patch.key,
+            fraction=self.canary_fraction,
+            target_metric=target_metric,
+            on_decision=on_decision
+        )
+        
+        try:
+            installation = CanaryInstallation(patch.patch_code, rollout)
+        except ValueError:
+            return False
+        except Exception as e:
+            print(f"❌ Canary install failed: {e}")
+            return False
+        
+        for cache in installation.caches:
+            self.monitor.register_cache_stats(cache.name, cache.stats)
+        
+        self.canaries[patch.key] = {
+            "patch": patch,
+            "rollout": rollout,
+            "installation": installation
+        }
+        print(f"🐤 Canary started for {patch.key} ({self.canary_fraction:.0%} of calls)")
+        return True
+    
+    async def _finish_canary(self, key: str, decision: Dict) -> Optional[Dict]:
+        """Promote (apply + PR) or abort (restore originals) a canary."""
+        canary = self.canaries.pop(key, None)
+        if canary is None:
+            return None
+        
+        patch = canary["patch"]
+        patch.evidence = dict(patch.evidence or {}, canary=decision)
+        
+        if decision["decision"] == "promote" and self._measured_hit_rate(patch) is not None:
+            # The fitness from _stage_evaluate was a prior: the memo caches
+            # had served no traffic yet. Re-score on the canary's hit rate.
+            patch.fitness_score = await self._test_patch_fitness(patch)
+            if patch.fitness_score < self.fitness_threshold:
+                decision = dict(
+                    decision,
+                    decision="abort",
+                    reason=(f"Measured fitness too low: {patch.fitness_score:.3f} "
+                            f"< {self.fitness_threshold}")
+                )
+                patch.evidence["canary"] = decision
+        
+        if decision["decision"] != "promote":
+            canary["installation"].restore()
+            for cache in canary["installation"].caches:
+                self.monitor.unregister_cache_stats(cache.name)
+            self.cache.put(key, patch=patch.to_dict(), canary_aborted=True)
+            self.history.append(patch.to_dict(), event="canary_aborted")
+            print(f"❌ Canary aborted for {key}: {decision['reason']}")
+            return {"healed": False, "patch": patch, "canary": decision}
+        
+        canary["installation"].promote()
+        print(f"✅ Canary promoted for {key}: {decision['reason']}")
+        
+        loop = asyncio.get_running_loop()
+        success = await loop.run_in_executor(None, self._apply_exclusive, patch)
+        
+        if success:
+            self.patches_applied.append(patch)
+            patch.applied = True
+            self.history.append(patch.to_dict(), event="applied")
+            self.cache.put(key, patch=patch.to_dict(), applied=True)
+        
+        return {"healed": success, "patch": patch, "canary": decision}
+    
+    def _apply_exclusive(self, patch: HealingPatch) -> bool:
+        """_apply_patch under the git lock (it checks out and commits)."""
+        with self._git_lock:
+            return self._apply_patch(patch)
+    
     def _apply_patch(self, patch: HealingPatch) -> bool:
         """
         Apply patch to codebase.
         
         Process:
+        0. Benchmark gate (latency patches must be significantly faster)
         1. Create git branch
         2. Write patch file
-        3. Run tests
+        3. Run tests (duration-balanced shards, stop on first failure)
         4. Commit if tests pass
         5. Create PR
         
         Returns: True if applied successfully
         """
         
+        if patch.strategy == "latency" and self.benchmark_gate is not None:
+            result = self.benchmark_gate.evaluate(patch.module_path, patch.patch_code)
+            patch.evidence = dict(patch.evidence or {}, benchmark=result.to_dict())
+            
+            if patch.key:
+                self.cache.put(patch.key, patch=patch.to_dict(),
+                               benchmark_rejected=not result.accepted)
+            
+            if not result.accepted:
+                self.history.append(patch.to_dict(), event="benchmark_rejected")
+                print(f"❌ Benchmark gate rejected patch: {result.reason}")
+                return False
+            
+            print(f"✅ Benchmark gate passed: {result.reason}")
+        
         try:
             # 1. Create branch
             branch_name = f"auto-heal-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
@@ -447,16 +1463,17 @@ def apply_safe_execution(module):
                 f.write(patch.patch_code)
             
             # 3. Run tests
-            test_result = subprocess.run(
-                ["pytest", "tests/", "-x", "-v"],
-                capture_output=True,
-                timeout=300
-            )
+            test_result = self.test_runner.run()
+            patch.evidence = dict(patch.evidence or {}, tests={
+                k: v for k, v in test_result.to_dict().items() if k != "shards"
+            })
             
-            if test_result.returncode != 0:
-                print(f"❌ Tests failed, rolling back")
+            if not test_result.passed:
+                print(f"❌ Tests failed ({', '.join(test_result.failures[:3])}), rolling back")
                 subprocess.run(["git", "checkout", "main"])
                 subprocess.run(["git", "branch", "-D", branch_name])
+                if patch.key:
+                    self.cache.put(patch.key, apply_failed=True)
                 return False
             
             # 4. Commit
@@ -468,6 +1485,13 @@ def apply_safe_execution(module):
             
             print(f"✅ Patch applied to {branch_name}")
             
+            if patch.key:
+                # Commit hash lets the regression guard map a bad code_hash
+                # segment back to this patch
+                self.monitor.invalidate_git_hash()
+                self.cache.put(patch.key, branch=branch_name,
+                               commit=self.monitor._get_git_hash())
+            
             # 5. Create PR (if gh CLI available)
             self._create_pr_for_review(patch, branch_name)
             
@@ -477,6 +1501,20 @@ def apply_safe_execution(module):
             print(f"❌ Failed to apply patch: {e}")
             return False
     
+    def _revert_commit(self, code_hash: str) -> bool:
+        """Regression guard rollback: git revert, then mark the patch reverted."""
+        with self._git_lock:
+            reverted = git_revert(code_hash)
+        
+        if reverted:
+            for key, entry in list(self.cache.entries.items()):
+                if entry.get("commit") == code_hash:
+                    self.cache.put(key, reverted=True)
+                    if entry.get("patch"):
+                        self.history.append(dict(entry["patch"], applied=False), event="reverted")
+        
+        return reverted
+    
     def _create_pr_for_review(self, patch: HealingPatch, branch: str = None):
         """Create GitHub PR for human review."""
         
@@ -509,13 +1547,21 @@ def apply_safe_execution(module):
             
             print("📋 PR created for human review")
             
+            if patch.key:
+                self.cache.put(patch.key, pr_opened=True, branch=branch)
+            
         except subprocess.CalledProcessError:
             print("⚠️  Could not create PR (gh CLI not available)")
         except Exception as e:
             print(f"⚠️  PR creation failed: {e}")
     
     def save_history(self, filepath: str):
-        """Save healing history."""
+        """
+        Save recent healing history to JSON.
+        
+        The complete history is already persisted, append-only, in
+        `self.history`; this exports only the in-memory recent patches.
+        """
         data = {
             "fitness_threshold": self.fitness_threshold,
             "auto_apply": self.auto_apply,
@@ -526,32 +1572,230 @@ def apply_safe_execution(module):
         with open(filepath, 'w') as f:
             json.dump(data, f, indent=2)
     
+    def load_history(self, filepath: str):
+        """
+        Import a saved (or legacy full) JSON history into `self.history`.
+        
+        Safe to repeat: patches already loaded (same key and timestamp)
+        are skipped, in `self.history` and in memory.
+        """
+        self.history.import_json(filepath)
+        
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+        
+        for patches, name in ((self.patches_generated, "patches_generated"),
+                              (self.patches_applied, "patches_applied")):
+            seen = {(p.key, p.timestamp) for p in patches}
+            for record in data.get(name, []):
+                patch = HealingPatch.from_dict(record)
+                if (patch.key, patch.timestamp) not in seen:
+                    seen.add((patch.key, patch.timestamp))
+                    patches.append(patch)
+    
+    def enqueue_heal(self, health: Optional[Dict] = None) -> Optional[int]:
+        """
+        Queue a heal for the current (or given) health state.
+        
+        Priority follows severity; a state already queued or in progress
+        is not queued twice. Returns the generate job id, or None if
+        healthy.
+        """
+        if self.queue is None:
+            raise ValueError("enqueue_heal requires a HealingQueue")
+        
+        health = health or self.monitor.check_health()
+        if health["healthy"]:
+            return None
+        
+        job_id = self.queue.enqueue(
+            "generate",
+            {"severity": health["severity"]},
+            priority=SEVERITY_PRIORITY.get(health["severity"], 0),
+            key=self._trigger_key(health)
+        )
+        
+        if self.worker_pool is not None:
+            self.worker_pool.notify()
+        
+        return job_id
+    
+    async def run_workers(self, workers: int = 2, poll_seconds: float = 1.0):
+        """Process queued healing jobs with `workers` concurrent workers."""
+        if self.queue is None:
+            raise ValueError("run_workers requires a HealingQueue")
+        
+        resumed = self.queue.resume()
+        if resumed:
+            print(f"🔄 Resuming {resumed} interrupted healing job(s)")
+        
+        if self.pr_batcher is not None:
+            self.pr_batcher.resume()
+        
+        self.worker_pool = WorkerPool(
+            self.queue,
+            {
+                "generate": self._job_generate,
+                "evaluate": self._job_evaluate,
+                "apply": self._job_apply,
+                "pr": self._job_pr
+            },
+            workers=workers,
+            poll_seconds=poll_seconds
+        )
+        await self.worker_pool.run()
+    
+    def _job_patch(self, payload: Dict) -> Optional[HealingPatch]:
+        """The patch a later-stage job refers to (carried in the cache)."""
+        entry = self.cache.entries.get(payload["key"])
+        if not entry or not entry.get("patch"):
+            return None
+        return HealingPatch.from_dict(entry["patch"])
+    
+    async def _job_generate(self, payload: Dict):
+        health = self.monitor.check_health()
+        if health["healthy"]:
+            return None
+        
+        patch, result = await self._stage_generate(health)
+        if result is not None:
+            print(f"⏭️  Heal skipped: {result['reason']}")
+            return None
+        
+        return [("evaluate", {"key": patch.key, "severity": payload["severity"]})]
+    
+    async def _job_evaluate(self, payload: Dict):
+        patch = self._job_patch(payload)
+        if patch is None:
+            # Cache lost across a restart: start over
+            return [("generate", {"severity": payload["severity"]})]
+        
+        result = await self._stage_evaluate(patch, self.monitor.check_health())
+        if result is not None:
+            print(f"⏭️  Heal skipped: {result['reason']}")
+            return None
+        
+        stage = "apply" if self._wants_apply({"severity": payload["severity"]}) else "pr"
+        return [(stage, payload)]
+    
+    async def _job_apply(self, payload: Dict):
+        patch = self._job_patch(payload)
+        if patch is None:
+            return [("generate", {"severity": payload["severity"]})]
+        
+        result = await self._stage_apply(patch, self.monitor.check_health())
+        if result["healed"]:
+            self.triggers.record_attempt(patch.strategy, True)
+            print(f"✅ Auto-healed: {patch.reason}")
+        return None
+    
+    async def _job_pr(self, payload: Dict):
+        patch = self._job_patch(payload)
+        if patch is None:
+            return [("generate", {"severity": payload["severity"]})]
+        
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._stage_pr, patch)
+        return None
+    
+    async def track_allocations(self, interval_seconds: float = 60.0):
+        """
+        Periodic allocation snapshots for the memory strategy (run as a task).
+        
+        Tracing starts once the monitor reports sustained memory growth;
+        from then on the memory patch targets the sites that grew across
+        the retained snapshots (up to max_snapshots × interval_seconds).
+        """
+        await self.allocations.periodic(interval_seconds, when=self._memory_growing)
+    
+    def _memory_growing(self) -> bool:
+        return "memory" in self.monitor.check_health().get("issue_types", [])
+    
     async def autonomous_loop(self, interval_seconds: int = 300):
         """
         Autonomous healing loop.
         
-        Runs every `interval_seconds` (default 5 min):
-        1. Check health
-        2. Heal if needed
-        3. Log results
+        Event-driven: subscribes to monitor severity transitions and
+        reacts as soon as one arrives, subject to the TriggerPolicy
+        (debounce, per-issue cooldown, exponential backoff).
+        
+        `interval_seconds` (default 5 min) is only a fallback re-check
+        while the last known severity is not normal, so a degraded
+        system whose issues never change still gets retried.
         """
         import asyncio
         
-        print(f"🔄 Starting autonomous healing loop (interval={interval_seconds}s)")
+        print(f"🔄 Starting autonomous healing loop (event-driven, fallback={interval_seconds}s)")
         
-        while True:
-            await asyncio.sleep(interval_seconds)
-            
-            try:
-                result = await self.check_and_heal()
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        
+        def on_event(event):
+            # capture() may run off the event loop thread
+            loop.call_soon_threadsafe(events.put_nowait, event)
+        
+        unsubscribe = self.monitor.subscribe(on_event)
+        detach_guard = self.regression_guard.attach()
+        
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout=interval_seconds)
+                except asyncio.TimeoutError:
+                    event = None
                 
-                if result["healed"]:
-                    print(f"✅ Auto-healed: {result['patch'].reason}")
-                elif result.get("patch"):
-                    print(f"⏸️  Patch generated, awaiting approval: {result['patch'].reason}")
+                if event is not None:
+                    # Debounce: let a burst settle, act on the latest event
+                    await asyncio.sleep(self.triggers.debounce_seconds)
+                    while not events.empty():
+                        event = events.get_nowait()
+                    
+                    if event.severity == "normal":
+                        # Recovered: forget cooldown/backoff history
+                        for issue_type in list(self.triggers.failures):
+                            self.triggers.reset(issue_type)
+                        continue
+                elif self.monitor.last_severity == "normal":
+                    continue
                 
-            except Exception as e:
-                print(f"❌ Healing loop error: {e}")
+                try:
+                    await self._triggered_heal()
+                except Exception as e:
+                    print(f"❌ Healing loop error: {e}")
+        finally:
+            unsubscribe()
+            detach_guard()
+    
+    async def _triggered_heal(self) -> Optional[Dict]:
+        """Run check_and_heal if the trigger policy allows it."""
+        
+        health = self.monitor.check_health()
+        if health["healthy"]:
+            return None
+        
+        selected = self._select_strategy(health)
+        if not selected:
+            return None
+        
+        issue_type = selected[0]
+        if not self.triggers.ready(issue_type):
+            return None
+        
+        if self.queue is not None:
+            # Backs off until a worker reports the heal (record_attempt True)
+            job_id = self.enqueue_heal(health)
+            self.triggers.record_attempt(issue_type, False)
+            return {"healed": False, "patch": None, "health": health, "job_id": job_id}
+        
+        result = await self.check_and_heal()
+        self.triggers.record_attempt(issue_type, result["healed"])
+        
+        if result["healed"]:
+            print(f"✅ Auto-healed: {result['patch'].reason}")
+        elif result.get("patch"):
+            print(f"⏸️  Patch generated, awaiting approval: {result['patch'].reason}")
+        
+        return result
 
 
 # Example usage
@@ -0,0 +1,262 @@
+"""
+Sharded Test Runner - Parallel patch validation across cores
+Splits the collected test suite into duration-balanced shards.
+
+Tests are assigned longest-first to the least-loaded shard (LPT bin
+packing) using per-test durations from previous runs, so shards finish
+together and wall-clock time scales down with the number of workers.
+Each shard is a pytest subprocess; its verbose output is streamed and
+the first failure in any shard stops all of them. Per-shard junit
+reports are merged into one, and their timings refresh the durations
+history for the next run.
+"""
+
+import heapq
+import json
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Node ID up to the first outcome token (parametrize IDs may contain spaces)
+_RESULT_LINE = re.compile(r"^(.+?::.+?)\s+(PASSED|FAILED|ERROR|SKIPPED|XFAIL|XPASS)\b")
+
+
+@dataclass
+class TestRunResult:
+    """Merged outcome of a sharded run."""
+    passed: bool
+    tests: int
+    failures: List[str] = field(default_factory=list)
+    duration_seconds: float = 0.0
+    stopped_early: bool = False
+    shards: List[Dict] = field(default_factory=list)
+    report_path: Optional[str] = None
+
+    def to_dict(self):
+        return {
+            "passed": self.passed,
+            "tests": self.tests,
+            "failures": self.failures,
+            "duration_seconds": self.duration_seconds,
+            "stopped_early": self.stopped_early,
+            "shards": self.shards,
+            "report_path": self.report_path
+        }
+
+
+def lpt_shards(nodeids: List[str], durations: Dict[str, float],
+               workers: int, default_seconds: float = 1.0) -> List[List[str]]:
+    """Longest-processing-time-first assignment to the least-loaded shard."""
+    workers = max(1, min(workers, len(nodeids)))
+    heap = [(0.0, i) for i in range(workers)]
+    shards: List[List[str]] = [[] for _ in range(workers)]
+
+    ordered = sorted(nodeids, key=lambda n: durations.get(n, default_seconds), reverse=True)
+    for nodeid in ordered:
+        load, i = heapq.heappop(heap)
+        shards[i].append(nodeid)
+        heapq.heappush(heap, (load + durations.get(nodeid, default_seconds), i))
+
+    return [shard for shard in shards if shard]
+
+
+def junit_durations(path: str) -> Dict[str, float]:
+    """{nodeid: seconds} from an xunit1 junit report (file + classname + name)."""
+    durations = {}
+    for case in ET.parse(path).getroot().iter("testcase"):
+        filename = case.get("file")
+        if not filename:
+            continue
+        module = filename[:-3].replace("/", ".").replace(os.sep, ".") if filename.endswith(".py") else ""
+        classname = case.get("classname", "")
+        inner = classname[len(module) + 1:] if module and classname.startswith(module + ".") else ""
+        parts = [filename] + ([p for p in inner.split(".") if p] if inner else []) + [case.get("name")]
+        durations["::".join(parts)] = float(case.get("time", 0.0))
+    return durations
+
+
+def merge_junit(paths: List[str], output: str) -> int:
+    """Merge per-shard junit reports into one <testsuites>. Returns testcases."""
+    merged = ET.Element("testsuites")
+    cases = 0
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        root = ET.parse(path).getroot()
+        suites = [root] if root.tag == "testsuite" else list(root.iter("testsuite"))
+        for suite in suites:
+            merged.append(suite)
+            cases += len(suite.findall("testcase"))
+    ET.ElementTree(merged).write(output, encoding="utf-8", xml_declaration=True)
+    return cases
+
+
+class ShardedTestRunner:
+    """
+    Run a pytest suite in duration-balanced parallel shards.
+
+    Usage:
+        runner = ShardedTestRunner("tests/", workers=8,
+                                   durations_file="./self_healing_state/test_durations.json")
+        result = runner.run()
+        if not result.passed:
+            print(result.failures)
+    """
+
+    def __init__(self,
+                 test_path: str = "tests/",
+                 workers: Optional[int] = None,
+                 durations_file: Optional[str] = None,
+                 timeout_seconds: float = 300.0,
+                 report_path: Optional[str] = None):
+
+        self.test_path = test_path
+        self.workers = workers or os.cpu_count() or 1
+        self.durations_file = durations_file
+        self.timeout_seconds = timeout_seconds
+        self.report_path = report_path
+        self.durations: Dict[str, float] = {}
+
+        if durations_file and os.path.exists(durations_file):
+            with open(durations_file, 'r') as f:
+                self.durations = json.load(f)
+
+    def collect(self, cwd: Optional[str] = None) -> List[str]:
+        """Node IDs of the suite (pytest --collect-only)."""
+        result = subprocess.run(
+            [sys.executable, "-m", "pytest", self.test_path,
+             "--collect-only", "-q", "-p", "no:cacheprovider"],
+            cwd=cwd, capture_output=True, text=True, timeout=self.timeout_seconds
+        )
+        return [line.strip() for line in result.stdout.splitlines() if "::" in line]
+
+    def plan(self, nodeids: List[str]) -> List[List[str]]:
+        """Balanced shards; unseen tests are assumed to take the median time."""
+        known = sorted(self.durations.values())
+        default = known[len(known) // 2] if known else 1.0
+        return lpt_shards(nodeids, self.durations, self.workers, default)
+
+    def run(self, cwd: Optional[str] = None) -> TestRunResult:
+        """Collect, shard, run in parallel, stop on first failure, merge."""
+        start = time.perf_counter()
+        nodeids = self.collect(cwd)
+
+        if not nodeids:
+            return TestRunResult(passed=False, tests=0, failures=["<collection failed>"],
+                                 duration_seconds=time.perf_counter() - start)
+
+        shards = self.plan(nodeids)
+        workdir = tempfile.mkdtemp(prefix="heal-shards-")
+        try:
+            return self._run_shards(shards, workdir, cwd, start)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _run_shards(self, shards: List[List[str]], workdir: str,
+                    cwd: Optional[str], start: float) -> TestRunResult:
+        events: queue.Queue = queue.Queue()
+        procs = []
+
+        for i, shard in enumerate(shards):
+            report = os.path.join(workdir, f"shard-{i}.xml")
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "pytest", "-x", "-v", "-p", "no:cacheprovider",
+                 f"--junitxml={report}", "-o", "junit_family=xunit1", *shard],
+                cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+            )
+            procs.append({"proc": proc, "report": report, "tests": len(shard),
+                          "expected_seconds": sum(self.durations.get(n, 0.0) for n in shard),
+                          "started": time.perf_counter()})
+            threading.Thread(target=self._stream, args=(i, proc, events), daemon=True).start()
+
+        failures: List[str] = []
+        running = len(procs)
+        deadline = start + self.timeout_seconds
+        stopped_early = False
+
+        while running:
+            try:
+                shard, nodeid, outcome = events.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                failures.append("<timeout>")
+                break
+
+            if nodeid is None:
+                running -= 1
+                procs[shard]["seconds"] = time.perf_counter() - procs[shard]["started"]
+            elif outcome in ("FAILED", "ERROR"):
+                failures.append(nodeid)
+                break
+
+        for info in procs:
+            if info["proc"].poll() is None:
+                info["proc"].terminate()
+                stopped_early = True
+        for info in procs:
+            try:
+                info["proc"].wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                info["proc"].kill()
+
+        if not failures and any(info["proc"].returncode not in (0, None) for info in procs):
+            failures.append("<shard exited with errors>")
+
+        reports = [info["report"] for info in procs]
+        # Merged report only kept when asked for; workdir is removed by run()
+        report_path = self.report_path or os.path.join(workdir, "report.xml")
+        tests = merge_junit(reports, report_path)
+        self._update_durations(reports)
+
+        return TestRunResult(
+            passed=not failures,
+            tests=tests,
+            failures=failures,
+            duration_seconds=time.perf_counter() - start,
+            stopped_early=stopped_early,
+            shards=[
+                {
+                    "tests": info["tests"],
+                    "expected_seconds": info["expected_seconds"],
+                    "seconds": info.get("seconds"),
+                    "returncode": info["proc"].returncode
+                }
+                for info in procs
+            ],
+            report_path=self.report_path
+        )
+
+    def _stream(self, shard: int, proc: subprocess.Popen, events: queue.Queue):
+        """Forward per-test outcomes from a shard's -v output as they happen."""
+        for line in proc.stdout:
+            match = _RESULT_LINE.match(line)
+            if match:
+                events.put((shard, match.group(1), match.group(2)))
+        proc.stdout.close()
+        proc.wait()
+        events.put((shard, None, None))
+
+    def _update_durations(self, reports: List[str]):
+        for path in reports:
+            if os.path.exists(path):
+                try:
+                    self.durations.update(junit_durations(path))
+                except ET.ParseError:
+                    continue
+
+        if self.durations_file:
+            directory = os.path.dirname(self.durations_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.durations_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.durations, f, indent=2)
+            os.replace(tmp_path, self.durations_file)
@@ -0,0 +1,393 @@
+"""
+Shared State - Cross-worker monitor store and leader election
+One capturing/healing process per host, one health view for all workers.
+
+Under uvicorn/gunicorn each worker is its own process. An flock on a
+file in the state directory elects a single leader; the OS releases it
+if that process dies, and the next worker to try takes over. The
+leader appends every captured snapshot to a fixed-size ring in POSIX
+shared memory (a NumPy structured array guarded by a seqlock), and
+followers copy new records straight out of that mapping into their own
+monitor, so every worker's /health reads the same history without
+talking to another process.
+
+What only followers see (requests they served, exceptions raised in
+their process) goes the other way through WorkerReports, a spool
+directory the leader drains.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from geometric_health_monitor import GeometricSnapshot
+
+LAYOUT_VERSION = 1
+
+_HEADER = np.dtype([
+    ("version", "<u8"),
+    ("capacity", "<u8"),
+    ("dims", "<u8"),
+    ("seqlock", "<u8"),           # odd while the leader is writing
+    ("writes", "<u8"),
+    ("has_baseline", "<u8"),
+    ("leader_pid", "<u8"),
+    ("heartbeat", "<f8"),
+])
+
+
+def record_dtype(dims: int) -> np.dtype:
+    return np.dtype([
+        ("seq", "<i8"),
+        ("timestamp", "<f8"),
+        ("phi", "<f8"),
+        ("kappa_eff", "<f8"),
+        ("confidence", "<f8"),
+        ("surprise", "<f8"),
+        ("agency", "<f8"),
+        ("error_rate", "<f8"),
+        ("avg_latency_ms", "<f8"),
+        ("memory_mb", "<f8"),
+        ("regime", "S16"),
+        ("code_hash", "S40"),
+        ("module_name", "S48"),
+        ("variant", "S16"),
+        ("basin_coords", "<f8", (dims,)),
+    ])
+
+
+def shared_name(state_dir: str) -> str:
+    """Shared-memory segment name for a state directory."""
+    digest = hashlib.sha1(os.path.abspath(state_dir).encode("utf-8")).hexdigest()[:12]
+    return f"qig_monitor_{digest}"
+
+
+def _track(segment: shared_memory.SharedMemory, tracked: bool):
+    # The resource tracker would unlink the segment when *any* attached
+    # process exits; its lifetime is managed explicitly instead (the
+    # segment outlives a leader so the next one continues its history).
+    try:
+        from multiprocessing import resource_tracker
+        if tracked:
+            resource_tracker.register(segment._name, "shared_memory")
+        else:
+            resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+
+
+class LeaderElection:
+    """
+    Non-blocking flock election; held until release() or process exit.
+
+    Usage:
+        election = LeaderElection("./self_healing_state/leader.lock")
+        if election.try_acquire():
+            start_capture_and_healing()
+    """
+
+    def __init__(self, lock_path: str):
+        self.lock_path = lock_path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+
+        directory = os.path.dirname(self.lock_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode("utf-8"))
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class WorkerReports:
+    """
+    Spool of follower reports for the leader (one JSON file per report).
+
+    Each follower posts what it counted since its previous post; the
+    leader drains (reads and deletes) every report of a kind and merges
+    the counts, so nothing is counted twice. Files are written to a
+    dot-prefixed temp name and renamed, so a drain never sees half a report.
+
+    Usage:
+        reports = WorkerReports("./self_healing_state/reports")
+
+        # Followers
+        reports.post("errors", {"fingerprints": intel.drain()})
+
+        # Leader
+        for report in reports.drain("errors"):
+            intel.merge(report["fingerprints"])
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._posted = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def post(self, kind: str, payload: Dict):
+        self._posted += 1
+        name = f"{kind}-{os.getpid()}-{time.time_ns()}-{self._posted}.json"
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    def drain(self, kind: str) -> List[Dict]:
+        """All pending reports of `kind`, oldest first per worker; removes them."""
+        reports = []
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith(f"{kind}-") and name.endswith(".json")):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'r') as f:
+                    reports.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Skipping unreadable worker report {name}: {e}")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return reports
+
+
+class SharedSnapshotStore:
+    """
+    Snapshot ring buffer in shared memory (one writer, many readers).
+
+    Usage:
+        store = SharedSnapshotStore(shared_name(state_dir), capacity=1000)
+
+        # Leader
+        store.publish(monitor)
+
+        # Followers (cheap when nothing changed)
+        store.sync(monitor)
+    """
+
+    def __init__(self, name: str, capacity: int = 1000, dims: int = 64):
+        self.record = record_dtype(dims)
+        size = _HEADER.itemsize + dims * 8 + capacity * self.record.itemsize
+
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            created = True
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=name)
+            created = False
+        _track(self._shm, False)
+
+        self.name = name
+        self._header = np.ndarray((1,), dtype=_HEADER, buffer=self._shm.buf)
+
+        if created:
+            self._header[0] = (LAYOUT_VERSION, capacity, dims, 0, 0, 0, 0, 0.0)
+        else:
+            hdr = self._header[0]
+            if (int(hdr["version"]), int(hdr["capacity"]), int(hdr["dims"])) != (LAYOUT_VERSION, capacity, dims):
+                raise ValueError(
+                    f"Shared store {name} has layout v{int(hdr['version'])} "
+                    f"capacity={int(hdr['capacity'])} dims={int(hdr['dims'])}"
+                )
+
+        self.capacity = capacity
+        self.dims = dims
+        self._baseline = np.ndarray((dims,), dtype="<f8", buffer=self._shm.buf,
+                                    offset=_HEADER.itemsize)
+        self._ring = np.ndarray((capacity,), dtype=self.record, buffer=self._shm.buf,
+                                offset=_HEADER.itemsize + dims * 8)
+
+    def close(self, unlink: bool = False):
+        del self._header, self._baseline, self._ring
+        self._shm.close()
+        if unlink:
+            _track(self._shm, True)    # unlink() unregisters it again
+            self._shm.unlink()
+
+    @property
+    def writes(self) -> int:
+        return int(self._header["writes"][0])
+
+    @property
+    def last_seq(self) -> int:
+        writes = self.writes
+        if writes == 0:
+            return 0
+        return int(self._ring["seq"][(writes - 1) % self.capacity])
+
+    @property
+    def leader_pid(self) -> int:
+        return int(self._header["leader_pid"][0])
+
+    def heartbeat(self):
+        """Leader liveness marker (pid + time)."""
+        self._header["leader_pid"] = os.getpid()
+        self._header["heartbeat"] = time.time()
+
+    # ---- writer (leader only) ----
+
+    def append(self, snapshot: GeometricSnapshot):
+        basin = np.asarray(snapshot.basin_coords, dtype=np.float64)
+        if basin.shape != (self.dims,):
+            raise ValueError(f"Basin has shape {basin.shape}, store expects ({self.dims},)")
+
+        writes = self.writes
+        slot = writes % self.capacity
+
+        self._header["seqlock"] += 1
+        try:
+            self._ring[slot] = (
+                snapshot.seq,
+                snapshot.timestamp.timestamp(),
+                snapshot.phi,
+                snapshot.kappa_eff,
+                snapshot.confidence,
+                snapshot.surprise,
+                snapshot.agency,
+                snapshot.error_rate,
+                snapshot.avg_latency_ms,
+                snapshot.memory_mb,
+                snapshot.regime.encode("utf-8")[:16],
+                snapshot.code_hash.encode("utf-8")[:40],
+                snapshot.module_name.encode("utf-8")[:48],
+                snapshot.variant.encode("utf-8")[:16],
+                basin
+            )
+            self._header["writes"] = writes + 1
+        finally:
+            self._header["seqlock"] += 1
+
+    def set_baseline(self, basin: np.ndarray):
+        self._header["seqlock"] += 1
+        try:
+            self._baseline[:] = np.asarray(basin, dtype=np.float64)
+            self._header["has_baseline"] = 1
+        finally:
+            self._header["seqlock"] += 1
+
+    # ---- readers ----
+
+    def _consistent(self, read, timeout: float = 1.0):
+        """
+        Run `read()` until no write overlapped it (seqlock).
+
+        A seqlock still odd after `timeout` seconds means the leader died
+        mid-write; read anyway rather than spin forever (the next leader's
+        publish() evens it out).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            before = int(self._header["seqlock"][0])
+            if before % 2 and time.monotonic() < deadline:
+                time.sleep(0)
+                continue
+            result = read()
+            if int(self._header["seqlock"][0]) == before:
+                return result
+
+    def read_since(self, after_seq: int = 0):
+        """(new records with seq > after_seq, baseline or None), oldest first."""
+        def read():
+            writes = self.writes
+            held = min(writes, self.capacity)
+            order = (np.arange(writes - held, writes) % self.capacity) if held else np.zeros(0, dtype=int)
+            if self._header["seqlock"][0] % 2 and held == self.capacity:
+                order = order[1:]    # oldest slot is the one left half-written
+            seqs = self._ring["seq"][order]
+            rows = self._ring[order[seqs > after_seq]].copy()
+            baseline = self._baseline.copy() if self._header["has_baseline"][0] else None
+            return rows, baseline
+
+        return self._consistent(read)
+
+    def snapshots_since(self, after_seq: int = 0) -> List[GeometricSnapshot]:
+        rows, _ = self.read_since(after_seq)
+        return [_to_snapshot(row) for row in rows]
+
+    def sync(self, monitor) -> int:
+        """Ingest snapshots the leader stored since the monitor's last one."""
+        after_seq = monitor.snapshots[-1].seq if monitor.snapshots else 0
+        if self.last_seq <= after_seq and monitor.baseline_basin is not None:
+            return 0
+
+        rows, baseline = self.read_since(after_seq)
+        if monitor.baseline_basin is None and baseline is not None:
+            monitor.baseline_basin = baseline
+
+        for row in rows:
+            monitor.ingest(_to_snapshot(row))
+        return len(rows)
+
+    def publish(self, monitor):
+        """
+        Leader: mirror `monitor` into the store and keep it mirrored.
+
+        Returns the listener-removal function.
+        """
+        if self._header["seqlock"][0] % 2:
+            # The previous leader died mid-write; this process is the only writer now
+            self._header["seqlock"] += 1
+
+        last = self.last_seq
+        for snapshot in monitor.snapshots:
+            if snapshot.seq > last:
+                self.append(snapshot)
+        if monitor.baseline_basin is not None:
+            self.set_baseline(monitor.baseline_basin)
+
+        def on_capture(snapshot):
+            if not self._header["has_baseline"][0] and monitor.baseline_basin is not None:
+                self.set_baseline(monitor.baseline_basin)
+            self.append(snapshot)
+            self.heartbeat()
+
+        return monitor.on_capture(on_capture)
+
+
+def _to_snapshot(row) -> GeometricSnapshot:
+    return GeometricSnapshot(
+        timestamp=datetime.fromtimestamp(float(row["timestamp"])),
+        phi=float(row["phi"]),
+        kappa_eff=float(row["kappa_eff"]),
+        basin_coords=np.array(row["basin_coords"]),
+        confidence=float(row["confidence"]),
+        surprise=float(row["surprise"]),
+        agency=float(row["agency"]),
+        regime=row["regime"].decode("utf-8"),
+        code_hash=row["code_hash"].decode("utf-8"),
+        module_name=row["module_name"].decode("utf-8"),
+        error_rate=float(row["error_rate"]),
+        avg_latency_ms=float(row["avg_latency_ms"]),
+        memory_mb=float(row["memory_mb"]),
+        variant=row["variant"].decode("utf-8"),
+        seq=int(row["seq"])
+    )
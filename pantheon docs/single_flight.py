@@ -0,0 +1,99 @@
+"""
+Single-Flight - Coalesce concurrent async work by key
+Callers asking for the same key attach to the in-flight run and share its
+result; distinct keys wait in a bounded queue and run one at a time.
+
+Used by SelfHealingEngine so the autonomous loop and the /heal endpoint
+never generate duplicate patches or race on `git checkout -b`.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class SingleFlightFull(Exception):
+    """Raised when the bounded queue of distinct keys is full."""
+    pass
+
+
+class SingleFlight:
+    """
+    Keyed single-flight executor.
+
+    - same key while in flight → await the existing run (no second call)
+    - distinct key → queued behind the running one (serialized)
+    - more than `max_pending` distinct keys waiting → SingleFlightFull
+
+    Usage:
+        flight = SingleFlight(max_pending=4)
+        result, shared = await flight.run("phi:critical", do_heal)
+    """
+
+    def __init__(self, max_pending: int = 4):
+        self.max_pending = max_pending
+
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.stats = {
+            "runs": 0,
+            "coalesced": 0,
+            "rejected": 0
+        }
+
+    def in_flight(self) -> List[str]:
+        """Keys currently running or queued."""
+        return list(self._inflight)
+
+    def full(self) -> bool:
+        """True if a new distinct key would be rejected."""
+        # One running + max_pending waiting
+        return len(self._inflight) > self.max_pending
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+            self._inflight = {}
+        return self._lock
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `fn` once per in-flight key.
+
+        Returns:
+            (result, shared) where shared is True if this caller attached
+            to another caller's run.
+        """
+        lock = self._get_lock()
+
+        existing = self._inflight.get(key)
+        if existing is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(existing), True
+
+        if self.full():
+            self.stats["rejected"] += 1
+            raise SingleFlightFull(f"{len(self._inflight)} heal requests already queued")
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        try:
+            async with lock:
+                self.stats["runs"] += 1
+                result = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # mark retrieved when nobody attached
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(result)
+        return result, False
@@ -0,0 +1,212 @@
+"""
+Snapshot Codec - Columnar binary export of snapshots and history
+Arrow IPC or msgpack with raw float arrays, for analytics clients.
+
+Columns are built straight from monitor storage (one typed array per
+field, basins as a single (N, D) float64 block) without per-row dicts,
+so floats are never formatted as text and basins ship at 8 bytes per
+value. The same encoder serves the HTTP endpoints (via Accept-header
+negotiation) and the CLI export.
+
+Both backends are optional dependencies: `pip install msgpack` and/or
+`pip install pyarrow`. Without them, negotiation falls back to JSON.
+"""
+
+import json
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional binary backend
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover - optional binary backend
+    pyarrow = None
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "msgpack": "application/msgpack",
+}
+
+FLOAT_FIELDS = (
+    "phi", "kappa_eff", "confidence", "surprise", "agency",
+    "error_rate", "avg_latency_ms", "memory_mb"
+)
+STRING_FIELDS = ("regime", "code_hash", "module_name", "variant")
+
+FORMAT_VERSION = 1
+
+
+def available_formats() -> List[str]:
+    """Binary formats whose backend is installed."""
+    return [
+        fmt for fmt, backend in (("arrow", pyarrow), ("msgpack", msgpack))
+        if backend is not None
+    ]
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """
+    Binary format requested by an Accept header, or None for JSON.
+
+    Honors q-values; formats whose backend is missing are skipped.
+    """
+    if not accept:
+        return None
+
+    by_media = {media: fmt for fmt, media in MEDIA_TYPES.items()}
+    best, best_q = None, 0.0
+
+    for part in accept.split(","):
+        pieces = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in pieces[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        fmt = by_media.get(pieces[0])
+        if fmt in available_formats() and q > best_q:
+            best, best_q = fmt, q
+
+    return best
+
+
+def select_format(format: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """
+    Binary format for a request, or None for JSON / NDJSON.
+
+    An explicit `format` always wins; the Accept header is only
+    negotiated when no format was given.
+    """
+    if format is None:
+        return negotiate(accept)
+    return format if format in MEDIA_TYPES else None
+
+
+def snapshot_columns(snapshots: Sequence, basins: str = "full",
+                     basin_points: int = 8) -> Dict:
+    """
+    Columnar view of snapshots: {field: np.ndarray | List[str]}.
+
+    `seq` is int64, `timestamp` is float64 epoch seconds, basins are
+    one (N, D) float64 array ("full"), omitted ("none") or mean-pooled
+    to (N, basin_points) ("downsample").
+    """
+    n = len(snapshots)
+    columns: Dict = {
+        "seq": np.fromiter((s.seq for s in snapshots), dtype=np.int64, count=n),
+        "timestamp": np.fromiter((s.timestamp.timestamp() for s in snapshots),
+                                 dtype=np.float64, count=n),
+    }
+    for field in FLOAT_FIELDS:
+        columns[field] = np.fromiter((getattr(s, field) for s in snapshots),
+                                     dtype=np.float64, count=n)
+    for field in STRING_FIELDS:
+        columns[field] = [getattr(s, field) for s in snapshots]
+
+    if basins != "none":
+        block = (
+            np.stack([np.asarray(s.basin_coords, dtype=np.float64) for s in snapshots])
+            if n else np.zeros((0, 0))
+        )
+        if basins == "downsample" and block.shape[1] > basin_points:
+            block = np.stack([
+                chunk.mean(axis=1)
+                for chunk in np.array_split(block, max(basin_points, 1), axis=1)
+            ], axis=1)
+        columns["basin_coords"] = block
+
+    return columns
+
+
+def record_columns(records: List[Dict]) -> Dict:
+    """Columnar view of uniform dict records (e.g. PatchHistory.query items)."""
+    names = list(records[0]) if records else []
+    return {name: [record.get(name) for record in records] for name in names}
+
+
+def encode(columns: Dict, fmt: str, kind: str = "snapshots") -> bytes:
+    """Encode a columnar dict as `fmt` ("arrow" | "msgpack")."""
+    if fmt == "msgpack":
+        return _encode_msgpack(columns, kind)
+    if fmt == "arrow":
+        return _encode_arrow(columns, kind)
+    raise ValueError(f"Unknown binary format: {fmt}")
+
+
+def encode_snapshots(snapshots: Sequence, fmt: str, basins: str = "full",
+                     basin_points: int = 8) -> bytes:
+    return encode(snapshot_columns(snapshots, basins, basin_points), fmt, "snapshots")
+
+
+def _require(backend, name: str):
+    if backend is None:
+        raise RuntimeError(f"{name} is not installed (pip install {name})")
+
+
+def _encode_msgpack(columns: Dict, kind: str) -> bytes:
+    """
+    {"kind", "version", "count", "columns": {name: column}} where numeric
+    columns are {"dtype", "shape", "data": raw little-endian bytes}
+    (np.frombuffer(data, dtype).reshape(shape) on the client).
+    """
+    _require(msgpack, "msgpack")
+
+    encoded, count = {}, 0
+    for name, column in columns.items():
+        if isinstance(column, np.ndarray):
+            array = np.ascontiguousarray(column, dtype=column.dtype.newbyteorder("<"))
+            encoded[name] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "data": array.tobytes()
+            }
+            count = len(array)
+        else:
+            encoded[name] = list(column)
+            count = len(column)
+
+    return msgpack.packb(
+        {"kind": kind, "version": FORMAT_VERSION, "count": count, "columns": encoded},
+        use_bin_type=True,
+        default=str
+    )
+
+
+def _encode_arrow(columns: Dict, kind: str) -> bytes:
+    """One Arrow IPC stream; basins as FixedSizeList<float64>[D]."""
+    _require(pyarrow, "pyarrow")
+
+    arrays, names = [], []
+    for name, column in columns.items():
+        if isinstance(column, np.ndarray) and column.ndim == 2:
+            width = column.shape[1]
+            arrays.append(pyarrow.FixedSizeListArray.from_arrays(
+                pyarrow.array(np.ascontiguousarray(column).ravel()), width
+            ))
+        elif name == "timestamp" and isinstance(column, np.ndarray):
+            arrays.append(pyarrow.array((column * 1e6).astype(np.int64),
+                                        type=pyarrow.timestamp("us")))
+        elif isinstance(column, np.ndarray):
+            arrays.append(pyarrow.array(column))
+        else:
+            arrays.append(pyarrow.array(
+                [v if v is None or isinstance(v, (str, int, float, bool))
+                 else json.dumps(v, default=str) for v in column]
+            ))
+        names.append(name)
+
+    batch = pyarrow.record_batch(arrays, names=names)
+    batch = batch.replace_schema_metadata({"kind": kind, "version": str(FORMAT_VERSION)})
+
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,207 @@
+"""
+Stage Metrics - Per-stage timing for QIGChain pipelines and handlers
+Which stage made the whole request slow.
+
+The monitor sees one avg_latency_ms per capture. Stages wrapped with
+@stage(...) or `with timed(...)` record call counts, errors and timings
+into a per-stream buffer (e.g. "searchspace", "pantheon-chat"), which
+the monitor drains on every capture into `stage_stats`. The latency
+strategy uses that to attribute slowness to a stage and, for decorated
+functions, to rank matching profiler targets first.
+
+Disabled recorders cost one attribute check per call. With
+`sample_rate` < 1, every call is counted but only every Nth is timed.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from request_metrics import LATENCY_BUCKETS_MS, quantile
+
+DEFAULT_STREAM = "default"
+
+
+class StageStats:
+    """Counters for one stage within the current window."""
+
+    __slots__ = ("target", "calls", "errors", "timed", "total_ms", "max_ms", "buckets")
+
+    def __init__(self, target: Optional[str] = None):
+        self.target = target
+        self.calls = 0
+        self.errors = 0
+        self.timed = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms: float):
+        self.timed += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def to_dict(self) -> Dict:
+        avg_ms = self.total_ms / self.timed if self.timed else 0.0
+        return {
+            "target": self.target,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timed": self.timed,
+            "avg_ms": avg_ms,
+            "p95_ms": quantile(self.buckets, 0.95),
+            "max_ms": self.max_ms,
+            # Sampled timings scaled back up to every call
+            "total_ms": avg_ms * self.calls
+        }
+
+
+class StageRecorder:
+    """
+    Records stage timings into per-stream buffers.
+
+    Usage:
+        stages = StageRecorder(sample_rate=0.1)
+        stages.attach(monitor)                 # drained on every capture
+
+        @stages.stage("retrieve", stream="searchspace")
+        async def retrieve(query): ...
+
+        with stages.timed("rerank", stream="pantheon-chat"):
+            ...
+
+    The module-level `stage` / `timed` use the shared STAGES recorder.
+    """
+
+    def __init__(self, enabled: bool = True, sample_rate: float = 1.0):
+        self.enabled = enabled
+        self.sample_every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self._buffers: Dict[str, Dict[str, StageStats]] = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, stream: str, name: str, target: Optional[str]) -> StageStats:
+        buffer = self._buffers.get(stream)
+        if buffer is None:
+            buffer = self._buffers.setdefault(stream, {})
+        stats = buffer.get(name)
+        if stats is None:
+            stats = buffer.setdefault(name, StageStats(target))
+        return stats
+
+    def _begin(self, stream: str, name: str, target: Optional[str]) -> Optional[float]:
+        """Count a call; returns a start time if this call is sampled."""
+        with self._lock:
+            stats = self._stats(stream, name, target)
+            stats.calls += 1
+            sampled = self.sample_every and stats.calls % self.sample_every == 0
+        return time.perf_counter() if sampled else None
+
+    def _end(self, stream: str, name: str, target: Optional[str],
+             started: Optional[float], failed: bool):
+        elapsed_ms = (time.perf_counter() - started) * 1000 if started is not None else None
+        with self._lock:
+            stats = self._stats(stream, name, target)
+            if failed:
+                stats.errors += 1
+            if elapsed_ms is not None:
+                stats.add(elapsed_ms)
+
+    @contextmanager
+    def timed(self, name: str, stream: str = DEFAULT_STREAM):
+        """Time a block as stage `name`."""
+        if not self.enabled:
+            yield
+            return
+
+        started = self._begin(stream, name, None)
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._end(stream, name, None, started, failed)
+
+    def stage(self, name: Optional[str] = None, stream: str = DEFAULT_STREAM) -> Callable:
+        """Decorator timing a sync or async function as a stage."""
+        def decorator(fn):
+            stage_name = name or fn.__name__
+            target = f"{fn.__module__}:{fn.__qualname__}"
+
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await fn(*args, **kwargs)
+                    started = self._begin(stream, stage_name, target)
+                    try:
+                        result = await fn(*args, **kwargs)
+                    except BaseException:
+                        self._end(stream, stage_name, target, started, True)
+                        raise
+                    self._end(stream, stage_name, target, started, False)
+                    return result
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                started = self._begin(stream, stage_name, target)
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException:
+                    self._end(stream, stage_name, target, started, True)
+                    raise
+                self._end(stream, stage_name, target, started, False)
+                return result
+            return wrapper
+
+        return decorator
+
+    def drain(self) -> Dict[str, Dict[str, Dict]]:
+        """{stream: {stage: stats}} since the previous drain; resets the window."""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+        return {
+            stream: {name: stats.to_dict() for name, stats in stages.items()}
+            for stream, stages in buffers.items()
+        }
+
+    def attach(self, monitor, name: str = "stages") -> Callable[[], None]:
+        """Have `monitor` drain this recorder on every capture."""
+        monitor.register_stage_stats(name, self.drain)
+        return lambda: monitor.unregister_stage_stats(name)
+
+
+def stage_attribution(stage_stats: Dict[str, Dict], top: int = 5) -> List[Dict]:
+    """
+    Stages ranked by their share of total stage time.
+
+    `stage_stats` is monitor.stage_stats ({source: {stream: {stage: stats}}}).
+    """
+    rows = []
+    for streams in stage_stats.values():
+        for stream, stages in streams.items():
+            for name, stats in stages.items():
+                rows.append(dict(stats, stream=stream, stage=name))
+
+    total = sum(row["total_ms"] for row in rows)
+    for row in rows:
+        row["share"] = row["total_ms"] / total if total else 0.0
+
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows[:top]
+
+
+# Shared recorder for pipelines that don't need their own
+STAGES = StageRecorder()
+stage = STAGES.stage
+timed = STAGES.timed
@@ -14,6 +14,31 @@ import os
 from datetime import datetime, timedelta
 from geometric_health_monitor import GeometricHealthMonitor, GeometricSnapshot
 from self_healing_engine import SelfHealingEngine, HealingPatch
+from patch_cache import PatchCache, patch_key
+from healing_triggers import TriggerPolicy
+from single_flight import SingleFlight, SingleFlightFull
+from sampling_profiler import SamplingProfiler
+from memo_cache import MemoCache, memoize, structural_key
+from allocation_tracker import AllocationTracker
+from error_intelligence import ErrorIntelligence
+from canary import CanaryRollout
+from regression_guard import RegressionGuard, segments
+from benchmark_gate import BenchmarkGate, BenchmarkResult, mann_whitney_greater
+from patch_history import PatchHistory
+from basin_simulator import BasinSimulator, apply_correction
+from sharded_test_runner import ShardedTestRunner, junit_durations, lpt_shards
+from healing_queue import HealingQueue, WorkerPool
+from pr_batcher import PRBatcher
+from snapshot_stream import iter_ndjson, downsample_basin
+from health_broadcast import HealthBroadcaster
+from snapshot_codec import snapshot_columns, negotiate, select_format, encode_snapshots, available_formats
+from shared_state import LeaderElection, SharedSnapshotStore, WorkerReports
+from request_metrics import RequestMetrics, RequestMetricsMiddleware, quantile, LATENCY_BUCKETS_MS
+from capture_pipeline import CapturePipeline
+from metric_sources import MetricCollector
+from stage_metrics import StageRecorder, stage_attribution
+from checkpoint import Checkpointer
+from healing_cli import cli_main, read_meta, read_tail
 
 # ============================================================================
 # FIXTURES
@@ -367,6 +392,2219 @@ class TestSelfHealingEngine:
         finally:
             os.unlink(filepath)
 
+# ============================================================================
+# PATCH CACHE TESTS
+# ============================================================================
+
+class TestPatchCache:
+    """Test content-addressed patch/fitness cache."""
+    
+    def test_key_normalization(self):
+        """Test near-identical parameters share a key."""
+        key_a = patch_key("phi_degradation", {"current_phi": 0.553}, "abc12345")
+        key_b = patch_key("phi_degradation", {"current_phi": 0.548}, "abc12345")
+        key_c = patch_key("phi_degradation", {"current_phi": 0.553}, "def67890")
+        
+        assert key_a == key_b
+        assert key_a != key_c
+    
+    def test_repeated_cycles_reuse_patch(self, healer, monitor, degraded_phi_state, monkeypatch):
+        """Test a persistent degradation generates and scores one patch."""
+        import asyncio
+        
+        applied = []
+        monkeypatch.setattr(healer, "_apply_patch", lambda patch: applied.append(patch) or True)
+        
+        for _ in range(10):
+            monitor.capture(degraded_phi_state)
+        
+        first = asyncio.run(healer.check_and_heal())
+        second = asyncio.run(healer.check_and_heal())
+        
+        assert first["healed"] == True
+        assert second["cached"] == True
+        assert len(healer.patches_generated) == 1
+        assert len(applied) == 1
+    
+    def test_cache_persistence(self, healthy_state):
+        """Test entries survive a restart."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "patch_cache.json")
+            
+            cache = PatchCache(filepath)
+            cache.put("abc", fitness_score=0.7, pr_opened=True, branch="auto-heal-x")
+            
+            restored = PatchCache(filepath)
+            
+            assert "abc" in restored
+            assert restored.get("abc")["pr_opened"] == True
+            assert restored.get("abc")["branch"] == "auto-heal-x"
+
+# ============================================================================
+# HEALING TRIGGER TESTS
+# ============================================================================
+
+class TestHealingTriggers:
+    """Test event-driven healing triggers."""
+    
+    def test_subscribe_emits_transitions_only(self, monitor, healthy_state, degraded_phi_state):
+        """Test capture() emits events only when severity or issues change."""
+        events = []
+        unsubscribe = monitor.subscribe(events.append)
+        
+        for _ in range(10):
+            monitor.capture(degraded_phi_state)
+        
+        assert events[-1].severity == "critical"
+        assert "phi_degradation" in events[-1].issue_types
+        
+        # Steady state: no new events
+        count = len(events)
+        for _ in range(10):
+            monitor.capture(degraded_phi_state)
+        assert len(events) == count
+        
+        unsubscribe()
+        for _ in range(10):
+            monitor.capture(healthy_state)
+        assert len(events) == count
+    
+    def test_policy_backoff(self):
+        """Test cooldown doubles after failed attempts and resets on success."""
+        now = [0.0]
+        policy = TriggerPolicy(cooldown_seconds=10, max_backoff_seconds=35, clock=lambda: now[0])
+        
+        assert policy.ready("latency")
+        policy.record_attempt("latency", healed=False)
+        assert not policy.ready("latency")
+        
+        now[0] = 10.0
+        assert policy.ready("latency")
+        policy.record_attempt("latency", healed=False)
+        now[0] = 29.0
+        assert not policy.ready("latency")  # 20s backoff
+        
+        now[0] = 30.0
+        policy.record_attempt("latency", healed=False)
+        assert policy.delay("latency") == 35  # capped
+        
+        policy.record_attempt("latency", healed=True)
+        assert policy.failures["latency"] == 0
+        assert policy.ready("errors")
+    
+    def test_loop_reacts_to_event(self, healer, monitor, healthy_state, degraded_phi_state, monkeypatch):
+        """Test the autonomous loop heals on a transition without waiting for the poll."""
+        import asyncio
+        
+        calls = []
+        
+        async def fake_check_and_heal():
+            calls.append(monitor.check_health()["severity"])
+            return {"healed": False, "patch": None, "health": {}}
+        
+        monkeypatch.setattr(healer, "check_and_heal", fake_check_and_heal)
+        healer.triggers.debounce_seconds = 0
+        
+        async def scenario():
+            task = asyncio.create_task(healer.autonomous_loop(interval_seconds=3600))
+            await asyncio.sleep(0)
+            for _ in range(10):
+                monitor.capture(degraded_phi_state)
+            for _ in range(20):
+                await asyncio.sleep(0.01)
+                if calls:
+                    break
+            task.cancel()
+        
+        asyncio.run(scenario())
+        
+        assert calls == ["critical"]
+
+# ============================================================================
+# SINGLE-FLIGHT TESTS
+# ============================================================================
+
+class TestSingleFlight:
+    """Test coalescing of concurrent heal requests."""
+    
+    def test_concurrent_heals_coalesce(self, healer, monitor, degraded_phi_state, monkeypatch):
+        """Test concurrent callers share one generation/validation run."""
+        import asyncio
+        
+        fitness_runs = []
+        
+        async def slow_fitness(patch):
+            fitness_runs.append(patch)
+            await asyncio.sleep(0.05)
+            return 0.75
+        
+        monkeypatch.setattr(healer, "_test_patch_fitness", slow_fitness)
+        monkeypatch.setattr(healer, "_apply_patch", lambda patch: True)
+        
+        for _ in range(10):
+            monitor.capture(degraded_phi_state)
+        
+        async def scenario():
+            return await asyncio.gather(*[healer.check_and_heal() for _ in range(3)])
+        
+        results = asyncio.run(scenario())
+        
+        assert len(fitness_runs) == 1
+        assert sum(1 for r in results if r.get("coalesced")) == 2
+        assert all(r["patch"] is results[0]["patch"] for r in results)
+    
+    def test_bounded_queue(self):
+        """Test distinct keys beyond max_pending are rejected."""
+        import asyncio
+        
+        flight = SingleFlight(max_pending=1)
+        
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+        
+        async def scenario():
+            return await asyncio.gather(
+                flight.run("a", work),
+                flight.run("b", work),
+                flight.run("c", work),
+                return_exceptions=True
+            )
+        
+        results = asyncio.run(scenario())
+        
+        assert results[0] == ("done", False)
+        assert results[1] == ("done", False)
+        assert isinstance(results[2], SingleFlightFull)
+        assert flight.stats["rejected"] == 1
+
+# ============================================================================
+# PROFILER-GUIDED LATENCY TESTS
+# ============================================================================
+
+def _busy_work(stop):
+    """CPU-bound helper for profiler tests."""
+    total = 0
+    while not stop.is_set():
+        total += sum(i * i for i in range(1000))
+    return total
+
+class TestProfilerGuidedLatency:
+    """Test sampling profile → targeted latency patch."""
+    
+    def test_profiler_finds_hot_function(self):
+        """Test a busy thread shows up at the top of the profile."""
+        import threading
+        
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_work, args=(stop,))
+        worker.start()
+        try:
+            profile = SamplingProfiler(interval_seconds=0.001).profile(0.2)
+        finally:
+            stop.set()
+            worker.join()
+        
+        names = [f.function for f in profile.top(5)]
+        
+        assert profile.sample_count > 0
+        assert any("_busy_work" in name for name in names)
+    
+    def test_latency_patch_targets_profile(self, healer, monitor):
+        """Test the patch wraps only profiled offenders and attaches evidence."""
+        import sys
+        import types
+        
+        module = types.ModuleType("hot_module")
+        calls = []
+        
+        def expensive(x):
+            calls.append(x)
+            return x * 2
+        
+        def untouched(x):
+            return x
+        
+        module.expensive = expensive
+        module.untouched = untouched
+        sys.modules["hot_module"] = module
+        
+        evidence = {"profile": {
+            "sample_count": 100,
+            "duration_seconds": 2.0,
+            "functions": [{
+                "module": "hot_module", "function": "expensive",
+                "self_samples": 80, "cumulative_samples": 90,
+                "blocking_samples": 0, "is_coroutine": False,
+                "self_pct": 0.8, "cumulative_pct": 0.9
+            }]
+        }}
+        
+        try:
+            patch = healer._patch_latency(2500, evidence=evidence)
+            
+            namespace = {}
+            exec(patch.patch_code, namespace)
+            applied = namespace["apply_latency_optimization"](monitor)
+            
+            module.expensive(3)
+            module.expensive(3)
+            
+            assert applied == ["hot_module:expensive"]
+            assert calls == [3]
+            assert module.untouched is untouched
+            assert "hot_module:expensive" in patch.reason
+            assert patch.evidence["targets"][0]["action"] == "memoize"
+            
+            # Counters reach the monitor and drive fitness
+            for _ in range(200):
+                module.expensive(3)
+            monitor.cache_stats["hot_module:expensive"] = module.expensive.cache.stats()
+            
+            assert monitor.cache_stats["hot_module:expensive"]["hits"] == 201
+            assert healer._measured_hit_rate(patch) > 0.99
+        finally:
+            del sys.modules["hot_module"]
+    
+    def test_no_patch_without_hot_functions(self, healer):
+        """Test an empty profile yields no latency patch."""
+        assert healer._patch_latency(2500, evidence={"profile": {"functions": []}}) is None
+
+# ============================================================================
+# MEMO CACHE TESTS
+# ============================================================================
+
+class TestMemoCache:
+    """Test the bounded memoization layer used by latency patches."""
+    
+    def test_structural_keys(self):
+        """Test keys follow array contents, not identity or str()."""
+        a = np.arange(64, dtype=np.float64) / 64
+        b = a.copy()
+        c = a.copy()
+        c[-1] += 1e-12  # str() would hide this difference
+        
+        assert structural_key(a, mode="fisher") == structural_key(b, mode="fisher")
+        assert structural_key(a) != structural_key(c)
+        assert structural_key(a.astype(np.float32)) != structural_key(a)
+        assert structural_key({"x": [1, 2]}) == structural_key({"x": [1, 2]})
+    
+    def test_lru_eviction_by_bytes(self):
+        """Test least-recently-used entries are evicted to fit the byte budget."""
+        entry_size = np.zeros(100).nbytes + 112
+        cache = MemoCache("test", max_bytes=entry_size * 2)
+        
+        cache.set(b"a", np.zeros(100))
+        cache.set(b"b", np.zeros(100))
+        cache.get(b"a")  # a is now most recent
+        cache.set(b"c", np.zeros(100))
+        
+        assert cache.get(b"b") == (False, None)
+        assert cache.get(b"a")[0] == True
+        assert cache.stats()["evictions"] == 1
+        assert cache.bytes <= cache.max_bytes
+    
+    def test_ttl_and_invalidation(self):
+        """Test entries expire and invalidation hooks fire."""
+        now = [0.0]
+        cache = MemoCache("test", ttl_seconds=10, clock=lambda: now[0])
+        dropped = []
+        cache.on_invalidate(dropped.append)
+        
+        cache.set(b"k", 1)
+        assert cache.get(b"k") == (True, 1)
+        
+        now[0] = 11.0
+        assert cache.get(b"k") == (False, None)
+        assert cache.stats()["expirations"] == 1
+        
+        cache.set(b"k", 2)
+        cache.invalidate(b"k")
+        assert dropped == [b"k"]
+        assert len(cache) == 0
+    
+    def test_memoize_sync_and_async(self):
+        """Test the decorator caches sync and async results."""
+        import asyncio
+        
+        calls = []
+        
+        @memoize(name="double")
+        def double(x):
+            calls.append(x)
+            return x * 2
+        
+        @memoize
+        async def triple(x):
+            calls.append(x)
+            return x * 3
+        
+        assert double(np.ones(3)).sum() == 6
+        assert double(np.ones(3)).sum() == 6
+        assert asyncio.run(triple(2)) == 6
+        assert asyncio.run(triple(2)) == 6
+        
+        double.invalidate(np.ones(3))
+        double(np.ones(3))
+        
+        assert len(calls) == 3
+        assert double.cache.stats()["hits"] == 1
+    
+    def test_opaque_arguments_compared_on_hit(self):
+        """Test opaque arguments with equal hashes never share an entry."""
+        class Token:
+            def __init__(self, name):
+                self.name = name
+            
+            def __hash__(self):
+                return 1  # every Token collides
+            
+            def __eq__(self, other):
+                return isinstance(other, Token) and other.name == self.name
+        
+        @memoize
+        def describe(token):
+            return token.name
+        
+        assert describe(Token("a")) == "a"
+        assert describe(Token("b")) == "b"
+        assert describe(Token("b")) == "b"
+        
+        stats = describe.cache.stats()
+        assert stats["collisions"] == 1
+        assert stats["hits"] == 1
+    
+    def test_monitor_exports_cache_stats(self, monitor, healthy_state):
+        """Test the monitor refreshes registered cache counters on capture."""
+        cache = MemoCache("stage:search")
+        monitor.register_cache_stats(cache.name, cache.stats)
+        
+        cache.set(b"k", 1)
+        cache.get(b"k")
+        monitor.capture(healthy_state)
+        
+        assert monitor.cache_stats["stage:search"]["hits"] == 1
+        assert monitor.cache_stats["stage:search"]["hit_rate"] == 1.0
+
+# ============================================================================
+# MEMORY STRATEGY TESTS
+# ============================================================================
+
+class _LeakyStore:
+    """Grows forever; target for memory strategy tests."""
+    
+    def __init__(self):
+        self.items = []
+    
+    def remember(self):
+        self.items.append(bytes(10000))
+
+class TestMemoryStrategy:
+    """Test memory-growth detection and tracemalloc-driven patches."""
+    
+    def test_detects_sustained_growth(self, monitor, healthy_state):
+        """Test steady growth is flagged but a GC sawtooth is not."""
+        for i in range(30):
+            state = healthy_state.copy()
+            state["memory_mb"] = 1500 + (i % 2) * 40  # sawtooth
+            monitor.capture(state)
+        
+        assert "memory" not in monitor.check_health()["issue_types"]
+        
+        for i in range(30):
+            state = healthy_state.copy()
+            state["memory_mb"] = 1500 + i * 5  # +5MB per snapshot
+            monitor.capture(state)
+        
+        health = monitor.check_health()
+        
+        assert "memory" in health["issue_types"]
+        assert abs(health["metrics"]["memory_growth_mb"] - 5.0) < 0.1
+        assert monitor.get_trend("memory")["direction"] == "degrading"
+    
+    def test_patch_bounds_growing_container(self, healer):
+        """Test the allocation diff points the patch at the growing container."""
+        store = _LeakyStore()
+        tracker = AllocationTracker()
+        
+        try:
+            tracker.take_snapshot()
+            for _ in range(200):
+                store.remember()
+            tracker.take_snapshot()
+            
+            evidence = {"allocations": tracker.to_dict(n=10)}
+        finally:
+            tracker.stop()
+        
+        sites = evidence["allocations"]["sites"]
+        assert sites[0]["function"] == "_LeakyStore.remember"
+        
+        patch = healer._patch_memory(5.0, evidence=evidence)
+        target = patch.evidence["targets"][0]
+        
+        assert target["action"] == "bound"
+        assert target["container"] == "items"
+        assert target["owner"] == "self"
+        
+        original = _LeakyStore.remember
+        try:
+            namespace = {}
+            exec(patch.patch_code, namespace)
+            namespace["TARGETS"][0]["max_items"] = 5
+            namespace["apply_memory_bounds"]()
+            
+            for _ in range(20):
+                store.remember()
+            
+            assert len(store.items) == 5
+        finally:
+            _LeakyStore.remember = original
+    
+    def test_periodic_tracking_starts_on_growth(self, healer, healthy_state):
+        """Test track_allocations traces only once growth shows, and feeds the diff."""
+        import asyncio
+        
+        healer.allocation_seconds = 3600  # the on-demand window must not be needed
+        store = _LeakyStore()
+        
+        async def tick(seconds):
+            task = asyncio.create_task(healer.track_allocations(interval_seconds=0.01))
+            for _ in range(int(seconds / 0.01)):
+                store.remember()
+                await asyncio.sleep(0.01)
+            task.cancel()
+        
+        try:
+            asyncio.run(tick(0.1))
+            assert len(healer.allocations.snapshots) == 0
+        
+            for i in range(30):
+                state = healthy_state.copy()
+                state["memory_mb"] = 1500 + i * 5
+                healer.monitor.capture(state)
+        
+            asyncio.run(tick(0.2))
+            assert len(healer.allocations.snapshots) >= 2
+        
+            evidence = asyncio.run(asyncio.wait_for(healer._gather_evidence("memory"), 5))
+        finally:
+            healer.allocations.stop()
+        
+        sites = evidence["allocations"]["sites"]
+        assert any(site["function"] == "_LeakyStore.remember" for site in sites)
+
+# ============================================================================
+# ERROR INTELLIGENCE TESTS
+# ============================================================================
+
+def _lookup_user(users, name):
+    """Raises KeyError for unknown users; target for error tests."""
+    return users[name]
+
+class TestErrorIntelligence:
+    """Test exception fingerprinting and targeted error patches."""
+    
+    def test_fingerprints_aggregate(self):
+        """Test the same failure path shares a fingerprint across messages."""
+        intel = ErrorIntelligence(k=10)
+        
+        for name in ["alice", "bob", "carol"]:
+            try:
+                _lookup_user({}, name)
+            except KeyError as e:
+                intel.record(type(e), e, e.__traceback__)
+        
+        try:
+            1 / 0
+        except ZeroDivisionError as e:
+            intel.record(type(e), e, e.__traceback__)
+        
+        top = intel.top(5)
+        
+        assert top[0].count == 3
+        assert top[0].exc_type == "builtins.KeyError"
+        assert top[0].origin.endswith(":_lookup_user")
+        assert len(top) == 2
+    
+    def test_follower_fingerprints_reach_leader_once(self, tmp_path):
+        """Test fingerprints drained by a follower are merged by the leader exactly once."""
+        follower, leader = ErrorIntelligence(k=10), ErrorIntelligence(k=10)
+        reports = WorkerReports(str(tmp_path / "reports"))
+        
+        for name in ["alice", "bob"]:
+            try:
+                _lookup_user({}, name)
+            except KeyError as e:
+                follower.record(type(e), e, e.__traceback__)
+        
+        reports.post("errors", {"fingerprints": follower.drain()})
+        reports.post("errors", {"fingerprints": follower.drain()})  # nothing new
+        
+        for report in reports.drain("errors"):
+            leader.merge(report["fingerprints"])
+        
+        assert reports.drain("errors") == []
+        top = leader.top(5)
+        assert len(top) == 1
+        assert top[0].count == 2
+        assert top[0].origin.endswith(":_lookup_user")
+        assert top[0].fingerprint == follower.top(1)[0].fingerprint
+    
+    def test_top_k_is_bounded(self):
+        """Test distinct fingerprints never exceed k per window."""
+        intel = ErrorIntelligence(k=3)
+        
+        for i in range(10):
+            exc_type = type(f"Error{i}", (Exception,), {})
+            try:
+                raise exc_type()
+            except Exception as e:
+                intel.record(type(e), e, e.__traceback__)
+        
+        assert len(intel.windows[-1][1].items) == 3
+    
+    def test_logging_hook(self):
+        """Test logger.exception() calls are fingerprinted once installed."""
+        import logging
+        
+        intel = ErrorIntelligence()
+        logger = logging.getLogger("test_error_intel")
+        intel.install(logger)
+        try:
+            try:
+                _lookup_user({}, "dave")
+            except KeyError:
+                logger.exception("lookup failed")
+        finally:
+            intel.uninstall(logger)
+        
+        assert intel.top(1)[0].origin.endswith(":_lookup_user")
+    
+    def test_patch_targets_origin_only(self, healer):
+        """Test the patch handles only the observed type in the origin function."""
+        import sys
+        
+        module = sys.modules[__name__]
+        original = module._lookup_user
+        
+        for name in ["alice", "bob"]:
+            try:
+                _lookup_user({}, name)
+            except KeyError as e:
+                healer.error_intel.record(type(e), e, e.__traceback__)
+        
+        patch = healer._patch_errors(0.1, evidence={"errors": healer.error_intel.to_dict()})
+        
+        try:
+            namespace = {}
+            exec(patch.patch_code, namespace)
+            applied = namespace["apply_error_healing"]()
+            
+            assert applied == [f"{__name__}:_lookup_user"]
+            assert module._lookup_user({}, "erin") is None
+            with pytest.raises(TypeError):
+                module._lookup_user(None, "erin")  # unobserved type propagates
+        finally:
+            module._lookup_user = original
+    
+    def test_handled_errors_not_recounted(self, healer):
+        """Test errors the patch handles and logs don't feed their own fingerprint."""
+        import sys
+        
+        module = sys.modules[__name__]
+        original = module._lookup_user
+        
+        for name in ["alice", "bob"]:
+            try:
+                _lookup_user({}, name)
+            except KeyError as e:
+                healer.error_intel.record(type(e), e, e.__traceback__)
+        
+        patch = healer._patch_errors(0.1, evidence={"errors": healer.error_intel.to_dict()})
+        
+        healer.error_intel.install()
+        try:
+            namespace = {}
+            exec(patch.patch_code, namespace)
+            namespace["apply_error_healing"]()
+        
+            for _ in range(5):
+                assert module._lookup_user({}, "erin") is None
+        finally:
+            healer.error_intel.uninstall()
+            module._lookup_user = original
+        
+        assert healer.error_intel.top(1)[0].count == 2
+        assert namespace["handled_counts"][f"{__name__}:_lookup_user"] == 5
+
+# ============================================================================
+# CANARY ROLLOUT TESTS
+# ============================================================================
+
+def _canary_target(x):
+    import time
+    time.sleep(0.002)
+    return x * 2
+
+_CANARY_PATCH = f'''
+import importlib
+
+TARGETS = [{{"target": "{__name__}:_canary_target"}}]
+
+def apply_fast_path():
+    module = importlib.import_module("{__name__}")
+    module._canary_target = lambda x: x * 2
+    return [TARGETS[0]["target"]]
+'''
+
+_MEMO_CANARY_PATCH = f'''
+# Latency Optimization
+import importlib
+from memo_cache import memoize
+
+TARGETS = [{{"target": "{__name__}:_canary_target", "action": "memoize"}}]
+
+def apply_memo():
+    module = importlib.import_module("{__name__}")
+    module._canary_target = memoize(module._canary_target, name=TARGETS[0]["target"])
+'''
+
+class TestCanary:
+    """Test sequential A/B canary of healing patches."""
+    
+    def _feed(self, rollout, metric, control, canary):
+        for value in control:
+            rollout.record("control", metric, value)
+        for value in canary:
+            rollout.record("canary", metric, value)
+    
+    def test_promotes_significantly_faster_canary(self):
+        """Test a clearly faster canary is promoted."""
+        rng = np.random.default_rng(0)
+        rollout = CanaryRollout("k", check_every=10 ** 9)
+        
+        self._feed(rollout, "latency_ms", rng.normal(100, 10, 60), rng.normal(50, 10, 60))
+        
+        result = rollout.evaluate()
+        assert result["decision"] == "promote"
+        assert result["metrics"]["latency_ms"]["better"]
+    
+    def test_aborts_on_error_regression(self):
+        """Test a canary that raises more errors is aborted despite speed."""
+        rng = np.random.default_rng(1)
+        rollout = CanaryRollout("k", check_every=10 ** 9)
+        
+        self._feed(rollout, "latency_ms", rng.normal(100, 10, 200), rng.normal(50, 10, 200))
+        self._feed(rollout, "error", np.zeros(200), (rng.random(200) < 0.3).astype(float))
+        
+        result = rollout.evaluate()
+        assert result["decision"] == "abort"
+        assert "error" in result["reason"]
+    
+    def test_equal_arms_keep_collecting(self):
+        """Test identical distributions do not stop the test early."""
+        rng = np.random.default_rng(2)
+        rollout = CanaryRollout("k", check_every=10 ** 9)
+        
+        self._feed(rollout, "latency_ms", rng.normal(100, 10, 500), rng.normal(100, 10, 500))
+        
+        assert rollout.evaluate()["decision"] == "continue"
+    
+    def test_arms_measured_per_call_per_rollout(self):
+        """Test each rollout records only its own routed calls, and no Φ arm."""
+        fast = CanaryRollout("a", fraction=1.0, check_every=10 ** 9)
+        failing = CanaryRollout("b", fraction=0.0, check_every=10 ** 9)
+        
+        def fail():
+            raise ValueError("boom")
+        
+        a = fast.wrap(lambda: None, lambda: None)
+        b = failing.wrap(fail, fail)
+        
+        for _ in range(3):
+            a()
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                b()
+        
+        assert fast.stats["canary"]["latency_ms"].n == 3
+        assert fast.stats["control"]["latency_ms"].n == 0
+        assert fast.stats["canary"]["error"].mean == 0.0
+        assert failing.stats["control"]["error"].n == 2
+        assert failing.stats["control"]["error"].mean == 1.0
+        assert failing.stats["canary"]["error"].n == 0
+        assert "phi" not in fast.stats["canary"]
+    
+    def test_engine_promotes_live_canary(self, healer, monkeypatch):
+        """Test the engine wraps targets, decides live, then applies."""
+        import asyncio
+        import sys
+        
+        module = sys.modules[__name__]
+        original = module._canary_target
+        applied = []
+        monkeypatch.setattr(healer, "_apply_patch", lambda p: applied.append(p) or True)
+        healer.canary_fraction = 0.5
+        
+        patch = HealingPatch("healing/fast.py", _CANARY_PATCH, "latency", strategy="latency")
+        patch.key = "canary-key"
+        
+        async def run():
+            assert healer._start_canary(patch)
+            assert module._canary_target is not original
+            
+            for i in range(400):
+                assert module._canary_target(i) == i * 2
+                if not healer.canaries:
+                    break
+                await asyncio.sleep(0)
+            
+            for _ in range(50):
+                if patch.applied:
+                    break
+                await asyncio.sleep(0.01)
+        
+        try:
+            asyncio.run(run())
+            
+            assert applied == [patch]
+            assert patch.evidence["canary"]["decision"] == "promote"
+            assert module._canary_target is not original
+            assert healer.cache.get("canary-key")["applied"]
+        finally:
+            module._canary_target = original
+
+    def test_memo_canary_rescored_on_hit_rate(self, healer, healthy_state, monkeypatch):
+        """Test a memo patch is re-scored on its live hit rate before promotion."""
+        import asyncio
+        import sys
+        
+        module = sys.modules[__name__]
+        original = module._canary_target
+        monkeypatch.setattr(healer, "_apply_patch", lambda p: True)
+        healer.canary_fraction = 1.0
+        
+        patch = HealingPatch("healing/memo.py", _MEMO_CANARY_PATCH, "latency", strategy="latency")
+        patch.key = "memo-key"
+        patch.evidence = {"targets": [{"target": f"{__name__}:_canary_target", "action": "memoize"}]}
+        patch.fitness_score = 0.60  # prior from _stage_evaluate
+        
+        async def run():
+            assert healer._start_canary(patch)
+            for i in range(120):
+                module._canary_target(i)  # all distinct: every call misses
+            healer.monitor.capture(healthy_state)
+            return await healer._finish_canary("memo-key", {"decision": "promote", "reason": "faster"})
+        
+        try:
+            result = asyncio.run(run())
+            
+            assert result["canary"]["decision"] == "abort"
+            assert patch.fitness_score == pytest.approx(0.3)
+            assert module._canary_target is original
+            assert f"{__name__}:_canary_target" not in healer.monitor.cache_stats
+        finally:
+            module._canary_target = original
+
+# ============================================================================
+# REGRESSION GUARD TESTS
+# ============================================================================
+
+class TestRegressionGuard:
+    """Test post-deploy rollback keyed on code_hash segments."""
+    
+    def _capture(self, monitor, state, code_hash, latencies, monkeypatch):
+        monkeypatch.setattr(monitor, "_get_git_hash", lambda: code_hash)
+        for latency in latencies:
+            monitor.capture({**state, "avg_latency_ms": float(latency)})
+    
+    def test_segments_by_code_hash(self, monitor, healthy_state, monkeypatch):
+        """Test consecutive snapshots are grouped per code_hash, canary excluded."""
+        self._capture(monitor, healthy_state, "aaaa", [100] * 3, monkeypatch)
+        monitor.capture({**healthy_state, "variant": "canary"})
+        self._capture(monitor, healthy_state, "bbbb", [100] * 2, monkeypatch)
+        
+        runs = segments(monitor.snapshots)
+        
+        assert [(h, len(snaps)) for h, snaps in runs] == [("aaaa", 3), ("bbbb", 2)]
+    
+    def test_reverts_latency_regression(self, monitor, healthy_state, monkeypatch):
+        """Test a slower code_hash is reverted and the rollback is timed."""
+        rng = np.random.default_rng(0)
+        reverted = []
+        guard = RegressionGuard(monitor, revert=lambda h: reverted.append(h) or True)
+        guard.attach()
+        
+        self._capture(monitor, healthy_state, "aaaa", rng.normal(100, 5, 20), monkeypatch)
+        self._capture(monitor, healthy_state, "bbbb", rng.normal(200, 5, 20), monkeypatch)
+        guard.join()
+        
+        assert reverted == ["bbbb"]
+        rollback = guard.rollbacks[0]
+        assert rollback["regressions"][0]["metric"] == "avg_latency_ms"
+        assert rollback["snapshots_after"] == guard.min_snapshots
+        assert rollback["rollback_seconds"] >= 0
+        assert guard.verdicts["bbbb"] == "reverted"
+    
+    def test_equal_segments_marked_clean(self, monitor, healthy_state, monkeypatch):
+        """Test an unchanged distribution is never reverted."""
+        rng = np.random.default_rng(1)
+        guard = RegressionGuard(monitor, max_snapshots=40,
+                                revert=lambda h: pytest.fail("unexpected revert"))
+        guard.attach()
+        
+        self._capture(monitor, healthy_state, "aaaa", rng.normal(100, 5, 40), monkeypatch)
+        self._capture(monitor, healthy_state, "bbbb", rng.normal(100, 5, 40), monkeypatch)
+        
+        assert guard.verdicts == {"bbbb": "clean"}
+    
+    def test_revert_does_not_block_capture(self, monitor, healthy_state, monkeypatch):
+        """Test captures keep flowing while a slow revert runs in the background."""
+        import threading
+        
+        rng = np.random.default_rng(0)
+        release = threading.Event()
+        guard = RegressionGuard(monitor, revert=lambda h: release.wait(5))
+        
+        self._capture(monitor, healthy_state, "aaaa", rng.normal(100, 5, 20), monkeypatch)
+        guard.attach()    # resumes from the existing "aaaa" segment
+        self._capture(monitor, healthy_state, "bbbb", rng.normal(200, 5, 20), monkeypatch)
+        
+        assert guard.verdicts["bbbb"] == "reverting"
+        assert guard.rollbacks[0]["reverted"] is None
+        assert (guard.before.count, guard.after.count) == (20, 20)
+        
+        release.set()
+        guard.join(5)
+        
+        assert guard.verdicts["bbbb"] == "reverted"
+        assert guard.rollbacks[0]["reverted"] is True
+        assert len(guard.rollbacks) == 1
+    
+    def test_engine_marks_reverted_patch(self, healer, monkeypatch):
+        """Test the engine's rollback marks the patch that produced the commit."""
+        import self_healing_engine
+        
+        monkeypatch.setattr(self_healing_engine, "git_revert", lambda h: True)
+        healer.cache.put("k1", commit="bbbb", applied=True)
+        healer.cache.put("k2", commit="aaaa", applied=True)
+        
+        assert healer.regression_guard.revert("bbbb")
+        assert healer.cache.get("k1")["reverted"]
+        assert not healer.cache.get("k2").get("reverted")
+
+# ============================================================================
+# BENCHMARK GATE TESTS
+# ============================================================================
+
+class TestBenchmarkGate:
+    """Test statistical benchmark acceptance of latency patches."""
+    
+    def _runs(self, rng, name, median, rounds=5):
+        return [{name: float(v)} for v in rng.normal(median, median * 0.02, rounds)]
+    
+    def test_exact_mann_whitney(self):
+        """Test fully separated 5 vs 5 samples give the exact p = 1/C(10,5)."""
+        p = mann_whitney_greater([2, 3, 4, 5, 6], [1.0, 1.1, 1.2, 1.3, 1.4])
+        assert p == pytest.approx(1 / 252)
+    
+    def test_accepts_significant_speedup(self):
+        """Test a consistently faster patched arm is accepted."""
+        rng = np.random.default_rng(0)
+        gate = BenchmarkGate(rounds=5)
+        
+        result = gate.compare(self._runs(rng, "b", 0.010), self._runs(rng, "b", 0.008))
+        
+        assert result.accepted
+        assert result.comparisons[0].change < -0.1
+    
+    def test_rejects_noise_and_regressions(self):
+        """Test equal arms and any slower benchmark are rejected."""
+        rng = np.random.default_rng(1)
+        gate = BenchmarkGate(rounds=5)
+        
+        noise = gate.compare(self._runs(rng, "b", 0.010), self._runs(rng, "b", 0.010))
+        assert not noise.accepted
+        
+        baseline = [dict(a, **b) for a, b in zip(self._runs(rng, "fast", 0.010),
+                                                 self._runs(rng, "slow", 0.010))]
+        patched = [dict(a, **b) for a, b in zip(self._runs(rng, "fast", 0.005),
+                                                self._runs(rng, "slow", 0.020))]
+        mixed = gate.compare(baseline, patched)
+        assert not mixed.accepted
+        assert "slow" in mixed.reason
+    
+    def test_engine_rejects_before_touching_git(self, healer, monkeypatch):
+        """Test a rejected latency patch never creates a branch."""
+        import self_healing_engine
+        
+        healer.benchmark_gate = BenchmarkGate("tests/")
+        monkeypatch.setattr(healer.benchmark_gate, "evaluate",
+                            lambda path, code: BenchmarkResult(False, "No significant improvement", 5))
+        monkeypatch.setattr(self_healing_engine.subprocess, "run",
+                            lambda *a, **kw: pytest.fail("git should not run"))
+        
+        patch = HealingPatch("healing/latency.py", "", "latency", strategy="latency")
+        patch.key = "bench-key"
+        
+        assert healer._apply_patch(patch) is False
+        assert patch.evidence["benchmark"]["reason"] == "No significant improvement"
+        assert healer.cache.get("bench-key")["benchmark_rejected"]
+    
+    def test_gate_off_by_default_and_missing_suite_fails_fast(self, healer, monkeypatch):
+        """Test no gate without a suite, and a missing suite never creates worktrees."""
+        import benchmark_gate
+        
+        assert healer.benchmark_gate is None
+        
+        monkeypatch.setattr(benchmark_gate.subprocess, "run",
+                            lambda *a, **kw: pytest.fail("git should not run"))
+        result = BenchmarkGate("no/such/benchmarks/").evaluate("healing/latency.py", "")
+        
+        assert not result.accepted
+        assert "not found" in result.reason
+
+# ============================================================================
+# PATCH HISTORY TESTS
+# ============================================================================
+
+class TestPatchHistory:
+    """Test the append-only indexed patch history."""
+    
+    def _patch(self, i, applied=False):
+        patch = HealingPatch(f"healing/p{i}.py", f"# patch {i}\n" * 100,
+                             f"{'Latency' if i % 2 else 'Φ'} issue {i}", strategy="latency")
+        patch.key = f"key-{i}"
+        patch.applied = applied
+        return patch.to_dict()
+    
+    def test_paginates_without_bodies(self):
+        """Test keyset pages cover every record once and omit patch_code."""
+        history = PatchHistory()
+        for i in range(120):
+            history.append(self._patch(i))
+        
+        seen, cursor = [], None
+        while True:
+            page = history.query(limit=50, cursor=cursor)
+            seen += [item["id"] for item in page["items"]]
+            assert all("patch_code" not in item for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        
+        assert len(seen) == len(set(seen)) == 120
+        assert seen == sorted(seen, reverse=True)
+        assert history.get(seen[0])["patch_code"].startswith("# patch 119")
+    
+    def test_filters(self):
+        """Test applied, reason-prefix and event filters."""
+        history = PatchHistory()
+        for i in range(10):
+            history.append(self._patch(i, applied=i < 3), event="applied" if i < 3 else "generated")
+        
+        assert len(history.query(applied=True)["items"]) == 3
+        assert len(history.query(reason="Latency")["items"]) == 5
+        assert history.count(event="generated") == 7
+    
+    def test_bodies_written_once_per_key(self):
+        """Test repeated events for one patch share a stored body."""
+        history = PatchHistory()
+        history.append(self._patch(1), event="generated")
+        history.append(self._patch(1, applied=True), event="applied")
+        
+        bodies = history._conn.execute("SELECT COUNT(*) FROM patch_bodies").fetchone()[0]
+        assert bodies == 1
+        assert history.count() == 2
+    
+    def test_persists_across_restart(self):
+        """Test records survive reopening the database."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "patch_history.db")
+            
+            history = PatchHistory(filepath)
+            history.append(self._patch(1))
+            history.close()
+            
+            assert PatchHistory(filepath).count() == 1
+    
+    def test_repeated_import_adds_nothing(self, healer, tmp_path):
+        """Test loading the same history twice does not duplicate rows or patches."""
+        filepath = str(tmp_path / "healer_history.json")
+        with open(filepath, "w") as f:
+            json.dump({
+                "patches_generated": [self._patch(1), self._patch(2)],
+                "patches_applied": [self._patch(1, applied=True)]
+            }, f)
+        
+        healer.load_history(filepath)
+        healer.load_history(filepath)
+        
+        assert healer.history.count() == 3
+        assert healer.history.import_json(filepath) == 0
+        assert len(healer.patches_generated) == 2
+        assert len(healer.patches_applied) == 1
+    
+    def test_engine_appends_events(self, healer, monitor, degraded_phi_state, monkeypatch):
+        """Test generation and application are recorded as events."""
+        import asyncio
+        
+        monkeypatch.setattr(healer, "_apply_patch", lambda patch: True)
+        for _ in range(10):
+            monitor.capture(degraded_phi_state)
+        
+        asyncio.run(healer.check_and_heal())
+        
+        assert healer.history.count(event="generated") == 1
+        assert healer.history.count(event="applied") == 1
+
+# ============================================================================
+# BASIN SIMULATOR TESTS
+# ============================================================================
+
+def _drifting_trajectory(baseline, steps=150, bias=0.01, seed=0):
+    """Unit-sphere random walk with a steady push away from `baseline`."""
+    rng = np.random.default_rng(seed)
+    direction = rng.normal(size=baseline.shape)
+    direction -= direction.dot(baseline) * baseline
+    direction /= np.linalg.norm(direction)
+    
+    x, trajectory = baseline.copy(), [baseline.copy()]
+    for _ in range(steps):
+        x = x + bias * direction + 0.005 * rng.normal(size=baseline.shape)
+        x /= np.linalg.norm(x)
+        trajectory.append(x)
+    return np.array(trajectory)
+
+class TestBasinSimulator:
+    """Test sphere-preserving drift corrections and the gain sweep."""
+    
+    def test_corrections_stay_on_sphere(self, healthy_state):
+        """Test every scheme keeps unit norm across a batch of gains."""
+        baseline = healthy_state["basin_coords"]
+        drifted = _drifting_trajectory(baseline)[-1]
+        gains = np.linspace(0, 1, 5)[:, None]
+        
+        for scheme in ("geodesic", "tangent", "renormalized"):
+            corrected = apply_correction(drifted, baseline, gains, scheme)
+            assert np.allclose(np.linalg.norm(corrected, axis=-1), 1.0)
+            assert np.allclose(corrected[0], drifted)
+        
+        assert np.allclose(apply_correction(drifted, baseline, 1.0, "geodesic"), baseline)
+    
+    def test_sweep_prefers_partial_correction(self, healthy_state):
+        """Test the sweep replays the recording at gain 0 and picks 0 < gain < 1."""
+        baseline = healthy_state["basin_coords"]
+        trajectory = _drifting_trajectory(baseline)
+        drift = np.arccos(np.clip(trajectory @ baseline, -1, 1))
+        phis = 0.8 - 0.2 * drift
+        
+        result = BasinSimulator().simulate(trajectory, baseline, phis)
+        best = result.best()
+        
+        assert result.mean_drift[0, 0] == pytest.approx(drift.mean(), rel=1e-6)
+        assert 0 < best["gain"] < 1
+        assert best["mean_drift"] < drift.mean() / 2
+        assert best["phi_gain"] > 0
+    
+    def test_patch_uses_simulated_correction(self, healer, monitor, healthy_state):
+        """Test the generated patch applies the sweep's scheme and gain."""
+        import asyncio
+        
+        for basin in _drifting_trajectory(healthy_state["basin_coords"], steps=60):
+            monitor.capture({**healthy_state, "basin_coords": basin})
+        
+        evidence = asyncio.run(healer._gather_evidence("basin_drift"))
+        patch = healer._patch_basin_drift(0.5, evidence=evidence)
+        
+        namespace = {}
+        exec(patch.patch_code, namespace)
+        best = evidence["simulation"]["best"]
+        corrected = namespace["correct_basin_drift"](monitor.snapshots[-1].basin_coords)
+        
+        assert namespace["SCHEME"] == best["scheme"]
+        assert namespace["GAIN"] == best["gain"]
+        assert np.linalg.norm(corrected) == pytest.approx(1.0)
+        assert corrected @ monitor.baseline_basin > monitor.snapshots[-1].basin_coords @ monitor.baseline_basin
+
+# ============================================================================
+# SHARDED TEST RUNNER TESTS
+# ============================================================================
+
+class TestShardedTestRunner:
+    """Test duration-balanced parallel patch validation."""
+    
+    def test_lpt_balances_shards(self):
+        """Test longest-first packing reaches the optimal makespan here."""
+        durations = {f"t{i}": d for i, d in enumerate([5, 4, 3, 3, 2, 2, 1])}
+        
+        shards = lpt_shards(list(durations), durations, workers=3)
+        loads = [sum(durations[n] for n in shard) for shard in shards]
+        
+        assert sorted(n for shard in shards for n in shard) == sorted(durations)
+        assert max(loads) == 7
+    
+    def test_junit_durations_map_to_nodeids(self, tmp_path):
+        """Test xunit1 testcases map back to pytest node IDs."""
+        report = tmp_path / "report.xml"
+        report.write_text(
+            '<testsuite><testcase file="tests/test_a.py" classname="tests.test_a.TestX" '
+            'name="test_y[1]" time="0.25"/><testcase file="tests/test_a.py" '
+            'classname="tests.test_a" name="test_z" time="1.5"/></testsuite>'
+        )
+        
+        assert junit_durations(str(report)) == {
+            "tests/test_a.py::TestX::test_y[1]": 0.25,
+            "tests/test_a.py::test_z": 1.5
+        }
+    
+    def test_first_failure_stops_all_shards(self, tmp_path):
+        """Test a failing shard terminates the others and timings are kept."""
+        tests = tmp_path / "tests"
+        tests.mkdir()
+        (tests / "test_fail.py").write_text("def test_fail():\n    assert False\n")
+        (tests / "test_slow.py").write_text(
+            "import time\n\ndef test_slow():\n    time.sleep(60)\n"
+        )
+        durations_file = tmp_path / "durations.json"
+        
+        runner = ShardedTestRunner("tests/", workers=2, durations_file=str(durations_file))
+        result = runner.run(cwd=str(tmp_path))
+        
+        assert not result.passed
+        assert result.failures == ["tests/test_fail.py::test_fail"]
+        assert result.stopped_early
+        assert result.duration_seconds < 60
+        assert "tests/test_fail.py::test_fail" in json.loads(durations_file.read_text())
+    
+    def test_spaced_param_failure_stops_early_without_leaking(self, tmp_path, monkeypatch):
+        """Test a failing param ID with spaces is seen early and no temp dir is left."""
+        import tempfile
+        
+        tests = tmp_path / "tests"
+        tests.mkdir()
+        (tests / "test_param.py").write_text(
+            "import pytest\n\n"
+            "@pytest.mark.parametrize('x', [1], ids=['a b'])\n"
+            "def test_x(x):\n    assert False\n"
+        )
+        (tests / "test_slow.py").write_text(
+            "import time\n\ndef test_slow():\n    time.sleep(60)\n"
+        )
+        scratch = tmp_path / "scratch"
+        scratch.mkdir()
+        monkeypatch.setattr(tempfile, "tempdir", str(scratch))
+        
+        runner = ShardedTestRunner("tests/", workers=2)
+        result = runner.run(cwd=str(tmp_path))
+        
+        assert result.failures == ["tests/test_param.py::test_x[a b]"]
+        assert result.stopped_early
+        assert result.report_path is None
+        assert list(scratch.iterdir()) == []
+
+# ============================================================================
+# HEALING QUEUE TESTS
+# ============================================================================
+
+class TestHealingQueue:
+    """Test the durable healing job queue and worker pool."""
+    
+    def test_claims_by_priority_then_age(self):
+        """Test critical jobs are claimed first, FIFO within a priority."""
+        jobs = HealingQueue()
+        warning = jobs.enqueue("generate", {"n": 1}, priority=1)
+        critical = jobs.enqueue("generate", {"n": 2}, priority=2)
+        later = jobs.enqueue("generate", {"n": 3}, priority=2)
+        
+        assert [jobs.claim().id for _ in range(3)] == [critical, later, warning]
+        assert jobs.claim() is None
+    
+    def test_dedupes_pending_key(self):
+        """Test the same health state is not queued twice."""
+        jobs = HealingQueue()
+        
+        assert jobs.enqueue("generate", {}, key="k") == jobs.enqueue("generate", {}, key="k")
+        assert jobs.enqueue("evaluate", {}, key="k") != jobs.enqueue("generate", {}, key="k")
+    
+    def test_retries_with_backoff_then_fails(self):
+        """Test failures retry after an increasing delay, then give up."""
+        now = [1000.0]
+        jobs = HealingQueue(max_attempts=2, retry_seconds=10, clock=lambda: now[0])
+        job_id = jobs.enqueue("apply", {})
+        
+        jobs.fail(jobs.claim().id, "boom")
+        assert jobs.claim() is None
+        
+        now[0] += 10
+        job = jobs.claim()
+        assert job.id == job_id and job.attempts == 2
+        
+        jobs.fail(job.id, "boom again")
+        now[0] += 1000
+        assert jobs.claim() is None
+        assert jobs.stats()["apply"]["failed"] == 1
+    
+    def test_resumes_running_jobs_after_restart(self, tmp_path):
+        """Test a job claimed before a crash is claimable again on reopen."""
+        filepath = str(tmp_path / "queue.db")
+        jobs = HealingQueue(filepath)
+        job_id = jobs.enqueue("generate", {"severity": "critical"})
+        jobs.claim()
+        jobs.close()
+        
+        reopened = HealingQueue(filepath)
+        
+        assert reopened.claim() is None    # only the worker process resumes
+        assert reopened.resume() == 1
+        assert reopened.claim().id == job_id
+    
+    def test_complete_enqueues_follow_ups_with_stats(self):
+        """Test stage hand-off inherits priority and shows up in stats."""
+        now = [0.0]
+        jobs = HealingQueue(clock=lambda: now[0])
+        jobs.enqueue("generate", {}, priority=2)
+        
+        job = jobs.claim()
+        now[0] += 3
+        jobs.complete(job.id, follow_ups=[("evaluate", {"key": "abc"})])
+        
+        follow_up = jobs.claim()
+        stats = jobs.stats()
+        
+        assert follow_up.stage == "evaluate" and follow_up.priority == 2
+        assert stats["generate"]["done"] == 1
+        assert stats["generate"]["run_seconds"] == 3
+        assert stats["evaluate"]["running"] == 1
+    
+    def test_engine_pipeline_through_workers(self, monitor, degraded_phi_state, monkeypatch):
+        """Test a queued heal runs generate → evaluate → apply on workers."""
+        import asyncio
+        
+        healer = SelfHealingEngine(monitor, queue=HealingQueue())
+        applied = []
+        monkeypatch.setattr(healer, "_apply_patch", lambda patch: applied.append(patch) or True)
+        
+        for _ in range(10):
+            monitor.capture(degraded_phi_state)
+        
+        job_id = healer.enqueue_heal()
+        assert healer.enqueue_heal() == job_id
+        
+        pool = WorkerPool(healer.queue, {
+            "generate": healer._job_generate,
+            "evaluate": healer._job_evaluate,
+            "apply": healer._job_apply,
+            "pr": healer._job_pr
+        })
+        asyncio.run(pool.run_until_idle())
+        
+        stats = healer.queue.stats()
+        
+        assert len(applied) == 1
+        assert healer.cache.get(applied[0].key)["applied"]
+        assert [stats[stage]["done"] for stage in ("generate", "evaluate", "apply")] == [1, 1, 1]
+
+# ============================================================================
+# PR BATCHER TESTS
+# ============================================================================
+
+class TestPRBatcher:
+    """Test coalescing review patches into one batch PR."""
+    
+    @pytest.fixture
+    def repo(self, tmp_path):
+        import subprocess
+        
+        def git(*args):
+            subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+        
+        git("init", "-q", "-b", "main")
+        git("config", "user.email", "heal@example.com")
+        git("config", "user.name", "heal")
+        (tmp_path / "README").write_text("x\n")
+        git("add", "README")
+        git("commit", "-q", "-m", "init")
+        return tmp_path
+    
+    def _patch(self, key, module_path, fitness=0.8):
+        return {
+            "key": key,
+            "module_path": module_path,
+            "patch_code": f"# {key}\n",
+            "reason": f"reason {key}",
+            "strategy": "phi_degradation",
+            "fitness_score": fitness
+        }
+    
+    def test_one_pr_one_commit_per_patch(self, repo, monkeypatch):
+        """Test a window's patches become commits on one branch and one PR."""
+        import subprocess
+        
+        calls = []
+        batcher = PRBatcher(window_seconds=0, cwd=str(repo))
+        monkeypatch.setattr(batcher, "_gh", lambda *args: calls.append(args))
+        
+        batcher.add(self._patch("a", "healing/a.py"))
+        batcher.add(self._patch("b", "healing/b.py", 0.7))
+        batcher.add(self._patch("a", "healing/a.py"))
+        rows = batcher.flush()
+        
+        log = subprocess.run(["git", "log", "--format=%B", batcher.branch], cwd=repo,
+                             capture_output=True, text=True).stdout
+        head = subprocess.run(["git", "rev-parse", "--abbrev-ref", "HEAD"], cwd=repo,
+                              capture_output=True, text=True).stdout.strip()
+        
+        assert [row["key"] for row in rows] == ["a", "b"]
+        assert "Patch-Key: a" in log and "Patch-Key: b" in log
+        assert head == "main"
+        assert [call[:2] for call in calls] == [("pr", "create")]
+        assert "0.700" in calls[0][calls[0].index("--body") + 1]
+    
+    def test_conflicts_wait_and_pr_is_updated(self, repo, monkeypatch):
+        """Test a second patch to a file in the open batch waits for the next batch PR."""
+        import subprocess
+        
+        calls, open_pr = [], [True]
+        batcher = PRBatcher(window_seconds=0, cwd=str(repo),
+                            state_file=str(repo / ".state" / "batch.json"))
+        monkeypatch.setattr(batcher, "_gh", lambda *args: calls.append(args))
+        monkeypatch.setattr(batcher, "_branch_open", lambda: open_pr[0])
+        
+        batcher.add(self._patch("a1", "healing/a.py"))
+        batcher.add(self._patch("a2", "healing/a.py"))
+        
+        assert [row["key"] for row in batcher.flush()] == ["a1"]
+        assert [p["key"] for p in PRBatcher(window_seconds=0, state_file=batcher.state_file).pending] == ["a2"]
+        
+        batcher.add(self._patch("b", "healing/b.py"))
+        assert [row["key"] for row in batcher.flush()] == ["b"]  # a.py is already in this PR
+        assert [call[:2] for call in calls] == [("pr", "create"), ("pr", "edit")]
+        first_branch = batcher.branch
+        
+        open_pr[0] = False  # merged: a2 opens the next batch PR
+        batcher.branch_prefix = "auto-heal-next"
+        assert [row["key"] for row in batcher.flush()] == ["a2"]
+        assert batcher.pending == []
+        
+        def show(branch, path):
+            return subprocess.run(["git", "show", f"{branch}:{path}"], cwd=repo,
+                                  capture_output=True, text=True).stdout
+        
+        assert show(first_branch, "healing/a.py") == "# a1\n"
+        assert show(batcher.branch, "healing/a.py") == "# a2\n"
+        files = subprocess.run(["git", "ls-tree", "-r", "--name-only", first_branch],
+                               cwd=repo, capture_output=True, text=True).stdout.split()
+        assert {"healing/a.py", "healing/b.py"} <= set(files)
+    
+    def test_failed_commit_leaves_no_staged_file(self, repo, monkeypatch):
+        """Test a rejected commit is unstaged and removed before returning."""
+        import subprocess
+        
+        hook = repo / ".git" / "hooks" / "pre-commit"
+        hook.write_text("#!/bin/sh\nexit 1\n")
+        hook.chmod(0o755)
+        
+        batcher = PRBatcher(window_seconds=0, cwd=str(repo))
+        monkeypatch.setattr(batcher, "_gh", lambda *args: pytest.fail("nothing to publish"))
+        
+        batcher.add(self._patch("a", "healing/a.py"))
+        
+        assert batcher.flush() == []
+        
+        status = subprocess.run(["git", "status", "--porcelain"], cwd=repo,
+                                capture_output=True, text=True).stdout
+        assert status == ""
+        assert not (repo / "healing" / "a.py").exists()
+    
+    def test_engine_routes_review_patches_to_batcher(self, monitor, degraded_phi_state, monkeypatch):
+        """Test non-critical review patches are batched and marked handled."""
+        import asyncio
+        
+        batcher = PRBatcher(window_seconds=0)
+        healer = SelfHealingEngine(monitor, fitness_threshold=0.0, pr_batcher=batcher)
+        monkeypatch.setattr(healer, "_wants_apply", lambda health: False)
+        monkeypatch.setattr(healer, "_create_pr_for_review",
+                            lambda *a: pytest.fail("per-patch PR opened"))
+        
+        for _ in range(10):
+            monitor.capture(degraded_phi_state)
+        
+        asyncio.run(healer.check_and_heal())
+        second = asyncio.run(healer.check_and_heal())
+        
+        assert len(batcher.pending) == 1
+        assert second["cached"]
+        
+        healer._on_pr_batch("auto-heal-batch-x", [{"key": batcher.pending[0]["key"]}])
+        assert healer.cache.get(batcher.pending[0]["key"])["pr_opened"]
+
+# ============================================================================
+# SNAPSHOT STREAM TESTS
+# ============================================================================
+
+class TestSnapshotStream:
+    """Test cursor pagination and NDJSON snapshot export."""
+    
+    def test_seq_pagination_survives_eviction_and_reload(self, healthy_state, tmp_path):
+        """Test after_seq pages stay contiguous across trimming and reload."""
+        monitor = GeometricHealthMonitor(history_size=20)
+        for _ in range(30):
+            monitor.capture(healthy_state)
+        
+        first = monitor.snapshots_after(0, limit=5)
+        second = monitor.snapshots_after(first[-1].seq, limit=5)
+        
+        assert [s.seq for s in first] == list(range(11, 16))
+        assert [s.seq for s in second] == list(range(16, 21))
+        assert [s.seq for s in monitor.snapshots_after(limit=3)] == [28, 29, 30]
+        
+        filepath = str(tmp_path / "history.json")
+        monitor.save_history(filepath)
+        reloaded = GeometricHealthMonitor()
+        reloaded.load_history(filepath)
+        
+        assert reloaded.capture(healthy_state).seq == 31
+    
+    def test_ndjson_lines_and_basin_modes(self, monitor, healthy_state):
+        """Test one parseable line per snapshot, with basins dropped or pooled."""
+        for _ in range(5):
+            monitor.capture(healthy_state)
+        
+        chunks = list(iter_ndjson(monitor.snapshots, basins="none", chunk_lines=2))
+        lines = b"".join(chunks).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        
+        assert len(chunks) == 3
+        assert [r["seq"] for r in records] == [1, 2, 3, 4, 5]
+        assert "basin_coords" not in records[0]
+        
+        pooled = json.loads(b"".join(iter_ndjson(monitor.snapshots[:1], basins="downsample",
+                                                 basin_points=4)))
+        assert len(pooled["basin_coords"]) == 4
+        assert downsample_basin(np.arange(8.0), 2) == [1.5, 5.5]
+
+# ============================================================================
+# HEALTH BROADCAST TESTS
+# ============================================================================
+
+def _sse_events(chunks):
+    """[(event, data)] from SSE byte chunks."""
+    events = []
+    for block in b"".join(chunks).decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+class TestHealthBroadcast:
+    """Test SSE fan-out of health deltas."""
+    
+    def test_clients_share_one_computation_per_capture(self, monitor, healthy_state,
+                                                       degraded_phi_state):
+        """Test N clients get the same deltas for one health check per capture."""
+        import asyncio
+        
+        broadcaster = HealthBroadcaster(monitor, keepalive_seconds=0.05)
+        for _ in range(5):
+            monitor.capture(healthy_state)  # < 10 snapshots: reported normal
+        
+        async def run():
+            broadcaster.attach(asyncio.get_running_loop())
+            streams = [broadcaster.stream() for _ in range(3)]
+            received = [[await s.__anext__()] for s in streams]
+            before = broadcaster.computations
+            
+            for _ in range(10):
+                monitor.capture(degraded_phi_state)
+            await asyncio.sleep(0)
+            
+            for stream, chunks in zip(streams, received):
+                while True:
+                    chunk = await stream.__anext__()
+                    if chunk.startswith(b":"):
+                        break
+                    chunks.append(chunk)
+                await stream.aclose()
+            return received, broadcaster.computations - before
+        
+        received, computations = asyncio.run(run())
+        events = [_sse_events(chunks) for chunks in received]
+        
+        assert computations == 10
+        assert events[0] == events[1] == events[2]
+        assert events[0][0][0] == "state"
+        assert "severity" in [name for name, _ in events[0]]
+        assert all(set(data) <= set(events[0][0][1]) for _, data in events[0][1:])
+        assert broadcaster.clients == 0
+    
+    def test_no_clients_no_work(self, monitor, healthy_state):
+        """Test captures cost nothing while nobody is listening."""
+        broadcaster = HealthBroadcaster(monitor)
+        broadcaster.attach(None)
+        
+        for _ in range(20):
+            monitor.capture(healthy_state)
+        
+        assert broadcaster.computations == 0
+
+# ============================================================================
+# SNAPSHOT CODEC TESTS
+# ============================================================================
+
+class TestSnapshotCodec:
+    """Test columnar binary snapshot export."""
+    
+    def test_columns_come_straight_from_storage(self, monitor, healthy_state):
+        """Test typed columns and one basin block, optionally pooled."""
+        for i in range(4):
+            state = dict(healthy_state, phi=0.7 + i * 0.01)
+            monitor.capture(state)
+        
+        columns = snapshot_columns(monitor.snapshots)
+        pooled = snapshot_columns(monitor.snapshots, basins="downsample", basin_points=4)
+        
+        assert columns["seq"].dtype == np.int64
+        np.testing.assert_allclose(columns["phi"], [0.70, 0.71, 0.72, 0.73])
+        assert columns["basin_coords"].shape == (4, 64)
+        np.testing.assert_allclose(columns["basin_coords"][0], monitor.snapshots[0].basin_coords)
+        assert pooled["basin_coords"].shape == (4, 4)
+        assert "basin_coords" not in snapshot_columns(monitor.snapshots, basins="none")
+    
+    def test_negotiation_skips_missing_backends(self, monkeypatch):
+        """Test Accept q-values pick an installed format, else JSON."""
+        import snapshot_codec
+        
+        monkeypatch.setattr(snapshot_codec, "available_formats", lambda: ["arrow", "msgpack"])
+        accept = "application/msgpack;q=0.5, application/vnd.apache.arrow.stream;q=0.9"
+        assert negotiate(accept) == "arrow"
+        
+        monkeypatch.setattr(snapshot_codec, "available_formats", lambda: ["msgpack"])
+        assert negotiate(accept) == "msgpack"
+        assert negotiate("application/json") is None
+    
+    def test_msgpack_round_trip(self, monitor, healthy_state):
+        """Test raw float arrays decode back to the stored basins."""
+        msgpack = pytest.importorskip("msgpack")
+        for _ in range(3):
+            monitor.capture(healthy_state)
+        
+        payload = msgpack.unpackb(encode_snapshots(monitor.snapshots, "msgpack"))
+        basins = payload["columns"]["basin_coords"]
+        decoded = np.frombuffer(basins["data"], dtype=basins["dtype"]).reshape(basins["shape"])
+        
+        assert payload["count"] == 3
+        np.testing.assert_array_equal(decoded[2], monitor.snapshots[2].basin_coords)
+    
+    def test_arrow_round_trip(self, monitor, healthy_state):
+        """Test the Arrow IPC stream carries fixed-size basin lists."""
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+        for _ in range(3):
+            monitor.capture(healthy_state)
+        
+        table = pyarrow.ipc.open_stream(encode_snapshots(monitor.snapshots, "arrow")).read_all()
+        
+        assert table.num_rows == 3
+        assert table.schema.field("basin_coords").type.list_size == 64
+    
+    def test_explicit_format_beats_accept(self, monkeypatch):
+        """Test ?format= wins over Accept; Accept only decides when it is unset."""
+        import snapshot_codec
+        
+        monkeypatch.setattr(snapshot_codec, "available_formats", lambda: ["arrow", "msgpack"])
+        accept = "application/msgpack"
+        
+        assert select_format("json", accept) is None
+        assert select_format("ndjson", accept) is None
+        assert select_format("arrow", accept) == "arrow"
+        assert select_format(None, accept) == "msgpack"
+        assert select_format(None, None) is None
+
+# ============================================================================
+# SHARED STATE TESTS
+# ============================================================================
+
+@pytest.fixture
+def shared_store(request):
+    """Fresh shared-memory store, unlinked after the test."""
+    name = f"qig_test_{os.getpid()}_{request.node.name[:20]}"
+    store = SharedSnapshotStore(name, capacity=5)
+    yield store
+    store.close(unlink=True)
+
+
+class TestSharedState:
+    """Test cross-worker snapshot sharing and leader election."""
+    
+    def test_follower_syncs_leader_snapshots(self, shared_store, healthy_state):
+        """Test a follower sees the leader's snapshots and baseline."""
+        leader = GeometricHealthMonitor()
+        follower = GeometricHealthMonitor()
+        reader = SharedSnapshotStore(shared_store.name, capacity=5)
+        
+        try:
+            shared_store.publish(leader)
+            for _ in range(3):
+                leader.capture(healthy_state)
+            
+            assert reader.sync(follower) == 3
+            assert reader.sync(follower) == 0
+            assert [s.seq for s in follower.snapshots] == [1, 2, 3]
+            np.testing.assert_array_equal(follower.baseline_basin, leader.baseline_basin)
+            np.testing.assert_array_equal(follower.snapshots[-1].basin_coords,
+                                          leader.snapshots[-1].basin_coords)
+            assert follower.check_health()["severity"] == leader.check_health()["severity"]
+            assert reader.leader_pid == os.getpid()
+        finally:
+            reader.close()
+    
+    def test_ring_keeps_latest_capacity(self, shared_store, healthy_state):
+        """Test the ring wraps and new leaders continue the sequence."""
+        leader = GeometricHealthMonitor()
+        shared_store.publish(leader)
+        for _ in range(8):
+            leader.capture(healthy_state)
+        
+        successor = GeometricHealthMonitor()
+        shared_store.sync(successor)
+        
+        assert [s.seq for s in successor.snapshots] == [4, 5, 6, 7, 8]
+        assert successor.capture(healthy_state).seq == 9
+    
+    def test_leader_dying_mid_write_does_not_hang_followers(self, shared_store, healthy_state):
+        """Test a seqlock left odd times out for readers and is evened by the next leader."""
+        import time
+        
+        leader = GeometricHealthMonitor()
+        shared_store.publish(leader)
+        for _ in range(3):
+            leader.capture(healthy_state)
+        shared_store._header["seqlock"] += 1  # leader killed inside append()
+        
+        follower = GeometricHealthMonitor()
+        start = time.monotonic()
+        assert shared_store.sync(follower) == 3
+        assert time.monotonic() - start < 5
+        
+        successor = GeometricHealthMonitor()
+        shared_store.sync(successor)
+        shared_store.publish(successor)
+        successor.capture(healthy_state)
+        
+        assert shared_store._header["seqlock"][0] % 2 == 0
+        assert [s.seq for s in shared_store.snapshots_since(0)] == [1, 2, 3, 4]
+    
+    def test_single_leader(self, tmp_path):
+        """Test only one election holds the lock until it is released."""
+        lock_path = str(tmp_path / "leader.lock")
+        first, second = LeaderElection(lock_path), LeaderElection(lock_path)
+        
+        assert first.try_acquire()
+        assert not second.try_acquire()
+        
+        first.release()
+        
+        assert second.try_acquire()
+        assert second.is_leader
+        second.release()
+
+# ============================================================================
+# REQUEST METRICS TESTS
+# ============================================================================
+
+def _asgi_request(middleware, path, route=None):
+    """Drive one HTTP request through an ASGI middleware."""
+    import asyncio
+    from types import SimpleNamespace
+    
+    scope = {"type": "http", "path": path}
+    if route:
+        scope["route"] = SimpleNamespace(path=route)
+    
+    async def receive():
+        return {"type": "http.request", "body": b""}
+    
+    async def send(message):
+        pass
+    
+    try:
+        asyncio.run(middleware(scope, receive, send))
+    except RuntimeError:
+        pass
+
+
+class TestRequestMetrics:
+    """Test request-timing middleware and aggregated windows."""
+    
+    def test_window_aggregates_and_resets(self):
+        """Test status, errors and latency per window, keyed by route template."""
+        async def app(scope, receive, send):
+            if scope["path"] == "/boom":
+                raise RuntimeError("boom")
+            status = 503 if scope["path"] == "/busy" else 200
+            await send({"type": "http.response.start", "status": status, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+        
+        metrics = RequestMetrics()
+        middleware = RequestMetricsMiddleware(app, metrics)
+        
+        for i in range(3):
+            _asgi_request(middleware, f"/items/{i}", route="/items/{id}")
+        _asgi_request(middleware, "/busy", route="/busy")
+        _asgi_request(middleware, "/boom")
+        
+        window = metrics.window()
+        
+        assert window["requests"] == 5
+        assert window["errors"] == 2
+        assert window["error_rate"] == pytest.approx(0.4)
+        assert window["status"] == {"2xx": 3, "5xx": 2}
+        assert window["routes"]["/items/{id}"]["requests"] == 3
+        assert "<unmatched>" in window["routes"]
+        assert window["in_flight"] == 0
+        assert window["avg_latency_ms"] >= 0
+        assert metrics.window()["requests"] == 0
+    
+    def test_quantiles_and_route_cap(self):
+        """Test bucket quantiles and the route-cardinality cap."""
+        metrics = RequestMetrics(max_routes=2)
+        for latency in (3.0, 3.0, 3.0, 400.0):
+            metrics.route("/a").record(200, latency)
+        metrics.route("/b").record(200, 1.0)
+        metrics.route("/c").record(200, 1.0)
+        metrics.route("/d").record(200, 1.0)
+        
+        buckets = metrics.routes["/a"].buckets
+        
+        assert set(metrics.routes) == {"/a", "/b", "<other>"}
+        assert metrics.routes["<other>"].count == 2
+        assert 2.5 <= quantile(buckets, 0.5) <= 5.0
+        assert 250.0 <= quantile(buckets, 0.99) <= 500.0
+        assert quantile([0] * (len(LATENCY_BUCKETS_MS) + 1), 0.5) is None
+    
+    def test_leader_window_includes_follower_requests(self, tmp_path):
+        """Test follower drains posted through WorkerReports land in the leader's window."""
+        leader, follower = RequestMetrics(), RequestMetrics()
+        reports = WorkerReports(str(tmp_path / "reports"))
+        
+        leader.route("/a").record(200, 10.0)
+        for _ in range(3):
+            follower.route("/a").record(500, 30.0)
+        reports.post("requests", follower.drain())
+        follower.route("/b").record(200, 50.0)
+        reports.post("requests", follower.drain())
+        
+        window = leader.window(reports.drain("requests"))
+        
+        assert window["requests"] == 5
+        assert window["errors"] == 3
+        assert window["routes"]["/a"]["requests"] == 4
+        assert window["routes"]["/a"]["avg_latency_ms"] == pytest.approx(25.0)
+        assert window["routes"]["/b"]["requests"] == 1
+        assert window["status"] == {"2xx": 2, "5xx": 3}
+        assert follower.drain()["routes"] == {}
+        assert leader.window(reports.drain("requests"))["requests"] == 0
+
+# ============================================================================
+# CAPTURE PIPELINE TESTS
+# ============================================================================
+
+class TestCapturePipeline:
+    """Test off-loop snapshot capture."""
+    
+    def test_captures_on_worker_thread(self, monitor, healthy_state):
+        """Test submitted state is normalized and captured off the caller's thread."""
+        import threading
+        seen = []
+        pipeline = CapturePipeline(
+            monitor, on_captured=lambda s: seen.append(threading.current_thread().name)
+        ).start()
+        
+        try:
+            state = dict(healthy_state, basin_coords=healthy_state["basin_coords"] * 3)
+            assert pipeline.submit(state)
+            pipeline.submit(dict(healthy_state, basin_coords=np.zeros(64)))
+            pipeline.join()
+        finally:
+            pipeline.stop()
+        
+        stats = pipeline.stats()
+        
+        assert len(monitor.snapshots) == 2
+        assert np.linalg.norm(monitor.snapshots[0].basin_coords) == pytest.approx(1.0)
+        assert monitor.snapshots[1].basin_coords[0] == 1.0
+        assert seen == ["snapshot-capture", "snapshot-capture"]
+        assert stats["captured"] == 2 and stats["dropped"] == 0
+        assert not stats["running"]
+    
+    def test_backpressure_drops_oldest(self, monitor, healthy_state):
+        """Test a full queue keeps the newest states and counts drops."""
+        pipeline = CapturePipeline(monitor, maxsize=2)
+        
+        results = [pipeline.submit(dict(healthy_state, phi=0.70 + i * 0.01)) for i in range(4)]
+        
+        assert results == [True, True, False, False]
+        assert pipeline.stats()["dropped"] == 2
+        assert pipeline.stats()["max_depth"] == 2
+        
+        pipeline.start()
+        pipeline.join()
+        pipeline.stop()
+        
+        assert [s.phi for s in monitor.snapshots] == pytest.approx([0.72, 0.73])
+    
+    def test_git_hash_cached(self, monitor, healthy_state, monkeypatch):
+        """Test git rev-parse runs once per TTL unless invalidated."""
+        import subprocess
+        from types import SimpleNamespace
+        calls = []
+        monkeypatch.setattr(subprocess, "run",
+                            lambda *a, **k: calls.append(a) or SimpleNamespace(stdout="abcdef1234\n"))
+        
+        for _ in range(3):
+            monitor.capture(healthy_state)
+        monitor.invalidate_git_hash()
+        snapshot = monitor.capture(healthy_state)
+        
+        assert len(calls) == 2
+        assert snapshot.code_hash == "abcdef12"
+
+# ============================================================================
+# METRIC SOURCE TESTS
+# ============================================================================
+
+class TestMetricSources:
+    """Test concurrent, deadline-bound metric collection."""
+    
+    def test_sources_gathered_concurrently(self):
+        """Test sync and async sources overlap instead of adding up."""
+        import asyncio
+        import time as _time
+        
+        async def consciousness():
+            await asyncio.sleep(0.2)
+            return {"phi": 0.8}
+        
+        def performance():
+            _time.sleep(0.2)
+            return {"error_rate": 0.01}
+        
+        collector = MetricCollector()
+        collector.register("consciousness", consciousness)
+        collector.register("performance", performance)
+        
+        started = _time.perf_counter()
+        values = asyncio.run(collector.collect())
+        elapsed = _time.perf_counter() - started
+        
+        assert values == {"consciousness": {"phi": 0.8}, "performance": {"error_rate": 0.01}}
+        assert elapsed < 0.35
+        assert collector.stats()["collection_ms"] >= 150
+        assert collector.stats()["sources"]["performance"]["latency_ms"] >= 150
+    
+    def test_timeout_keeps_last_known_values(self):
+        """Test a slow or failing source falls back to its last good values."""
+        import asyncio
+        calls = []
+        
+        async def flaky():
+            calls.append(1)
+            if len(calls) == 2:
+                await asyncio.sleep(1)
+            if len(calls) == 3:
+                raise RuntimeError("chain offline")
+            return {"phi": 0.7 + len(calls) / 100}
+        
+        collector = MetricCollector()
+        collector.register("chain", flaky, timeout_seconds=0.05, defaults={"phi": 0.5})
+        collector.register("never", lambda: 1 / 0, defaults={"memory_mb": 0.0})
+        
+        async def run():
+            return [await collector.collect() for _ in range(3)]
+        
+        first, second, third = asyncio.run(run())
+        stats = collector.stats()["sources"]
+        
+        assert first["chain"] == second["chain"] == third["chain"] == {"phi": 0.71}
+        assert first["never"] == {"memory_mb": 0.0}
+        assert stats["chain"]["timeouts"] == 1 and stats["chain"]["errors"] == 1
+        assert stats["chain"]["stale"] and stats["never"]["stale"]
+
+# ============================================================================
+# STAGE METRICS TESTS
+# ============================================================================
+
+class TestStageMetrics:
+    """Test per-stage instrumentation and latency attribution."""
+    
+    def test_stages_drained_on_capture(self, monitor, healthy_state):
+        """Test decorator/context-manager timings reach monitor.stage_stats."""
+        import asyncio
+        stages = StageRecorder()
+        stages.attach(monitor)
+        
+        @stages.stage("retrieve", stream="searchspace")
+        async def retrieve():
+            await asyncio.sleep(0.01)
+        
+        @stages.stage(stream="searchspace")
+        def rerank():
+            raise ValueError("bad candidate")
+        
+        asyncio.run(retrieve())
+        with pytest.raises(ValueError):
+            rerank()
+        with stages.timed("render", stream="pantheon-chat"):
+            pass
+        
+        monitor.capture(healthy_state)
+        window = monitor.stage_stats["stages"]
+        
+        assert window["searchspace"]["retrieve"]["avg_ms"] >= 10
+        assert window["searchspace"]["retrieve"]["target"].endswith("<locals>.retrieve")
+        assert window["searchspace"]["rerank"]["errors"] == 1
+        assert window["pantheon-chat"]["render"]["calls"] == 1
+        
+        monitor.capture(healthy_state)
+        assert monitor.stage_stats["stages"] == {}
+    
+    def test_sampling_and_disabled(self):
+        """Test sampled stages count every call and disabled ones record nothing."""
+        stages = StageRecorder(sample_rate=0.25)
+        work = stages.stage("work")(lambda: None)
+        
+        for _ in range(8):
+            work()
+        stages.enabled = False
+        work()
+        
+        stats = stages.drain()["default"]["work"]
+        
+        assert stats["calls"] == 8
+        assert stats["timed"] == 2
+    
+    def test_latency_patch_prefers_slowest_stage(self, healer):
+        """Test a profiled function behind the slowest stage is targeted first."""
+        def hot(module, function, pct):
+            return {
+                "module": module, "function": function,
+                "self_samples": 80, "cumulative_samples": 90,
+                "blocking_samples": 0, "is_coroutine": False,
+                "self_pct": pct, "cumulative_pct": pct
+            }
+        
+        stages = stage_attribution({"stages": {"searchspace": {
+            "encode": {"target": "chain:encode", "calls": 10, "avg_ms": 5.0, "total_ms": 50.0},
+            "retrieve": {"target": "chain:retrieve", "calls": 10, "avg_ms": 90.0, "total_ms": 900.0}
+        }}})
+        evidence = {
+            "profile": {"functions": [hot("chain", "encode", 0.6),
+                                      hot("chain", "retrieve", 0.3)]},
+            "stages": stages
+        }
+        
+        patch = healer._patch_latency(2500, evidence=evidence)
+        
+        assert stages[0]["stage"] == "retrieve" and stages[0]["share"] > 0.9
+        assert patch.evidence["targets"][0]["target"] == "chain:retrieve"
+        assert patch.evidence["targets"][0]["stage"] == "searchspace/retrieve"
+        assert "searchspace/retrieve" in patch.patch_code
+
+# ============================================================================
+# CHECKPOINT TESTS
+# ============================================================================
+
+class TestCheckpoint:
+    """Test incremental checkpoints and warm restart."""
+    
+    def test_warm_restart_detects_immediately(self, tmp_path, healthy_state, degraded_phi_state):
+        """Test a restarted monitor keeps history, baseline and trigger backoff."""
+        monitor = GeometricHealthMonitor(history_size=100)
+        healer = SelfHealingEngine(monitor)
+        checkpoint = Checkpointer(str(tmp_path), monitor, healer)
+        
+        for _ in range(6):
+            monitor.capture(healthy_state)
+        assert checkpoint.save() == 6
+        for _ in range(6):
+            monitor.capture(degraded_phi_state)
+        healer.triggers.record_attempt("phi_degradation", False)
+        assert checkpoint.save() == 6
+        assert checkpoint.save() == 0
+        
+        restarted = GeometricHealthMonitor(history_size=100)
+        restarted_healer = SelfHealingEngine(restarted)
+        
+        assert Checkpointer(str(tmp_path), restarted, restarted_healer).load() == 12
+        assert [s.seq for s in restarted.snapshots] == list(range(1, 13))
+        np.testing.assert_array_equal(restarted.baseline_basin, monitor.baseline_basin)
+        assert restarted.capture(degraded_phi_state).seq == 13
+        assert not restarted.check_health()["healthy"]
+        assert restarted_healer.triggers.failures["phi_degradation"] == 1
+        assert not restarted_healer.triggers.ready("phi_degradation")
+    
+    def test_torn_append_and_compaction(self, tmp_path, healthy_state):
+        """Test a partial last line is dropped and the log is compacted."""
+        monitor = GeometricHealthMonitor(history_size=5)
+        checkpoint = Checkpointer(str(tmp_path), monitor, compact_factor=2)
+        
+        for _ in range(4):
+            monitor.capture(healthy_state)
+        checkpoint.save()
+        with open(checkpoint.snapshots_path, "a") as f:
+            f.write('{"seq": 5, "timest')
+        
+        restarted = GeometricHealthMonitor(history_size=5)
+        reloaded = Checkpointer(str(tmp_path), restarted, compact_factor=2)
+        
+        assert reloaded.load() == 4
+        for _ in range(8):
+            restarted.capture(healthy_state)
+            reloaded.save()
+        
+        with open(reloaded.snapshots_path) as f:
+            lines = f.read().splitlines()
+        
+        assert len(lines) <= 10
+        assert json.loads(lines[-1])["seq"] == 12
+    
+    def test_new_leader_resumes_without_duplicates(self, tmp_path, healthy_state):
+        """Test a takeover with mirrored history appends only what is new."""
+        leader = GeometricHealthMonitor(history_size=100)
+        for _ in range(5):
+            leader.capture(healthy_state)
+        Checkpointer(str(tmp_path), leader).save()
+        
+        # Follower mirrored the leader's history, then captured as the new leader
+        follower = GeometricHealthMonitor(history_size=100)
+        follower.snapshots = list(leader.snapshots)
+        follower.next_seq = leader.next_seq
+        takeover = Checkpointer(str(tmp_path), follower)
+        
+        assert takeover.resume() == 5
+        for _ in range(3):
+            follower.capture(healthy_state)
+        assert takeover.save() == 3
+        
+        with open(takeover.snapshots_path) as f:
+            seqs = [json.loads(line)["seq"] for line in f]
+        
+        assert seqs == list(range(1, 9))
+        with open(takeover.meta_path) as f:
+            assert json.load(f)["tail_offset"] == 0    # tail index covers the old lines too
+    
+    def test_stop_drains_tasks_and_restores_hooks(self, tmp_path):
+        """Test stop() awaits cancelled loops before saving and restores every hook."""
+        import asyncio
+        import sys
+        import threading
+        from searchspace_self_healing import SearchSpaceCollapseSelfHealing
+        
+        class Chain:
+            def get_consciousness_metrics(self):
+                return {"phi": 0.75, "basin_coords": np.ones(64)}
+            
+            def get_performance_metrics(self):
+                return {"avg_latency_ms": 100.0}
+        
+        integration = SearchSpaceCollapseSelfHealing(Chain(), state_dir=str(tmp_path))
+        hooks = (sys.excepthook, threading.excepthook)
+        
+        def previous(loop, context):
+            pass
+        
+        async def run():
+            loop = asyncio.get_running_loop()
+            loop.set_exception_handler(previous)
+            await integration.start()
+            await asyncio.sleep(0)
+            await integration.stop()
+            tasks = [integration.monitor_task, integration.healing_task, integration.worker_task,
+                     integration.checkpoint_task, integration.allocation_task]
+            return loop.get_exception_handler(), tasks
+        
+        handler, tasks = asyncio.run(run())
+        
+        assert handler is previous
+        assert all(task.done() for task in tasks)
+        assert (sys.excepthook, threading.excepthook) == hooks
+        assert read_meta(str(tmp_path)) is not None
+
+# ============================================================================
+# CLI TESTS
+# ============================================================================
+
+@pytest.fixture
+def checkpointed_state(tmp_path, healthy_state):
+    """State dir with 60 checkpointed snapshots (checkpointed in batches)."""
+    monitor = GeometricHealthMonitor(history_size=100)
+    checkpoint = Checkpointer(str(tmp_path / "checkpoint"), monitor)
+    for i in range(60):
+        monitor.capture(dict(healthy_state, phi=0.70 + (i % 10) / 100))
+        if i % 7 == 0:
+            checkpoint.save()
+    checkpoint.save()
+    return str(tmp_path)
+
+
+class TestHealingCli:
+    """Test the fast status CLI."""
+    
+    def test_status_from_footer_without_numpy(self, checkpointed_state):
+        """Test status answers from the checkpoint meta and never imports NumPy."""
+        import subprocess
+        import sys
+        script = (
+            "import sys; from healing_cli import cli_main; "
+            f"rc = cli_main(['status', '--json', '--state-dir', {checkpointed_state!r}]); "
+            "print('numpy' in sys.modules, rc)"
+        )
+        
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        lines = result.stdout.strip().splitlines()
+        
+        assert json.loads("\n".join(lines[:-1]))["severity"] == "critical"
+        assert lines[-1] == "False 2"
+    
+    def test_tail_read_uses_index(self, checkpointed_state, capsys):
+        """Test tail records come from the indexed offset, even mid-line."""
+        meta = read_meta(checkpointed_state)
+        tail = read_tail(checkpointed_state, meta)
+        mid_line = read_tail(checkpointed_state, dict(meta, tail_offset=meta["tail_offset"] + 5))
+        
+        assert meta["count"] == 60 and meta["tail_offset"] > 0
+        assert [r["seq"] for r in tail] == list(range(11, 61))
+        assert mid_line[0]["seq"] == 12
+        
+        assert cli_main(["history", "--json", "--state-dir", checkpointed_state]) == 0
+        history = json.loads(capsys.readouterr().out)
+        assert history["total"] == 60
+        assert [r["seq"] for r in history["recent"]] == [56, 57, 58, 59, 60]
+        assert cli_main(["status", "--state-dir", checkpointed_state + "-missing"]) == 3
+    
+    def test_stale_checkpoint_reported(self, checkpointed_state, capsys):
+        """Test status exits 3 when the checkpoint is older than --max-age."""
+        import time
+        
+        meta_path = os.path.join(checkpointed_state, "checkpoint", "meta.json")
+        meta = read_meta(checkpointed_state)
+        with open(meta_path, "w") as f:
+            json.dump(dict(meta, saved_at=time.time() - 600), f)
+        
+        assert cli_main(["status", "--json", "--state-dir", checkpointed_state]) == 3
+        status = json.loads(capsys.readouterr().out)
+        assert status["stale"]
+        assert status["age_seconds"] >= 600
+        assert status["severity"] == "critical"
+        
+        assert cli_main(["status", "--max-age", "900", "--state-dir", checkpointed_state]) == 2
+        assert "STALE" not in capsys.readouterr().out
+        assert cli_main(["status", "--state-dir", checkpointed_state]) == 3
+        assert "STALE" in capsys.readouterr().out
+
 # ============================================================================
 # INTEGRATION TESTS
 # ============================================================================